@@ -0,0 +1,157 @@
+"""
+Time the conversion stages on synthetic CALIPSO-shaped granules.
+
+Runs h5_to_txt, h5_to_las, txt_to_las, las_to_copc and the end-to-end
+HDF5 → text → LAS → COPC chain on generated granules of increasing size and
+reports wall time, throughput and peak memory per stage. Results can be saved
+as JSON and compared between runs:
+
+    python benchmarks/run_benchmarks.py --scales 1 2 4 --repeat 3 -o before.json
+    python benchmarks/run_benchmarks.py --scales 1 2 4 --repeat 3 -o after.json --compare before.json
+
+Stages that need PDAL are reported as skipped when the pdal bindings are missing.
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+try:
+    import calipso_tool
+except ImportError:
+    # Allow running from a source checkout without installing the package
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from calipso_tool.h5_to_las import h5_to_las
+from calipso_tool.h5_to_txt import h5_to_txt
+from calipso_tool.instrument import RunReport
+from calipso_tool.las_to_copc import las_to_copc
+from calipso_tool.masking import CALIPSO_FILL_VALUES
+from calipso_tool.txt_to_las import txt_to_las
+from synthetic import L3_SHAPE, make_synthetic_granule
+
+VARIABLE = "Extinction_Coefficient_532"
+
+
+def run_once(granule: Path, work_dir: Path, drop_fill: bool) -> list[dict]:
+    """Run every stage once on granule and return the stage records."""
+    report = RunReport(reset_peak=True)
+    filters = {"fill_values": CALIPSO_FILL_VALUES, "drop_nan": True} if drop_fill else {}
+    txt_file = work_dir / "granule.txt"
+    las_file = work_dir / "granule.las"
+    copc_file = work_dir / "granule.copc.laz"
+    
+    h5_to_txt(granule, txt_file, variable_names=[VARIABLE], report=report, **filters)
+    
+    with report.stage("h5_to_las", granule, work_dir / "direct.las") as record:
+        h5_to_las(granule, record["output_path"], variable_names=[VARIABLE], **filters)
+        record["points"] = report.stages[0]["points"]
+    
+    try:
+        txt_to_las(txt_file, las_file, variable_names=[VARIABLE], report=report)
+        las_to_copc(las_file, copc_file, report=report)
+    except ImportError as e:
+        print(f"  skipping PDAL stages: {e}")
+        return [r for r in report.stages if "error" not in r]
+    
+    chain = ("h5_to_txt", "txt_to_las", "las_to_copc")
+    chain_records = [r for r in report.stages if r["name"] in chain]
+    seconds = sum(r["seconds"] for r in chain_records)
+    report.stages.append({
+        "name": "end_to_end",
+        "seconds": seconds,
+        "peak_rss_bytes": max(r["peak_rss_bytes"] for r in chain_records),
+        "bytes_in": chain_records[0]["bytes_in"],
+        "bytes_out": chain_records[-1]["bytes_out"],
+        "points": chain_records[0]["points"],
+        "points_per_sec": chain_records[0]["points"] / seconds if seconds > 0 else None,
+    })
+    return report.stages
+
+
+def summarize(runs: list[list[dict]]) -> dict[str, dict]:
+    """Median time and worst peak memory per stage over repeated runs."""
+    summary = {}
+    for name in dict.fromkeys(r["name"] for run in runs for r in run):
+        records = [r for run in runs for r in run if r["name"] == name]
+        seconds = statistics.median(r["seconds"] for r in records)
+        points = records[0]["points"]
+        summary[name] = {
+            "seconds": seconds,
+            "min_seconds": min(r["seconds"] for r in records),
+            "peak_rss_mb": max(r["peak_rss_bytes"] for r in records) / 1024**2,
+            "output_mb": (records[0]["bytes_out"] or 0) / 1024**2,
+            "points": points,
+            "points_per_sec": points / seconds if points and seconds > 0 else None,
+        }
+    return summary
+
+
+def print_table(results: dict, baseline: dict = None) -> None:
+    """Print one row per scale and stage, with the change against a baseline run."""
+    header = f"{'scale':>5} {'stage':<12} {'points':>12} {'median s':>9} {'Mpts/s':>8} {'peak MB':>8} {'out MB':>8}"
+    if baseline:
+        header += f" {'vs base':>8}"
+    print(header)
+    print("-" * len(header))
+    for scale, stages in results.items():
+        for name, s in stages.items():
+            rate = f"{s['points_per_sec'] / 1e6:8.2f}" if s["points_per_sec"] else f"{'-':>8}"
+            row = f"{scale:>5} {name:<12} {s['points'] or 0:>12,} {s['seconds']:>9.3f} {rate} " \
+                  f"{s['peak_rss_mb']:>8.1f} {s['output_mb']:>8.1f}"
+            base = (baseline or {}).get(scale, {}).get(name)
+            if base:
+                row += f" {(s['seconds'] / base['seconds'] - 1) * 100:>+7.1f}%"
+            print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the conversion stages on synthetic granules")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 2],
+                        help="Lat/lon refinement factors of the synthetic grids (default: 1 2)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per scale; the median time is reported (default: 3)")
+    parser.add_argument("--drop-fill", action="store_true",
+                        help="Drop fill-value cells, as production runs do")
+    parser.add_argument("--work-dir", help="Directory for generated files (default: a temp dir)")
+    parser.add_argument("-o", "--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory(dir=args.work_dir) as tmp:
+        tmp = Path(tmp)
+        results = {}
+        for scale in args.scales:
+            n_lat, n_lon, n_alt = L3_SHAPE[0] * scale, L3_SHAPE[1] * scale, L3_SHAPE[2]
+            print(f"Scale {scale}: {n_lat}×{n_lon}×{n_alt} grid ({n_lat * n_lon * n_alt:,} cells)")
+            granule = make_synthetic_granule(tmp / f"granule_x{scale}.h5", scale, [VARIABLE])
+            runs = []
+            for _ in range(args.repeat):
+                run_dir = tmp / "run"
+                run_dir.mkdir(exist_ok=True)
+                runs.append(run_once(granule, run_dir, args.drop_fill))
+                for f in run_dir.iterdir():
+                    f.unlink()
+            results[str(scale)] = summarize(runs)
+            granule.unlink()
+    
+    baseline = None
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())["results"]
+    
+    print()
+    print_table(results, baseline)
+    
+    if args.output:
+        Path(args.output).write_text(json.dumps(
+            {"scales": args.scales, "repeat": args.repeat, "drop_fill": args.drop_fill, "results": results},
+            indent=2
+        ))
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
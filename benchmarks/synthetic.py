@@ -0,0 +1,62 @@
+import h5py
+import numpy as np
+from pathlib import Path
+from typing import Sequence, Union
+
+# Grid of the CALIPSO Level 3 cloud/aerosol profile products
+L3_SHAPE = (85, 72, 208)   # (lat, lon, alt)
+
+
+def make_synthetic_granule(
+    output_h5: Union[str, Path],
+    scale: int = 1,
+    variable_names: Sequence[str] = ("Extinction_Coefficient_532",),
+    fill_fraction: float = 0.7,
+    seed: int = 0
+) -> Path:
+    """
+    Write an HDF5 file with the layout of a CALIPSO L3 granule.
+    
+    The midpoint coordinates carry the leading singleton axis of the real
+    files (shape (1, n)) and every variable has shape (n_lat, n_lon, n_alt).
+    
+    Parameters:
+    -----------
+    output_h5 : str or Path
+        Path to output HDF5 file
+    scale : int, default=1
+        Refinement factor of the latitude and longitude axes. scale=1 gives the
+        real 85×72×208 grid, scale=2 a 170×144×208 grid, and so on.
+    variable_names : list of str
+        Names of the float32 variables to create
+    fill_fraction : float, default=0.7
+        Fraction of cells set to the CALIPSO fill value (-9999), roughly the
+        share of empty cells in real aerosol extinction profiles
+    seed : int, default=0
+        Random seed, so repeated runs benchmark identical data
+    
+    Returns:
+    --------
+    Path
+        Path to the created HDF5 file
+    """
+    output_h5 = Path(output_h5)
+    n_lat, n_lon, n_alt = L3_SHAPE[0] * scale, L3_SHAPE[1] * scale, L3_SHAPE[2]
+    rng = np.random.default_rng(seed)
+    
+    # Cell midpoints: 2° × 5° at scale 1, 60 m vertical bins from -0.5 km
+    lat_step, lon_step = 2.0 / scale, 5.0 / scale
+    lat = -85.0 + lat_step / 2 + lat_step * np.arange(n_lat)
+    lon = -180.0 + lon_step / 2 + lon_step * np.arange(n_lon)
+    alt = -0.5 + 0.03 + 0.06 * np.arange(n_alt)
+    
+    with h5py.File(output_h5, "w") as f:
+        f["Latitude_Midpoint"] = lat[np.newaxis].astype(np.float32)
+        f["Longitude_Midpoint"] = lon[np.newaxis].astype(np.float32)
+        f["Altitude_Midpoint"] = alt[np.newaxis].astype(np.float32)
+        for name in variable_names:
+            data = rng.gamma(1.0, 0.05, size=(n_lat, n_lon, n_alt)).astype(np.float32)
+            data[rng.random(data.shape) < fill_fraction] = -9999.0
+            f[name] = data
+    
+    return output_h5
\ No newline at end of file
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Optional, Union
+from .workspace import publish
+
+# Bump when a stage's output format changes so old entries are never reused
+CACHE_VERSION = 1
+
+# Environment variable overriding the default cache location
+CACHE_DIR_ENV = "CALIPSO_CACHE_DIR"
+
+
+def file_sha256(path: Union[str, Path], block_size: int = 1 << 20) -> str:
+    """Return the hex SHA-256 digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ArtifactCache:
+    """
+    Content-addressed store of intermediate conversion artifacts.
+    
+    Each artifact is keyed by the SHA-256 of the stage's input file plus the
+    stage name and every parameter that affects the output, so a stage is only
+    recomputed when its input or parameters change. Because keys depend on the
+    input's contents (not its path), an unchanged artifact from an earlier
+    stage also produces cache hits for every later stage.
+    
+    Entries live under root/<key[:2]>/<key><suffix>. Their modification time is
+    refreshed on every hit, and once the cache grows beyond max_bytes the
+    least recently used entries are removed.
+    
+    Parameters:
+    -----------
+    root : str or Path, optional
+        Cache directory. If None, uses $CALIPSO_CACHE_DIR or ~/.cache/calipso_tool
+    max_bytes : int, optional
+        Size cap for the cache directory. If None, the cache is unbounded
+    """
+    
+    def __init__(
+        self,
+        root: Optional[Union[str, Path]] = None,
+        max_bytes: Optional[int] = None
+    ):
+        if root is None:
+            root = os.environ.get(CACHE_DIR_ENV, Path.home() / ".cache" / "calipso_tool")
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._digests = {}
+    
+    def input_digest(self, input_path: Union[str, Path]) -> str:
+        """SHA-256 of input_path, memoized on (path, size, mtime) for this instance."""
+        input_path = Path(input_path)
+        stat = input_path.stat()
+        memo_key = (str(input_path.resolve()), stat.st_size, stat.st_mtime_ns)
+        if memo_key not in self._digests:
+            self._digests[memo_key] = file_sha256(input_path)
+        return self._digests[memo_key]
+    
+    def key(self, input_path: Union[str, Path], stage: str, **params) -> str:
+        """
+        Build the cache key of a stage run on input_path with the given parameters.
+        
+        Parameters must be JSON-serializable; Paths and tuples are normalized.
+        """
+        payload = json.dumps(
+            {
+                "version": CACHE_VERSION,
+                "input": self.input_digest(input_path),
+                "stage": stage,
+                "params": params,
+            },
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+    
+    def _entry(self, key: str, suffix: str) -> Path:
+        return self.root / key[:2] / f"{key}{suffix}"
+    
+    def fetch(self, key: str, output_path: Union[str, Path]) -> bool:
+        """
+        Materialize the cached artifact for key at output_path.
+        
+        Returns:
+        --------
+        bool
+            True on a cache hit, False if the stage has to be computed
+        """
+        output_path = Path(output_path)
+        entry = self._entry(key, output_path.suffix)
+        if not entry.exists():
+            return False
+        
+        try:
+            os.utime(entry)  # mark as recently used
+            # Copy rather than hard-link, so a later in-place rewrite of
+            # output_path can never corrupt the cached entry
+            with publish(output_path) as tmp:
+                shutil.copyfile(entry, tmp)
+        except FileNotFoundError:
+            return False  # evicted by another worker meanwhile
+        return True
+    
+    def store(self, key: str, output_path: Union[str, Path]) -> Path:
+        """
+        Add the freshly computed artifact at output_path to the cache.
+        
+        The entry is written under a unique temporary name (see workspace.publish)
+        and renamed into place, so concurrent workers and threads never see or
+        share a partial file.
+        """
+        output_path = Path(output_path)
+        entry = self._entry(key, output_path.suffix)
+        with publish(entry) as tmp:
+            shutil.copyfile(output_path, tmp)
+        
+        self.evict()
+        return entry
+    
+    def _stat_entries(self) -> list[tuple[Path, os.stat_result]]:
+        """Cached artifacts with their stat, least recently used first."""
+        entries = []
+        for path in self.root.glob("??/*"):
+            if path.name.startswith("."):
+                continue
+            try:
+                entries.append((path, path.stat()))
+            except FileNotFoundError:
+                pass  # evicted by another worker meanwhile
+        return sorted(entries, key=lambda entry: entry[1].st_mtime)
+    
+    def entries(self) -> list[Path]:
+        """All cached artifacts, least recently used first."""
+        return [path for path, _ in self._stat_entries()]
+    
+    def size(self) -> int:
+        """Total size of the cached artifacts in bytes."""
+        return sum(stat.st_size for _, stat in self._stat_entries())
+    
+    def evict(self) -> list[Path]:
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        if self.max_bytes is None:
+            return []
+        
+        entries = self._stat_entries()
+        total = sum(stat.st_size for _, stat in entries)
+        removed = []
+        for path, stat in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+            removed.append(path)
+        return removed
+    
+    def clear(self) -> None:
+        """Remove every cached artifact."""
+        for path in self.entries():
+            path.unlink(missing_ok=True)
\ No newline at end of file
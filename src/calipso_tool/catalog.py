@@ -0,0 +1,345 @@
+import logging
+import re
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional, Sequence, Union
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Date in CALIPSO granule names: 2018-12 (Level 3 monthly) or 2018-01-01T00-22-49 (Level 2)
+GRANULE_DATE = re.compile(r"(\d{4})-(\d{2})(?:-(\d{2})(?:T(\d{2})-(\d{2})-(\d{2}))?)?")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS granules (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    product TEXT,
+    start_time REAL,
+    end_time REAL,
+    lat_min REAL,
+    lat_max REAL,
+    lon_min REAL,
+    lon_max REAL,
+    alt_min REAL,
+    alt_max REAL,
+    error TEXT,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS variables (
+    path TEXT NOT NULL REFERENCES granules (path) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    shape TEXT NOT NULL,
+    PRIMARY KEY (path, name)
+);
+CREATE INDEX IF NOT EXISTS granules_time ON granules (start_time, end_time);
+CREATE INDEX IF NOT EXISTS variables_name ON variables (name);
+"""
+
+# Coordinate midpoints whose extents are indexed, as (extent column prefix, SDS name)
+_EXTENT_SDS = (("lat", "Latitude_Midpoint"), ("lon", "Longitude_Midpoint"), ("alt", "Altitude_Midpoint"))
+
+
+def _path_key(path: Union[str, Path]) -> str:
+    """Absolute path used as catalog key, so indexes built from other directories match."""
+    return str(Path(path).resolve())
+
+
+def _timestamp(when: Union[str, datetime]) -> float:
+    """POSIX seconds of a datetime or ISO date string; naive times are taken as UTC."""
+    if isinstance(when, str):
+        when = datetime.fromisoformat(when)
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when.timestamp()
+
+
+def granule_period(path: Union[str, Path]) -> Optional[tuple[datetime, datetime]]:
+    """
+    Time span covered by a granule, parsed from its file name.
+    
+    Level 3 monthly names (...2018-12D.hdf) cover the whole month, daily names
+    the whole day and Level 2 names with a start time (...2018-01-01T00-22-49ZD.hdf)
+    that instant. Returns None if the name carries no date.
+    """
+    match = GRANULE_DATE.search(Path(path).name)
+    if match is None:
+        return None
+    year, month, day, hour, minute, second = (int(g) if g else None for g in match.groups())
+    start = datetime(year, month, day or 1, hour or 0, minute or 0, second or 0, tzinfo=timezone.utc)
+    if day is None:
+        end = datetime(year + month // 12, month % 12 + 1, 1, tzinfo=timezone.utc)
+    elif hour is None:
+        end = start + timedelta(days=1)
+    else:
+        return start, start
+    return start, end - timedelta(microseconds=1)
+
+
+def read_granule_metadata(path: Union[str, Path]) -> dict:
+    """
+    Dataset names and shapes and the coordinate extents of an HDF4 (or HDF5, .h5) granule.
+    
+    Only the dataset descriptors and the three 1D midpoint arrays are read.
+    
+    Returns:
+    --------
+    dict
+        "variables" ({name: shape}) and "lat", "lon", "alt" ((min, max) or None
+        when the midpoints are missing)
+    """
+    path = Path(path)
+    if path.suffix in (".h5", ".hdf5"):
+        import h5py
+        
+        with h5py.File(path, "r") as f:
+            variables = {
+                name: tuple(item.shape) for name, item in f.items() if isinstance(item, h5py.Dataset)
+            }
+            midpoints = {axis: f[name][...] for axis, name in _EXTENT_SDS if name in variables}
+    else:
+        from pyhdf.SD import SD, SDC
+        
+        sd = SD(str(path), SDC.READ)
+        try:
+            datasets = sd.datasets()
+            variables = {name: tuple(np.atleast_1d(info[1])) for name, info in datasets.items()}
+            midpoints = {axis: sd.select(name)[:] for axis, name in _EXTENT_SDS if name in datasets}
+        finally:
+            sd.end()
+    
+    metadata = {"variables": variables}
+    for axis, _ in _EXTENT_SDS:
+        values = np.asarray(midpoints[axis], dtype=np.float64) if axis in midpoints else np.empty(0)
+        values = values[np.isfinite(values)]
+        metadata[axis] = (float(values.min()), float(values.max())) if values.size else None
+    return metadata
+
+
+class GranuleCatalog:
+    """
+    Local SQLite index of granules, for selecting inputs without opening every file.
+    
+    For each granule the catalog keeps its path, size, mtime, product (the
+    file name up to the first dot), the time span parsed from its name, the
+    names and shapes of its datasets and the latitude, longitude and altitude
+    extents of its grid. update() only opens files that are new or whose size
+    or mtime changed, so refreshing an index of thousands of granules costs
+    one stat per file; select() then answers time, bbox and variable queries
+    from the index alone.
+    
+    Parameters:
+    -----------
+    path : str or Path
+        Path to the SQLite catalog file (created if missing)
+    """
+    
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=60)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+    
+    def _query(self, sql: str, params: Sequence = ()) -> list[dict]:
+        conn = self._connect()
+        try:
+            return [dict(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+    
+    def add(self, granule: Union[str, Path]) -> dict:
+        """Index (or re-index) one granule and return its catalog row."""
+        granule = Path(granule)
+        stat = granule.stat()
+        row = {
+            "path": _path_key(granule),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "product": granule.name.split(".")[0],
+            "start_time": None,
+            "end_time": None,
+            "error": None,
+            "indexed_at": time.time(),
+        }
+        variables = {}
+        try:
+            # An impossible date in the name (e.g. month 13) is recorded like unreadable metadata
+            period = granule_period(granule)
+            metadata = read_granule_metadata(granule)
+        except Exception as e:
+            logger.warning(f"✗ Cannot index {granule.name}: {e}")
+            row["error"] = str(e)
+        else:
+            if period is not None:
+                row["start_time"], row["end_time"] = (when.timestamp() for when in period)
+            variables = metadata["variables"]
+            for axis, _ in _EXTENT_SDS:
+                row[f"{axis}_min"], row[f"{axis}_max"] = metadata[axis] or (None, None)
+        
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM granules WHERE path = ?", (row["path"],))
+                conn.execute(
+                    f"INSERT INTO granules ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                    list(row.values())
+                )
+                conn.executemany(
+                    "INSERT INTO variables (path, name, shape) VALUES (?, ?, ?)",
+                    [(row["path"], name, "x".join(map(str, shape))) for name, shape in variables.items()]
+                )
+        finally:
+            conn.close()
+        return self.get(granule)
+    
+    def update(
+        self,
+        directory: Union[str, Path],
+        pattern: str = "*.hdf",
+        prune: bool = True
+    ) -> dict[str, int]:
+        """
+        Bring the index of a directory up to date.
+        
+        New granules, granules whose size or mtime changed and granules that
+        failed to index last time are (re-)indexed; with prune, indexed granules of the directory that no longer exist or
+        no longer match the pattern are removed.
+        
+        Returns:
+        --------
+        dict[str, int]
+            Number of "indexed", "unchanged", "removed" and "failed" granules
+        """
+        directory = Path(directory).resolve()
+        known = {
+            row["path"]: (row["size"], row["mtime_ns"])
+            for row in self._query("SELECT path, size, mtime_ns FROM granules WHERE error IS NULL")
+        }
+        failed = {row["path"] for row in self._query("SELECT path FROM granules WHERE error IS NOT NULL")}
+        counts = {"indexed": 0, "unchanged": 0, "removed": 0, "failed": 0}
+        
+        seen = set()
+        for granule in sorted(directory.glob(pattern)):
+            key = _path_key(granule)
+            seen.add(key)
+            stat = granule.stat()
+            if known.get(key) == (stat.st_size, stat.st_mtime_ns):
+                counts["unchanged"] += 1
+                continue
+            row = self.add(granule)
+            counts["failed" if row["error"] else "indexed"] += 1
+        
+        if prune:
+            stale = [
+                path for path in known.keys() | failed
+                if path not in seen and Path(path).parent == directory
+            ]
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany("DELETE FROM granules WHERE path = ?", [(path,) for path in stale])
+            finally:
+                conn.close()
+            counts["removed"] = len(stale)
+        
+        logger.info(f"Catalog {self.path.name}: {counts['indexed']} indexed, {counts['unchanged']} unchanged, "
+                    f"{counts['removed']} removed, {counts['failed']} failed")
+        return counts
+    
+    def get(self, granule: Union[str, Path]) -> Optional[dict]:
+        """Catalog row of a granule, or None if it is not indexed."""
+        rows = self._query("SELECT * FROM granules WHERE path = ?", (_path_key(granule),))
+        return rows[0] if rows else None
+    
+    def variables(self, granule: Union[str, Path]) -> dict[str, tuple[int, ...]]:
+        """Dataset names and shapes of an indexed granule."""
+        rows = self._query("SELECT name, shape FROM variables WHERE path = ? ORDER BY name",
+                           (_path_key(granule),))
+        return {row["name"]: tuple(int(n) for n in row["shape"].split("x")) for row in rows}
+    
+    def select(
+        self,
+        start: Optional[Union[str, datetime]] = None,
+        end: Optional[Union[str, datetime]] = None,
+        bbox: Optional[Sequence[float]] = None,
+        alt_range: Optional[Sequence[float]] = None,
+        variables: Optional[Sequence[str]] = None,
+        product: Optional[str] = None,
+        directory: Optional[Union[str, Path]] = None
+    ) -> list[Path]:
+        """
+        Indexed granules matching every given condition, in time order.
+        
+        Parameters:
+        -----------
+        start, end : str or datetime, optional
+            Time range (ISO strings or datetimes, UTC if naive); granules whose
+            span overlaps it are selected, those without a date never are
+        bbox : sequence of float, optional
+            (lon_min, lat_min, lon_max, lat_max); granules whose grid extent overlaps it
+        alt_range : sequence of float, optional
+            (min, max) altitude in the file's units (km for CALIPSO)
+        variables : list of str, optional
+            Dataset names that must all be present
+        product : str, optional
+            Product name, e.g. "CAL_LID_L3_Tropospheric_APro_AllSky-Standard-V4-20"
+        directory : str or Path, optional
+            Only granules directly inside this directory
+        
+        Returns:
+        --------
+        list[Path]
+            Paths of the matching granules; granules that failed to index are left out
+        """
+        conditions = ["error IS NULL"]
+        params = []
+        if start is not None:
+            conditions.append("end_time >= ?")
+            params.append(_timestamp(start))
+        if end is not None:
+            conditions.append("start_time <= ?")
+            params.append(_timestamp(end))
+        if bbox is not None:
+            conditions.append("lon_max >= ? AND lon_min <= ? AND lat_max >= ? AND lat_min <= ?")
+            params += [bbox[0], bbox[2], bbox[1], bbox[3]]
+        if alt_range is not None:
+            conditions.append("alt_max >= ? AND alt_min <= ?")
+            params += [min(alt_range), max(alt_range)]
+        if product is not None:
+            conditions.append("product = ?")
+            params.append(product)
+        if directory is not None:
+            # Direct children only: the path is the directory plus one name component
+            prefix = str(Path(directory).resolve()).rstrip("/") + "/"
+            conditions.append("substr(path, 1, ?) = ? AND instr(substr(path, ?), '/') = 0")
+            params += [len(prefix), prefix, len(prefix) + 1]
+        if variables:
+            names = list(dict.fromkeys(variables))
+            conditions.append(
+                f"path IN (SELECT path FROM variables WHERE name IN ({', '.join('?' * len(names))}) "
+                f"GROUP BY path HAVING COUNT(*) = ?)"
+            )
+            params += [*names, len(names)]
+        
+        rows = self._query(
+            f"SELECT path FROM granules WHERE {' AND '.join(conditions)} ORDER BY start_time, path",
+            params
+        )
+        return [Path(row["path"]) for row in rows]
+    
+    def summary(self) -> dict[str, int]:
+        """Number of indexed granules per product (failed ones under None)."""
+        rows = self._query(
+            "SELECT CASE WHEN error IS NULL THEN product END AS product, COUNT(*) AS n "
+            "FROM granules GROUP BY 1"
+        )
+        return {row["product"]: row["n"] for row in rows}
\ No newline at end of file
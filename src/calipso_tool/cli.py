@@ -1,11 +1,58 @@
+import os
 import sys
 from pathlib import Path
 import click
-from .converter import h4_to_h5
+from .converter import h4_to_h5, batch_h4_to_copc
+from .cache import ArtifactCache
+from .catalog import GranuleCatalog
+from .executors import DaskExecutor, LocalExecutor
+from .fetch import EarthdataSource, LocalSource, fetch_convert
+from .h5_to_columnar import points_to_npy, points_to_parquet, require_pyarrow
+from .h5_to_txt import points_to_txt
+from .instrument import RESET_PEAK_ENV, configure_logging
+from .manifest import JobManifest
+from .query import DEFAULT_COLUMN_RADIUS, CopcQuery, resolve_overview
+from .stack import stack_to_copc
+from .workspace import SCRATCH_DIR_ENV
+from .masking import CALIPSO_FILL_VALUES
 
-@click.command()
+
+class DefaultCommandGroup(click.Group):
+    """Click group that falls back to a default command, so `cali-convert input.hdf` keeps working."""
+
+    default_command = "h5"
+
+    def parse_args(self, ctx, args):
+        if args and args[0] not in self.commands and not args[0].startswith("-"):
+            args = [self.default_command, *args]
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=DefaultCommandGroup)
+@click.option("--log-level", default="INFO", show_default=True,
+              type=click.Choice(["DEBUG", "INFO", "WARNING", "ERROR"]),
+              help="Verbosity of the pipeline log messages")
+def main(log_level):
+    """CALIPSO HDF workflows: HDF4→HDF5→LAS→COPC."""
+    configure_logging(log_level)
+
+
+def make_executor(scheduler, workers, retries):
+    """Executor for the --scheduler and --retries options."""
+    # Local and LocalCluster workers run one granule per process, so their
+    # reports can reset the peak RSS counter per stage (inherited by the workers)
+    os.environ[RESET_PEAK_ENV] = "1"
+    if scheduler == "local":
+        return DaskExecutor(workers=workers, retries=retries)
+    if scheduler is not None:
+        return DaskExecutor(address=scheduler, retries=retries)
+    return LocalExecutor(workers, retries)
+
+
+@main.command("h5")
 @click.argument("input_file", type=click.Path(exists=True, dir_okay=False))
-def main(input_file):
+def h5_command(input_file):
+    """Convert an HDF4 file to HDF5 (default command)."""
     in_path = Path(input_file)
     out_path = in_path.with_suffix(".h5")
     click.echo(f"Converting {in_path} → {out_path}…")
@@ -14,3 +61,337 @@ def main(input_file):
     # you can chain here your other steps or just exit
     sys.exit(0)
 
+
+@main.command("batch")
+@click.argument("directory", type=click.Path(exists=True, file_okay=False))
+@click.option("-p", "--pattern", default="*.hdf", show_default=True,
+              help="Glob pattern for finding HDF4 files")
+@click.option("-w", "--workers", type=int, default=None,
+              help="Number of worker processes (default: number of CPUs)")
+@click.option("-v", "--variable", "variables", multiple=True, default=["var_to_grab"],
+              show_default=True, help="Name of variable to extract (repeat for several)")
+@click.option("-o", "--output-dir", type=click.Path(file_okay=False), default=None,
+              help="Directory for COPC files (default: next to the inputs)")
+@click.option("--alt-units", default="km", type=click.Choice(["km", "m"]), show_default=True,
+              help="Altitude units in the input file")
+@click.option("--reader", default="pyhdf", type=click.Choice(["pyhdf", "h4toh5"]), show_default=True,
+              help="Backend used to read the HDF4 files")
+@click.option("--text-stage", is_flag=True, help="Go through an intermediate point file read by PDAL")
+@click.option("--intermediate-format", default="txt", type=click.Choice(["txt", "npy", "parquet"]),
+              show_default=True, help="Format of the --text-stage intermediate file")
+@click.option("--fused/--no-fused", default=True, show_default=True,
+              help="Write COPC in one PDAL pipeline without an intermediate LAS file")
+@click.option("--cache-dir", type=click.Path(file_okay=False), default=None,
+              help="Reuse converted artifacts from this cache directory")
+@click.option("--cache-max-gb", type=float, default=None,
+              help="Evict least recently used cache entries beyond this size")
+@click.option("--scratch-dir", type=click.Path(file_okay=False), default=None,
+              help="Put intermediate files on this (fast, local) disk (default: $CALIPSO_SCRATCH_DIR or system temp)")
+@click.option("--report-dir", type=click.Path(file_okay=False), default=None,
+              help="Write a per-granule timing/memory report (JSON) into this directory")
+@click.option("--manifest", "manifest_path", type=click.Path(dir_okay=False), default=None,
+              help="SQLite job manifest; rerunning with it resumes an interrupted batch")
+@click.option("--retry-failed/--skip-failed", default=True, show_default=True,
+              help="Reconvert granules that failed in an earlier run recorded in --manifest")
+@click.option("--overwrite", is_flag=True, help="Reconvert granules that are already converted")
+@click.option("--drop-fill", is_flag=True, help="Drop CALIPSO fill values (-9999) and NaN cells")
+@click.option("--min-value", type=float, default=None, help="Drop cells below this value")
+@click.option("--chunk-size", type=int, default=None,
+              help="Stream each granule in slabs of about this many cells")
+@click.option("--bbox", type=float, nargs=4, default=None,
+              help="Only convert cells inside LON_MIN LAT_MIN LON_MAX LAT_MAX")
+@click.option("--alt-range", type=float, nargs=2, default=None,
+              help="Only convert altitude levels between MIN MAX (file units, km)")
+@click.option("--auto-scale", is_flag=True,
+              help="Derive coordinate scales and offsets from the grid spacing (smaller output)")
+@click.option("--overview-levels", type=int, default=0, show_default=True,
+              help="Number of block-aggregated overview levels to write")
+@click.option("--overview-mode", default="files", type=click.Choice(["files", "tagged"]), show_default=True,
+              help="Write overviews as separate .overview<k>.copc.laz files or tagged into the output")
+@click.option("--overview-statistic", default="mean", type=click.Choice(["mean", "max"]), show_default=True,
+              help="Statistic of the cells aggregated into each overview point")
+@click.option("--overviews-only", is_flag=True,
+              help="Leave out the full-resolution points (needs --overview-mode tagged)")
+@click.option("--crs", default=None,
+              help="Write points in this CRS instead of lon/lat, e.g. EPSG:4978 (ECEF) or a projected CRS")
+@click.option("--catalog", "catalog_path", type=click.Path(dir_okay=False), default=None,
+              help="SQLite granule catalog; updated for DIRECTORY, then used to select granules")
+@click.option("--start", default=None, help="With --catalog: only granules covering this date or later")
+@click.option("--end", default=None, help="With --catalog: only granules covering this date or earlier")
+@click.option("--select-bbox", type=float, nargs=4, default=None,
+              help="With --catalog: only granules whose grid overlaps LON_MIN LAT_MIN LON_MAX LAT_MAX")
+@click.option("--scheduler", default=None, metavar="ADDRESS",
+              help="Run on a Dask cluster (e.g. tcp://host:8786), or 'local' for a LocalCluster of --workers")
+@click.option("--retries", type=int, default=0, show_default=True,
+              help="Resubmit failed granules up to this many times (to another worker with --scheduler)")
+def batch_command(directory, pattern, workers, variables, output_dir, alt_units, reader,
+                  text_stage, intermediate_format, fused, cache_dir, cache_max_gb, scratch_dir,
+                  report_dir, manifest_path, retry_failed, overwrite, drop_fill, min_value, chunk_size,
+                  bbox, alt_range, auto_scale, overview_levels, overview_mode, overview_statistic,
+                  overviews_only, crs, catalog_path, start, end, select_bbox, scheduler, retries):
+    """Convert every HDF4 granule in DIRECTORY to COPC in parallel."""
+    granules = None
+    if catalog_path is not None:
+        catalog = GranuleCatalog(catalog_path)
+        catalog.update(directory, pattern)
+        granules = catalog.select(start, end, select_bbox, variables=list(variables), directory=directory)
+    elif start or end or select_bbox:
+        raise click.UsageError("--start, --end and --select-bbox need --catalog")
+    if text_stage and intermediate_format == "parquet":
+        # Fail once here rather than in every worker
+        try:
+            require_pyarrow()
+        except ImportError as e:
+            raise click.UsageError(str(e))
+    if scratch_dir is not None:
+        # Inherited by the worker processes
+        os.environ[SCRATCH_DIR_ENV] = scratch_dir
+    cache = None
+    if cache_dir is not None or cache_max_gb is not None:
+        max_bytes = None if cache_max_gb is None else int(cache_max_gb * 1024**3)
+        cache = ArtifactCache(cache_dir, max_bytes)
+    with make_executor(scheduler, workers, retries) as executor:
+        successful, failed = batch_h4_to_copc(
+            directory,
+            pattern,
+            workers=workers,
+            output_dir=output_dir,
+            skip_existing=not overwrite,
+            altitude_units=alt_units,
+            text_stage=text_stage,
+            reader=reader,
+            variable_names=list(variables),
+            fill_values=CALIPSO_FILL_VALUES if drop_fill else None,
+            drop_nan=drop_fill,
+            min_value=min_value,
+            chunk_size=chunk_size,
+            bbox=bbox,
+            alt_range=alt_range,
+            auto_scale=auto_scale,
+            overview_levels=overview_levels,
+            overview_mode=overview_mode,
+            overview_statistic=overview_statistic,
+            full_resolution=not overviews_only,
+            crs=crs,
+            intermediate_format=intermediate_format,
+            fused=fused,
+            cache=cache,
+            report_dir=report_dir,
+            manifest=manifest_path,
+            retry_failed=retry_failed,
+            granules=granules,
+            executor=executor
+        )
+    for h4_file, error, _ in failed:
+        click.echo(f"✗ {h4_file}: {error}", err=True)
+    sys.exit(1 if failed else 0)
+
+
+@main.command("fetch-convert")
+@click.option("-o", "--output-dir", required=True, type=click.Path(file_okay=False),
+              help="Directory for COPC files")
+@click.option("--short-name", default=None,
+              help="Earthdata collection to search, e.g. CAL_LID_L3_Tropospheric_APro_AllSky-Standard-V4-20")
+@click.option("--temporal", nargs=2, default=None, metavar="START END",
+              help="Search period, e.g. 2019-01-01 2019-05-31")
+@click.option("--search-bbox", type=float, nargs=4, default=None,
+              help="Search area LON_MIN LAT_MIN LON_MAX LAT_MAX")
+@click.option("--count", type=int, default=None, help="Return at most this many granules from the Earthdata search")
+@click.option("--source-dir", type=click.Path(exists=True, file_okay=False), default=None,
+              help="Take granules from this local directory instead of Earthdata")
+@click.option("-p", "--pattern", default="*.hdf", show_default=True,
+              help="Glob pattern for --source-dir")
+@click.option("-d", "--download-dir", type=click.Path(file_okay=False), default=None,
+              help="Directory for downloaded granules (default: a scratch directory)")
+@click.option("-w", "--workers", type=int, default=None,
+              help="Number of conversion processes (default: number of CPUs)")
+@click.option("--download-threads", type=int, default=2, show_default=True,
+              help="Number of concurrent downloads")
+@click.option("--max-disk-gb", type=float, default=None,
+              help="Pause downloads while unconverted granules take more than this")
+@click.option("--max-pending", type=int, default=None,
+              help="Pause downloads while this many granules await conversion (default: 2 x workers)")
+@click.option("--keep-downloads", is_flag=True, help="Keep granules after conversion")
+@click.option("-v", "--variable", "variables", multiple=True, default=["var_to_grab"],
+              show_default=True, help="Name of variable to extract (repeat for several)")
+@click.option("--alt-units", default="km", type=click.Choice(["km", "m"]), show_default=True,
+              help="Altitude units in the input file")
+@click.option("--manifest", "manifest_path", type=click.Path(dir_okay=False), default=None,
+              help="SQLite job manifest (needs --download-dir); rerunning with it resumes")
+@click.option("--report-dir", type=click.Path(file_okay=False), default=None,
+              help="Write a per-granule timing/memory report (JSON) into this directory")
+@click.option("--overwrite", is_flag=True, help="Reconvert granules that are already converted")
+@click.option("--drop-fill", is_flag=True, help="Drop CALIPSO fill values (-9999) and NaN cells")
+@click.option("--min-value", type=float, default=None, help="Drop cells below this value")
+@click.option("--chunk-size", type=int, default=None,
+              help="Stream each granule in slabs of about this many cells")
+@click.option("--bbox", type=float, nargs=4, default=None,
+              help="Only convert cells inside LON_MIN LAT_MIN LON_MAX LAT_MAX")
+@click.option("--alt-range", type=float, nargs=2, default=None,
+              help="Only convert altitude levels between MIN MAX (file units, km)")
+@click.option("--auto-scale", is_flag=True,
+              help="Derive coordinate scales and offsets from the grid spacing (smaller output)")
+@click.option("--scheduler", default=None, metavar="ADDRESS",
+              help="Convert on a Dask cluster (e.g. tcp://host:8786; --download-dir and --output-dir "
+                   "must be on storage its workers see), or 'local' for a LocalCluster of --workers")
+@click.option("--retries", type=int, default=0, show_default=True,
+              help="Resubmit failed conversions up to this many times (to another worker with --scheduler)")
+def fetch_convert_command(output_dir, short_name, temporal, search_bbox, count, source_dir, pattern,
+                          download_dir, workers, download_threads, max_disk_gb, max_pending,
+                          keep_downloads, variables, alt_units, manifest_path, report_dir, overwrite,
+                          drop_fill, min_value, chunk_size, bbox, alt_range, auto_scale, scheduler, retries):
+    """Download granules and convert them to COPC while later ones are still downloading."""
+    if (source_dir is None) == (short_name is None):
+        raise click.UsageError("Give either --short-name (Earthdata) or --source-dir")
+    if source_dir is not None:
+        source = LocalSource(source_dir, pattern)
+    else:
+        source = EarthdataSource(short_name, temporal, search_bbox, count)
+    with make_executor(scheduler, workers, retries) as executor:
+        successful, failed = fetch_convert(
+            source,
+            output_dir,
+            download_dir=download_dir,
+            workers=workers,
+            download_threads=download_threads,
+            max_disk_gb=max_disk_gb,
+            max_pending=max_pending,
+            keep_downloads=keep_downloads,
+            skip_existing=not overwrite,
+            manifest=manifest_path,
+            report_dir=report_dir,
+            executor=executor,
+            altitude_units=alt_units,
+            variable_names=list(variables),
+            fill_values=CALIPSO_FILL_VALUES if drop_fill else None,
+            drop_nan=drop_fill,
+            min_value=min_value,
+            chunk_size=chunk_size,
+            bbox=bbox,
+            alt_range=alt_range,
+            auto_scale=auto_scale
+        )
+    for h4_file, error, _ in failed:
+        click.echo(f"✗ {h4_file}: {error}", err=True)
+    sys.exit(1 if failed else 0)
+
+
+@main.command("stack")
+@click.argument("granules", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option("-o", "--output", required=True, type=click.Path(dir_okay=False),
+              help="Path of the stacked COPC file")
+@click.option("-v", "--variable", "variables", multiple=True, default=["var_to_grab"],
+              show_default=True, help="Name of variable to extract (repeat for several)")
+@click.option("--time-dimension", default="GpsTime", show_default=True,
+              help="GpsTime, or the name of a float64 extra dimension holding POSIX seconds")
+@click.option("--alt-units", default="km", type=click.Choice(["km", "m"]), show_default=True,
+              help="Altitude units in the input files")
+@click.option("--reader", default="pyhdf", type=click.Choice(["pyhdf", "h4toh5"]), show_default=True,
+              help="Backend used to read the HDF4 files")
+@click.option("--drop-fill", is_flag=True, help="Drop CALIPSO fill values (-9999) and NaN cells")
+@click.option("--min-value", type=float, default=None, help="Drop cells below this value")
+@click.option("--chunk-size", type=int, default=None,
+              help="Stream each granule in slabs of about this many cells")
+@click.option("--bbox", type=float, nargs=4, default=None,
+              help="Only convert cells inside LON_MIN LAT_MIN LON_MAX LAT_MAX")
+@click.option("--alt-range", type=float, nargs=2, default=None,
+              help="Only convert altitude levels between MIN MAX (file units, km)")
+def stack_command(granules, output, variables, time_dimension, alt_units, reader,
+                  drop_fill, min_value, chunk_size, bbox, alt_range):
+    """Stack GRANULES into one COPC file with a time dimension taken from their names."""
+    stack_to_copc(
+        granules,
+        output,
+        altitude_units=alt_units,
+        variable_names=list(variables),
+        time_dimension=time_dimension,
+        reader=reader,
+        fill_values=CALIPSO_FILL_VALUES if drop_fill else None,
+        drop_nan=drop_fill,
+        min_value=min_value,
+        chunk_size=chunk_size,
+        bbox=bbox,
+        alt_range=alt_range
+    )
+
+
+@main.command("query")
+@click.argument("copc_file", type=click.Path(exists=True, dir_okay=False))
+@click.option("--bbox", type=float, nargs=4, default=None,
+              help="Only points inside LON_MIN LAT_MIN LON_MAX LAT_MAX")
+@click.option("--alt-range", type=float, nargs=2, default=None,
+              help="Only points with altitudes between MIN MAX (point cloud units, m)")
+@click.option("--column", type=float, nargs=2, default=None, metavar="LON LAT",
+              help="Vertical profile of the grid column nearest to LON LAT instead of a box")
+@click.option("--radius", type=float, default=DEFAULT_COLUMN_RADIUS, show_default=True,
+              help="Search radius of --column in degrees")
+@click.option("--max-level", type=int, default=None,
+              help="Deepest octree level to read, for a thinned preview")
+@click.option("--overview-level", type=int, default=None,
+              help="Only points of this overview level (0 = full resolution), from the tagged file "
+                   "or its .overview<k>.copc.laz file")
+@click.option("-o", "--output", type=click.Path(dir_okay=False), default=None,
+              help="Save the points as .npy, .parquet or .txt (default: print a summary)")
+def query_command(copc_file, bbox, alt_range, column, radius, max_level, overview_level, output):
+    """Extract the points of COPC_FILE in a box or vertical column, reading only the nodes needed."""
+    copc_file, overview_level = resolve_overview(copc_file, overview_level)
+    with CopcQuery(copc_file) as query:
+        try:
+            if column is not None:
+                points = query.column(*column, radius, alt_range, max_level, overview_level)
+            else:
+                points = query.box(bbox, alt_range, max_level, overview_level)
+        except ValueError as e:
+            raise click.UsageError(str(e))
+    
+    if output is None:
+        click.echo(f"{len(points):,} points")
+        for name in points.dtype.names if len(points) else []:
+            click.echo(f"  {name}: {points[name].min():g} .. {points[name].max():g}")
+        return
+    suffix = Path(output).suffix
+    if suffix == ".npy":
+        points_to_npy(points, output, coord_dtype="float64")
+    elif suffix == ".parquet":
+        points_to_parquet(points, output, coord_dtype="float64")
+    elif suffix == ".txt":
+        points_to_txt(points, output)
+    else:
+        raise click.UsageError(f"Unsupported output format '{suffix}'; use .npy, .parquet or .txt")
+    click.echo(f"Saved {len(points):,} points to {output}")
+
+
+@main.command("catalog")
+@click.argument("catalog_path", type=click.Path(dir_okay=False))
+@click.argument("directories", nargs=-1, type=click.Path(exists=True, file_okay=False))
+@click.option("-p", "--pattern", default="*.hdf", show_default=True,
+              help="Glob pattern for finding granules in DIRECTORIES")
+@click.option("--start", default=None, help="Only list granules covering this date or later")
+@click.option("--end", default=None, help="Only list granules covering this date or earlier")
+@click.option("--bbox", type=float, nargs=4, default=None,
+              help="Only list granules whose grid overlaps LON_MIN LAT_MIN LON_MAX LAT_MAX")
+@click.option("-v", "--variable", "variables", multiple=True,
+              help="Only list granules containing this variable (repeat for several)")
+@click.option("--product", default=None, help="Only list granules of this product")
+def catalog_command(catalog_path, directories, pattern, start, end, bbox, variables, product):
+    """Index the granules of DIRECTORIES in CATALOG_PATH and list a selection of them."""
+    catalog = GranuleCatalog(catalog_path)
+    for directory in directories:
+        catalog.update(directory, pattern)
+    if start or end or bbox or variables or product:
+        for path in catalog.select(start, end, bbox, variables=list(variables), product=product):
+            click.echo(str(path))
+    else:
+        for product_name, count in sorted(catalog.summary().items(), key=lambda item: str(item[0])):
+            click.echo(f"{product_name or 'unreadable'}: {count}")
+
+
+@main.command("status")
+@click.argument("manifest_path", type=click.Path(exists=True, dir_okay=False))
+def status_command(manifest_path):
+    """Show the granule counts and failures recorded in a batch job manifest."""
+    manifest = JobManifest(manifest_path)
+    for status, count in sorted(manifest.summary().items()):
+        click.echo(f"{status}: {count}")
+    for row in manifest.failed():
+        click.echo(f"✗ {row['input_path']} (attempts: {row['attempts']}): {row['error']}")
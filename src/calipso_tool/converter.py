@@ -1,26 +1,159 @@
+import logging
+import itertools
+import os
+from contextlib import contextmanager
 from importlib import resources
 import subprocess
+import time
+import numpy as np
 from pathlib import Path
-from typing import Optional, Union
-from .h5_to_txt import h5_to_txt
+from typing import Iterator, Optional, Sequence, Union
+from .h5_to_txt import (
+    h5_to_txt, open_h5_grid, iter_grid_points, points_to_txt,
+    report_point_counts, resolve_variable_names
+)
+from .cache import ArtifactCache, file_sha256
+from .instrument import RESET_PEAK_ENV, RunReport, track_stage
+from .manifest import JobManifest
+from .workspace import publish, scratch_dir
+from .scaling import grid_scaling
+from .reproject import check_reprojection, projected_scaling
+from .masking import CALIPSO_FILL_VALUES, filtering_requested, qc_variable_names
+from .h5_to_las import h5_to_las, points_to_las
+from .h5_to_columnar import COLUMNAR_FORMATS, h5_to_npy, h5_to_parquet, points_to_npy, points_to_parquet
+from .h4_reader import HDF4_READERS, read_h4_grid
 from .txt_to_las import txt_to_las, txt_to_las_with_json
-from .las_to_copc import las_to_copc_pipeline
+from .las_to_copc import las_to_copc_pipeline, points_to_copc, txt_to_copc
+from .overview import (
+    DEFAULT_BLOCK, OVERVIEW_MODES, combined_scaling, overview_grids, overview_path, overview_points,
+    tag_level
+)
 
-def h4_to_h5(in_h4: Path, out_h5: Path):
+logger = logging.getLogger(__name__)
+
+# Suffix of the text_stage intermediate file for each intermediate_format
+INTERMEDIATE_SUFFIXES = {"txt": ".txt", **COLUMNAR_FORMATS}
+
+# Writer of the text_stage intermediate file for each intermediate_format
+INTERMEDIATE_WRITERS = {
+    "txt": points_to_txt,
+    "npy": points_to_npy,
+    "parquet": points_to_parquet,
+}
+
+
+def h4_to_h5(
+    in_h4: Path,
+    out_h5: Path,
+    cache: Optional[ArtifactCache] = None,
+    report: Optional[RunReport] = None
+):
+    if cache is not None:
+        cache_key = cache.key(in_h4, "h4_to_h5")
+        if cache.fetch(cache_key, out_h5):
+            return out_h5
     # locate the vendored binary
     bin_path = Path(resources.files("calipso_tool") / "bin" / "h4toh5convert")
-    subprocess.run([str(bin_path), str(in_h4), str(out_h5)], check=True)
+    with track_stage(report, "h4_to_h5", in_h4, out_h5):
+        subprocess.run([str(bin_path), str(in_h4), str(out_h5)], check=True)
+    if cache is not None:
+        cache.store(cache_key, out_h5)
     return out_h5
 
+@contextmanager
+def open_h4_grid_with(
+    input_h4: Union[str, Path],
+    variable_names: Union[str, Sequence[str]] = "var_to_grab",
+    reader: str = "pyhdf",
+    h5_file: Optional[Union[str, Path]] = None,
+    cache: Optional[ArtifactCache] = None,
+    report: Optional[RunReport] = None,
+    bbox: Optional[Sequence[float]] = None,
+    alt_range: Optional[Sequence[float]] = None
+) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray, dict]]:
+    """
+    Open the grid of an HDF4 file with the selected reader backend.
+    
+    Yields the 1D latitude, longitude and altitude midpoints and the variables
+    as lazy datasets that can be sliced along the latitude axis.
+    
+    Parameters:
+    -----------
+    input_h4 : str or Path
+        Path to input HDF4 file
+    variable_names : str or list of str, default="var_to_grab"
+        Name(s) of the variables to extract
+    reader : str, default="pyhdf"
+        "h4toh5" converts the whole granule with the vendored binary and reads
+        the HDF5 copy; any key of HDF4_READERS reads the HDF4 file directly
+    h5_file : str or Path, optional
+        Path of the intermediate HDF5 file for the "h4toh5" reader. If None,
+        uses same name as input with .h5 extension
+    cache : ArtifactCache, optional
+        Reuse a previous HDF5 conversion of the same granule (h4toh5 reader only)
+    report : RunReport, optional
+        Records the h4toh5 conversion stage
+    bbox : sequence of float, optional
+        (lon_min, lat_min, lon_max, lat_max) in degrees; only the selected
+        hyperslab of each variable is read
+    alt_range : sequence of float, optional
+        (min, max) altitude in the file's units (km for CALIPSO)
+    """
+    input_h4 = Path(input_h4)
+    
+    if reader == "h4toh5":
+        h5_file = input_h4.with_suffix('.h5') if h5_file is None else Path(h5_file)
+        h4_to_h5(input_h4, h5_file, cache, report)
+        logger.info(f"  ✓ Created: {h5_file}")
+        opener = open_h5_grid(h5_file, variable_names, bbox, alt_range)
+    elif reader in HDF4_READERS:
+        opener = HDF4_READERS[reader](input_h4, variable_names, bbox, alt_range)
+    else:
+        raise ValueError(f"Unknown reader '{reader}'. "
+                         f"Available readers: {['h4toh5', *HDF4_READERS]}")
+    
+    with opener as grid:
+        yield grid
+
+def read_h4_grid_with(
+    input_h4: Union[str, Path],
+    variable_names: Union[str, Sequence[str]] = "var_to_grab",
+    reader: str = "pyhdf",
+    h5_file: Optional[Union[str, Path]] = None
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, dict[str, np.ndarray]]:
+    """
+    Read the grid arrays from an HDF4 file with the selected reader backend.
+    
+    See open_h4_grid_with for the parameters.
+    
+    Returns:
+    --------
+    tuple[np.ndarray, np.ndarray, np.ndarray, dict[str, np.ndarray]]
+        Latitude, longitude and altitude midpoints, and the variable data keyed by name
+    """
+    with open_h4_grid_with(input_h4, variable_names, reader, h5_file) as (lat1d, lon1d, alt1d, datasets):
+        variables = {name: np.asarray(ds[:]) for name, ds in datasets.items()}
+    
+    return lat1d, lon1d, alt1d, variables
+
 def h4_to_txt(
     input_h4: Union[str, Path],
     output_txt: Optional[Union[str, Path]] = None,
     variable_name: str = "var_to_grab",
     altitude_units: str = "km",
-    keep_h5: bool = True
+    keep_h5: bool = True,
+    reader: str = "pyhdf",
+    variable_names: Optional[Sequence[str]] = None,
+    fill_values: Optional[Sequence[float]] = None,
+    drop_nan: bool = False,
+    min_value: Optional[float] = None,
+    qc_thresholds: Optional[dict[str, float]] = None,
+    chunk_size: Optional[int] = None,
+    cache: Optional[ArtifactCache] = None,
+    report: Optional[RunReport] = None
 ) -> tuple[Path, Optional[Path]]:
     """
-    Chain conversion from HDF4 to HDF5 to text format.
+    Chain conversion from HDF4 to text format.
     
     Parameters:
     -----------
@@ -33,7 +166,27 @@ def h4_to_txt(
     altitude_units : str, default="km"
         Units of altitude in the HDF5 file. If "km", will convert to meters.
     keep_h5 : bool, default=True
-        Whether to keep the intermediate HDF5 file
+        Whether to keep the intermediate HDF5 file (only written by the "h4toh5" reader)
+    reader : str, default="pyhdf"
+        Backend used to read the HDF4 file (see open_h4_grid_with)
+    variable_names : list of str, optional
+        Names of several variables to extract in one pass, one column each.
+        Overrides variable_name when given.
+    fill_values : sequence of float, optional
+        Values marking empty cells to drop, e.g. masking.CALIPSO_FILL_VALUES
+    drop_nan : bool, default=False
+        Whether to drop NaN cells
+    min_value : float, optional
+        Drop cells whose values are all below this cutoff
+    qc_thresholds : dict[str, float], optional
+        Minimum accepted value per QC variable (read from the same file)
+    chunk_size : int, optional
+        Stream the grid in latitude slabs of about this many cells instead of
+        reading whole variables into memory
+    cache : ArtifactCache, optional
+        Reuse a previous HDF5 conversion of the same granule (h4toh5 reader only)
+    report : RunReport, optional
+        Records wall time, peak memory, bytes in/out and throughput of each stage
     
     Returns:
     --------
@@ -41,9 +194,10 @@ def h4_to_txt(
         Paths to the created text file and HDF5 file (if kept)
     """
     input_h4 = Path(input_h4)
+    variable_names = resolve_variable_names(variable_name, variable_names)
     
     # Generate intermediate HDF5 filename
-    h5_file = input_h4.with_suffix('.h5')
+    h5_file = input_h4.with_suffix('.h5') if reader == "h4toh5" else None
     
     # Generate output text filename if not provided
     if output_txt is None:
@@ -51,29 +205,31 @@ def h4_to_txt(
     else:
         output_txt = Path(output_txt)
     
-    print(f"Step 1: Converting HDF4 to HDF5...")
+    logger.info(f"Step 1: Converting HDF4 ({reader}) to text...")
+    stats = {}
     try:
-        h4_to_h5(input_h4, h5_file)
-        print(f"  ✓ Created: {h5_file}")
+        read_names = qc_variable_names(variable_names, qc_thresholds)
+        with open_h4_grid_with(input_h4, read_names, reader, h5_file, cache, report) as grid:
+            with track_stage(report, "hdf4_to_txt", input_h4, output_txt) as record:
+                chunks = iter_grid_points(
+                    *grid, variable_names, altitude_units, chunk_size,
+                    fill_values, drop_nan, min_value, qc_thresholds, stats
+                )
+                points_to_txt(chunks, output_txt)
+                record["points"] = stats["retained"]
+        report_point_counts(stats, filtering_requested(fill_values, drop_nan, min_value, qc_thresholds))
+        logger.info(f"  ✓ Created: {output_txt}")
     except Exception as e:
-        print(f"  ✗ HDF4 to HDF5 conversion failed: {e}")
-        raise
-    
-    print(f"\nStep 2: Converting HDF5 to text...")
-    try:
-        h5_to_txt(h5_file, output_txt, variable_name, altitude_units)
-        print(f"  ✓ Created: {output_txt}")
-    except Exception as e:
-        print(f"  ✗ HDF5 to text conversion failed: {e}")
+        logger.error(f"  ✗ HDF4 to text conversion failed: {e}")
         # Clean up HDF5 file if conversion failed
-        if h5_file.exists() and not keep_h5:
+        if h5_file is not None and h5_file.exists() and not keep_h5:
             h5_file.unlink()
         raise
     
     # Remove intermediate HDF5 file if requested
-    if not keep_h5 and h5_file.exists():
+    if h5_file is not None and not keep_h5 and h5_file.exists():
         h5_file.unlink()
-        print(f"\n  Removed intermediate file: {h5_file}")
+        logger.info(f"\n  Removed intermediate file: {h5_file}")
         return output_txt, None
     
     return output_txt, h5_file
@@ -82,12 +238,18 @@ def txt_to_las_pipeline(
     input_txt: Union[str, Path],
     output_las: Optional[Union[str, Path]] = None,
     variable_name: str = "var_to_grab",
-    pipeline_json: Optional[Union[str, Path]] = None
+    pipeline_json: Optional[Union[str, Path]] = None,
+    variable_names: Optional[Sequence[str]] = None,
+    cache: Optional[ArtifactCache] = None,
+    report: Optional[RunReport] = None,
+    scaling: Optional[Union[str, dict]] = None
 ) -> Path:
     """
-    Convert text file to LAS format using PDAL pipeline.
+    Convert text (or NPY/Parquet) file to LAS format using PDAL pipeline.
     
     This is a convenience wrapper that automatically finds the pipeline JSON.
+    With scaling (see txt_to_las) the pipeline is always built programmatically,
+    since the JSON fixes its own scales.
     """
     input_txt = Path(input_txt)
     
@@ -95,14 +257,16 @@ def txt_to_las_pipeline(
         output_las = input_txt.with_suffix('.las')
     
     # Try to find pipeline JSON if not provided
-    if pipeline_json is None:
+    if pipeline_json is None and scaling is None:
         # Look for h5tolas.json relative to this file
         pipeline_json = Path(__file__).parent.parent / "pdal_pipeline" / "h5tolas.json"
         if pipeline_json.exists():
-            return txt_to_las_with_json(input_txt, output_las, variable_name, pipeline_json)
+            return txt_to_las_with_json(input_txt, output_las, variable_name, pipeline_json,
+                                        variable_names=variable_names, cache=cache, report=report)
     
     # Fall back to programmatic approach
-    return txt_to_las(input_txt, output_las, variable_name)
+    return txt_to_las(input_txt, output_las, variable_name, variable_names=variable_names,
+                      cache=cache, report=report, scaling=scaling)
 
 
 def h4_to_las(
@@ -110,10 +274,35 @@ def h4_to_las(
     output_las: Optional[Union[str, Path]] = None,
     variable_name: str = "var_to_grab",
     altitude_units: str = "km",
-    keep_intermediates: bool = False
+    keep_intermediates: bool = False,
+    text_stage: bool = False,
+    reader: str = "pyhdf",
+    work_dir: Optional[Union[str, Path]] = None,
+    variable_names: Optional[Sequence[str]] = None,
+    fill_values: Optional[Sequence[float]] = None,
+    drop_nan: bool = False,
+    min_value: Optional[float] = None,
+    qc_thresholds: Optional[dict[str, float]] = None,
+    chunk_size: Optional[int] = None,
+    intermediate_format: str = "txt",
+    bbox: Optional[Sequence[float]] = None,
+    alt_range: Optional[Sequence[float]] = None,
+    auto_scale: bool = False,
+    crs: Optional[str] = None,
+    cache: Optional[ArtifactCache] = None,
+    report: Optional[RunReport] = None
 ) -> tuple[Path, Optional[Path], Optional[Path]]:
     """
-    Complete pipeline: HDF4 → HDF5 → Text → LAS
+    Complete pipeline: HDF4 → LAS
+    
+    By default the grid is read straight from the HDF4 file and the LAS file
+    is written directly from the arrays. Set reader="h4toh5" to go through an
+    intermediate HDF5 copy, and text_stage=True to go through an
+    intermediate point file read back by PDAL (space-delimited text by
+    default, or NPY/Parquet via intermediate_format).
+    
+    Intermediates never touch the input's directory, and the LAS file is
+    written under a temporary name and renamed into place once complete.
     
     Parameters:
     -----------
@@ -126,7 +315,49 @@ def h4_to_las(
     altitude_units : str, default="km"
         Units of altitude in the HDF5 file. If "km", will convert to meters.
     keep_intermediates : bool, default=False
-        Whether to keep intermediate HDF5 and text files
+        Whether to keep intermediate HDF5 and text files (in the scratch directory)
+    text_stage : bool, default=False
+        Whether to write the intermediate point file and convert it with PDAL
+    reader : str, default="pyhdf"
+        Backend used to read the HDF4 file (see open_h4_grid_with)
+    work_dir : str or Path, optional
+        Directory for intermediate files. If None, a private scratch directory
+        is created under $CALIPSO_SCRATCH_DIR (or the system temp directory)
+        and removed afterwards unless keep_intermediates is set
+    variable_names : list of str, optional
+        Names of several variables to extract in one pass, one extra dimension
+        each. Overrides variable_name when given.
+    fill_values : sequence of float, optional
+        Values marking empty cells to drop, e.g. masking.CALIPSO_FILL_VALUES
+    drop_nan : bool, default=False
+        Whether to drop NaN cells
+    min_value : float, optional
+        Drop cells whose values are all below this cutoff
+    qc_thresholds : dict[str, float], optional
+        Minimum accepted value per QC variable (read from the same file)
+    chunk_size : int, optional
+        Stream the grid in latitude slabs of about this many cells instead of
+        reading whole variables into memory
+    intermediate_format : str, default="txt"
+        Format of the text_stage file: "txt", "npy" or "parquet"
+    bbox : sequence of float, optional
+        (lon_min, lat_min, lon_max, lat_max) in degrees; only grid cells whose
+        midpoints fall inside are read from disk
+    alt_range : sequence of float, optional
+        (min, max) altitude in the file's units (km for CALIPSO), e.g. (-0.5, 10)
+    auto_scale : bool, default=False
+        Derive scales and offsets from the (subset) grid spacing so stored
+        coordinates count grid cells (see scaling.grid_scaling)
+    crs : str, optional
+        Write points in this CRS instead of lon/lat/altitude (EPSG:4326), e.g.
+        "EPSG:4978" (ECEF) for 3D viewers or a projected CRS. The 1D midpoints
+        are transformed once per slab (see reproject.grid_coordinates) and
+        coordinates are stored at 1 cm. Not available with text_stage or auto_scale
+    cache : ArtifactCache, optional
+        Artifact cache consulted for the final LAS file and every intermediate
+        stage, so only stages whose inputs or options changed are recomputed
+    report : RunReport, optional
+        Records wall time, peak memory, bytes in/out and throughput of each stage
     
     Returns:
     --------
@@ -134,56 +365,94 @@ def h4_to_las(
         Paths to LAS file, HDF5 file (if kept), and text file (if kept)
     """
     input_h4 = Path(input_h4)
-    
-    # Generate intermediate filenames
-    h5_file = input_h4.with_suffix('.h5')
-    txt_file = input_h4.with_suffix('.txt')
+    variable_names = resolve_variable_names(variable_name, variable_names)
     
     if output_las is None:
         output_las = input_h4.with_suffix('.las')
     else:
         output_las = Path(output_las)
+    check_reprojection(crs, text_stage, auto_scale)
     
-    try:
-        # Step 1: HDF4 to HDF5
-        print("Step 1: Converting HDF4 to HDF5...")
-        h4_to_h5(input_h4, h5_file)
-        print(f"  ✓ Created: {h5_file}")
-        
-        # Step 2: HDF5 to Text
-        print(f"\\nStep 2: Converting HDF5 to text...")
-        h5_to_txt(h5_file, txt_file, variable_name, altitude_units)
-        print(f"  ✓ Created: {txt_file}")
+    if cache is not None:
+        cache_key = cache.key(
+            input_h4, "h4_to_las", variable_names=variable_names, altitude_units=altitude_units,
+            fill_values=fill_values, drop_nan=drop_nan, min_value=min_value,
+            qc_thresholds=qc_thresholds, bbox=bbox, alt_range=alt_range, auto_scale=auto_scale,
+            crs=crs, reader=reader, chunk_size=chunk_size,
+            # Each intermediate format quantizes coordinates its own way
+            intermediate_format=intermediate_format if text_stage else None
+        )
+        if cache.fetch(cache_key, output_las):
+            logger.info(f"✓ Cache hit: {output_las}")
+            return output_las, None, None
+    
+    with scratch_dir(work_dir, f"{input_h4.stem}_", keep_intermediates) as scratch:
+        # Generate intermediate filenames
+        stem = scratch / input_h4.name
+        h5_file = stem.with_suffix('.h5') if reader == "h4toh5" else None
+        txt_file = stem.with_suffix(INTERMEDIATE_SUFFIXES[intermediate_format]) if text_stage else None
         
-        # Step 3: Text to LAS
-        print(f"\\nStep 3: Converting text to LAS...")
-        txt_to_las_pipeline(txt_file, output_las, variable_name)
-        print(f"  ✓ Created: {output_las}")
+        try:
+            # Step 1: HDF4 grid to LAS (or text), streamed slab by slab
+            stats = {}
+            read_names = qc_variable_names(variable_names, qc_thresholds)
+            created_format = intermediate_format if text_stage else "LAS"
+            created = txt_file if text_stage else output_las
+            with open_h4_grid_with(input_h4, read_names, reader, h5_file, cache, report,
+                                   bbox, alt_range) as grid:
+                if crs is not None:
+                    scaling = projected_scaling()
+                else:
+                    scaling = grid_scaling(*grid[:3], altitude_units) if auto_scale else None
+                with track_stage(report, f"hdf4_to_{created_format.lower()}", input_h4, created) as record:
+                    chunks = iter_grid_points(
+                        *grid, variable_names, altitude_units, chunk_size,
+                        fill_values, drop_nan, min_value, qc_thresholds, stats, crs
+                    )
+                    logger.info(f"Step 1: Converting HDF4 ({reader}) to {created_format}...")
+                    if text_stage:
+                        INTERMEDIATE_WRITERS[intermediate_format](chunks, txt_file)
+                    else:
+                        with publish(output_las) as tmp_las:
+                            points_to_las(chunks, tmp_las, srs=crs or "EPSG:4326", scaling=scaling)
+                    record["points"] = stats["retained"]
+            report_point_counts(stats, filtering_requested(fill_values, drop_nan, min_value, qc_thresholds))
+            logger.info(f"  ✓ Created: {created}")
+            
+            if text_stage:
+                # Step 2: Intermediate file to LAS
+                logger.info(f"\nStep 2: Converting {intermediate_format} to LAS...")
+                with publish(output_las) as tmp_las:
+                    txt_to_las_pipeline(txt_file, tmp_las, variable_names=variable_names,
+                                        cache=cache, report=report, scaling=scaling)
+                logger.info(f"  ✓ Created: {output_las}")
+            
+            if cache is not None:
+                cache.store(cache_key, output_las)
+            
+        except Exception as e:
+            logger.error(f"\n✗ Pipeline failed: {e}")
+            # Clean up any intermediate files on failure
+            if not keep_intermediates:
+                for f in [h5_file, txt_file]:
+                    if f is not None and f.exists():
+                        f.unlink()
+            raise
         
-    except Exception as e:
-        print(f"\\n✗ Pipeline failed: {e}")
-        # Clean up any intermediate files on failure
+        # Clean up intermediate files if requested
         if not keep_intermediates:
-            for f in [h5_file, txt_file]:
-                if f.exists():
-                    f.unlink()
-        raise
-    
-    # Clean up intermediate files if requested
-    if not keep_intermediates:
-        files_to_remove = []
-        if h5_file.exists():
-            h5_file.unlink()
-            files_to_remove.append(h5_file)
-            h5_file = None
-        if txt_file.exists():
-            txt_file.unlink()
-            files_to_remove.append(txt_file)
-            txt_file = None
-        if files_to_remove:
-            print(f"\\nCleaned up intermediate files: {', '.join(str(f) for f in files_to_remove)}")
-    
-    return output_las, h5_file, txt_file
+            files_to_remove = []
+            if h5_file is not None and h5_file.exists():
+                h5_file.unlink()
+                files_to_remove.append(h5_file)
+            if txt_file is not None and txt_file.exists():
+                txt_file.unlink()
+                files_to_remove.append(txt_file)
+            h5_file = txt_file = None
+            if files_to_remove:
+                logger.info(f"\nCleaned up intermediate files: {', '.join(str(f) for f in files_to_remove)}")
+        
+        return output_las, h5_file, txt_file
 
 
 def h4_to_copc(
@@ -191,10 +460,47 @@ def h4_to_copc(
     output_copc: Optional[Union[str, Path]] = None,
     variable_name: str = "var_to_grab",
     altitude_units: str = "km",
-    keep_intermediates: bool = False
+    keep_intermediates: bool = False,
+    text_stage: bool = False,
+    reader: str = "pyhdf",
+    work_dir: Optional[Union[str, Path]] = None,
+    variable_names: Optional[Sequence[str]] = None,
+    fill_values: Optional[Sequence[float]] = None,
+    drop_nan: bool = False,
+    min_value: Optional[float] = None,
+    qc_thresholds: Optional[dict[str, float]] = None,
+    chunk_size: Optional[int] = None,
+    intermediate_format: str = "txt",
+    fused: bool = True,
+    bbox: Optional[Sequence[float]] = None,
+    alt_range: Optional[Sequence[float]] = None,
+    auto_scale: bool = False,
+    overview_levels: int = 0,
+    overview_mode: str = "files",
+    overview_statistic: str = "mean",
+    overview_block: Sequence[int] = DEFAULT_BLOCK,
+    full_resolution: bool = True,
+    crs: Optional[str] = None,
+    cache: Optional[ArtifactCache] = None,
+    report: Optional[RunReport] = None
 ) -> tuple[Path, Optional[Path], Optional[Path], Optional[Path], Optional[Path]]:
     """
-    Complete pipeline: HDF4 → HDF5 → Text → LAS → COPC
+    Complete pipeline: HDF4 → COPC
+    
+    By default (fused=True) the points, or the text_stage file, go straight
+    into PDAL's writers.copc in a single pipeline and no LAS file is written.
+    Set fused=False to write an intermediate LAS file first
+    (HDF4 → LAS → COPC). Set reader="h4toh5" to go through an intermediate
+    HDF5 copy and text_stage=True to route through the intermediate text file.
+    
+    Intermediates never touch the input's directory, and the COPC file is
+    written under a temporary name and renamed into place once complete.
+    
+    With overview_levels, coarser block-aggregated copies of the grid (see
+    overview.overview_grids) are written next to the output as
+    <granule>.overview<k>.copc.laz (overview_mode="files") or into the output
+    itself with an OverviewLevel dimension (overview_mode="tagged"), so
+    viewers can draw a global view from a few percent of the points.
     
     Parameters:
     -----------
@@ -207,7 +513,64 @@ def h4_to_copc(
     altitude_units : str, default="km"
         Units of altitude in the HDF5 file. If "km", will convert to meters.
     keep_intermediates : bool, default=False
-        Whether to keep intermediate files (HDF5, text, LAS)
+        Whether to keep intermediate files (HDF5, text, LAS) in the scratch directory
+    text_stage : bool, default=False
+        Whether to write the intermediate point file and convert it with PDAL
+    reader : str, default="pyhdf"
+        Backend used to read the HDF4 file (see open_h4_grid_with)
+    work_dir : str or Path, optional
+        Directory for intermediate files. If None, a private scratch directory
+        is created under $CALIPSO_SCRATCH_DIR (or the system temp directory)
+        and removed afterwards unless keep_intermediates is set
+    variable_names : list of str, optional
+        Names of several variables to extract in one pass, one extra dimension
+        each. Overrides variable_name when given.
+    fill_values : sequence of float, optional
+        Values marking empty cells to drop, e.g. masking.CALIPSO_FILL_VALUES
+    drop_nan : bool, default=False
+        Whether to drop NaN cells
+    min_value : float, optional
+        Drop cells whose values are all below this cutoff
+    qc_thresholds : dict[str, float], optional
+        Minimum accepted value per QC variable (read from the same file)
+    chunk_size : int, optional
+        Stream the grid in latitude slabs of about this many cells instead of
+        reading whole variables into memory. The fused pipeline then passes
+        the slabs through a scratch LAS file (see points_to_copc); PDAL's
+        writers.copc still holds the whole point cloud to build the octree
+    intermediate_format : str, default="txt"
+        Format of the text_stage file: "txt", "npy" or "parquet"
+    fused : bool, default=True
+        Convert to COPC in one PDAL pipeline without materializing a LAS file
+    bbox : sequence of float, optional
+        (lon_min, lat_min, lon_max, lat_max) in degrees; only grid cells whose
+        midpoints fall inside are read from disk
+    alt_range : sequence of float, optional
+        (min, max) altitude in the file's units (km for CALIPSO), e.g. (-0.5, 10)
+    auto_scale : bool, default=False
+        Derive scales and offsets from the (subset) grid spacing so stored
+        coordinates count grid cells (see scaling.grid_scaling)
+    overview_levels : int, default=0
+        Number of overview levels to write (fused pipeline without text_stage only)
+    overview_mode : str, default="files"
+        "files" writes one COPC file per level, "tagged" adds the levels to the
+        output and tags every point with its level (0 = full resolution)
+    overview_statistic : str, default="mean"
+        Block statistic of the overview levels, "mean" or "max"; fill values
+        (CALIPSO's unless fill_values is given), NaN and values below min_value are excluded
+    overview_block : sequence of int, default=(2, 2, 4)
+        Cells per block along latitude, longitude and altitude at level 1
+    full_resolution : bool, default=True
+        Write the full-resolution points. False (tagged mode only) writes a
+        lightweight COPC file holding only the overview levels
+    crs : str, optional
+        Write points (and overviews) in this CRS instead of lon/lat/altitude,
+        e.g. "EPSG:4978" (ECEF) for 3D viewers (see h4_to_las)
+    cache : ArtifactCache, optional
+        Artifact cache consulted for the final COPC file and every intermediate
+        stage, so only stages whose inputs or options changed are recomputed
+    report : RunReport, optional
+        Records wall time, peak memory, bytes in/out and throughput of each stage
     
     Returns:
     --------
@@ -215,71 +578,397 @@ def h4_to_copc(
         Paths to COPC file, HDF5 file (if kept), text file (if kept), LAS file (if kept)
     """
     input_h4 = Path(input_h4)
-    
-    # Generate intermediate filenames
-    h5_file = input_h4.with_suffix('.h5')
-    txt_file = input_h4.with_suffix('.txt')
-    las_file = input_h4.with_suffix('.las')
+    variable_names = resolve_variable_names(variable_name, variable_names)
     
     if output_copc is None:
         output_copc = input_h4.parent / f"{input_h4.stem}.copc.laz"
     else:
         output_copc = Path(output_copc)
     
-    try:
-        # Step 1-3: HDF4 → HDF5 → Text → LAS
-        print("Running HDF4 → LAS pipeline...")
-        las_result, h5_kept, txt_kept = h4_to_las(
-            input_h4, 
-            las_file, 
-            variable_name, 
-            altitude_units, 
-            keep_intermediates=True  # Keep for now, clean up later
+    if overview_levels:
+        if overview_mode not in OVERVIEW_MODES:
+            raise ValueError(f"Unknown overview_mode '{overview_mode}'. Available modes: {list(OVERVIEW_MODES)}")
+        if text_stage or not fused:
+            raise ValueError("Overview levels are built by the fused pipeline; "
+                             "use fused=True without text_stage")
+    if not full_resolution and (not overview_levels or overview_mode != "tagged"):
+        raise ValueError("full_resolution=False needs overview_levels with overview_mode='tagged'")
+    check_reprojection(crs, text_stage, auto_scale)
+    srs = crs or "EPSG:4326"
+    overview_files = [overview_path(output_copc, level) for level in range(1, overview_levels + 1)]
+    if overview_mode == "tagged":
+        overview_files = []
+    
+    if cache is not None:
+        cache_key = cache.key(
+            input_h4, "h4_to_copc", variable_names=variable_names, altitude_units=altitude_units,
+            fill_values=fill_values, drop_nan=drop_nan, min_value=min_value,
+            qc_thresholds=qc_thresholds, bbox=bbox, alt_range=alt_range, auto_scale=auto_scale,
+            overview_levels=overview_levels, overview_mode=overview_mode,
+            overview_statistic=overview_statistic, overview_block=list(overview_block),
+            full_resolution=full_resolution, crs=crs, reader=reader, chunk_size=chunk_size, fused=fused,
+            # Each intermediate format quantizes coordinates its own way
+            intermediate_format=intermediate_format if text_stage else None
         )
+        overview_keys = [f"{cache_key}-overview{level}" for level in range(1, len(overview_files) + 1)]
+        if cache.fetch(cache_key, output_copc) and all(
+            cache.fetch(key, path) for key, path in zip(overview_keys, overview_files)
+        ):
+            logger.info(f"✓ Cache hit: {output_copc}")
+            return output_copc, None, None, None
+    
+    with scratch_dir(work_dir, f"{input_h4.stem}_", keep_intermediates) as scratch:
+        # Generate intermediate filenames
+        stem = scratch / input_h4.name
+        h5_file = stem.with_suffix('.h5') if reader == "h4toh5" else None
+        txt_file = stem.with_suffix(INTERMEDIATE_SUFFIXES[intermediate_format]) if text_stage else None
+        las_file = None if fused else stem.with_suffix('.las')
         
-        # Step 4: LAS → COPC
-        print(f"\nStep 4: Converting LAS to COPC...")
-        las_to_copc_pipeline(las_file, output_copc)
-        print(f"  ✓ Created: {output_copc}")
-        
-        print(f"\n{'='*50}")
-        print(f"Pipeline complete! Final output: {output_copc}")
-        print(f"{'='*50}")
+        try:
+            if fused:
+                # Single pass: HDF4 → (HDF5 → intermediate) → COPC
+                logger.info("Running fused HDF4 → COPC pipeline...")
+                stats = {}
+                read_names = qc_variable_names(variable_names, qc_thresholds)
+                created_format = intermediate_format if text_stage else "COPC"
+                created = txt_file if text_stage else output_copc
+                with open_h4_grid_with(input_h4, read_names, reader, h5_file, cache, report,
+                                       bbox, alt_range) as grid:
+                    overviews = []
+                    overview_sets = []  # point arrays of each level (a few percent of the grid)
+                    if overview_levels:
+                        with track_stage(report, "overviews", input_h4) as record:
+                            overviews = overview_grids(
+                                *grid, variable_names, overview_levels, overview_block,
+                                overview_statistic, fill_values or CALIPSO_FILL_VALUES, min_value,
+                                qc_thresholds, chunk_size
+                            )
+                            tagged = overview_mode == "tagged"
+                            overview_sets = [
+                                list(overview_points(overview, variable_names, altitude_units,
+                                                     level if tagged else None, crs))
+                                for level, overview in enumerate(overviews, 1)
+                            ]
+                            record["points"] = sum(len(p) for points in overview_sets for p in points)
+                    if crs is not None:
+                        scaling = projected_scaling()
+                    elif not auto_scale:
+                        scaling = None
+                    elif overview_mode == "tagged" and overviews:
+                        scaling = combined_scaling([grid, *overviews], altitude_units)
+                    else:
+                        scaling = grid_scaling(*grid[:3], altitude_units)
+                    
+                    with track_stage(report, f"hdf4_to_{created_format.lower()}", input_h4, created) as record:
+                        chunks = iter_grid_points(
+                            *grid, variable_names, altitude_units, chunk_size,
+                            fill_values, drop_nan, min_value, qc_thresholds, stats, crs
+                        ) if full_resolution else iter(())
+                        logger.info(f"Step 1: Converting HDF4 ({reader}) to {created_format}...")
+                        if text_stage:
+                            INTERMEDIATE_WRITERS[intermediate_format](chunks, txt_file)
+                        else:
+                            if overview_mode == "tagged" and overviews:
+                                chunks = itertools.chain(tag_level(chunks, 0), *overview_sets)
+                            with publish(output_copc) as tmp_copc:
+                                points_to_copc(chunks, tmp_copc, srs=srs, scaling=scaling)
+                        record["points"] = stats.get("retained", 0)
+                        if overview_mode == "tagged":
+                            record["points"] += sum(len(p) for points in overview_sets for p in points)
+                    
+                    for overview, points, overview_file in zip(overviews, overview_sets, overview_files):
+                        with track_stage(report, "overview_to_copc", output_path=overview_file) as record:
+                            if auto_scale:
+                                overview_scaling = grid_scaling(*overview[:3], altitude_units)
+                            else:
+                                overview_scaling = scaling
+                            with publish(overview_file) as tmp_copc:
+                                points_to_copc(points, tmp_copc, srs=srs, scaling=overview_scaling)
+                            record["points"] = sum(len(p) for p in points)
+                        logger.info(f"  ✓ Created: {overview_file}")
+                if full_resolution:
+                    report_point_counts(stats, filtering_requested(fill_values, drop_nan, min_value, qc_thresholds))
+                logger.info(f"  ✓ Created: {created}")
+                
+                if text_stage:
+                    logger.info(f"\nStep 2: Converting {intermediate_format} to COPC...")
+                    with publish(output_copc) as tmp_copc:
+                        txt_to_copc(txt_file, tmp_copc, variable_names=variable_names, report=report,
+                                    scaling=scaling)
+                
+                logger.info(f"\n{'='*50}")
+                logger.info(f"Pipeline complete! Final output: {output_copc}")
+                logger.info(f"{'='*50}")
+                
+                h5_kept, txt_kept = h5_file, txt_file
+            else:
+                # Step 1-3: HDF4 → (HDF5 → Text) → LAS
+                logger.info("Running HDF4 → LAS pipeline...")
+                las_result, h5_kept, txt_kept = h4_to_las(
+                    input_h4, 
+                    las_file, 
+                    altitude_units=altitude_units, 
+                    keep_intermediates=True,  # Keep for now, clean up later
+                    text_stage=text_stage,
+                    reader=reader,
+                    work_dir=scratch,
+                    variable_names=variable_names,
+                    fill_values=fill_values,
+                    drop_nan=drop_nan,
+                    min_value=min_value,
+                    qc_thresholds=qc_thresholds,
+                    chunk_size=chunk_size,
+                    intermediate_format=intermediate_format,
+                    bbox=bbox,
+                    alt_range=alt_range,
+                    auto_scale=auto_scale,
+                    crs=crs,
+                    cache=cache,
+                    report=report
+                )
+                
+                # Step 4: LAS → COPC
+                logger.info(f"\nStep 4: Converting LAS to COPC...")
+                with publish(output_copc) as tmp_copc:
+                    # Keep the grid lattice (or 1 cm scale) of the LAS file rather than PDAL's default scaling
+                    lattice = {"scale": "input", "offset": "input"} if auto_scale or crs else {}
+                    las_to_copc_pipeline(las_file, tmp_copc, cache=cache, report=report, **lattice)
+                logger.info(f"  ✓ Created: {output_copc}")
+                
+                logger.info(f"\n{'='*50}")
+                logger.info(f"Pipeline complete! Final output: {output_copc}")
+                logger.info(f"{'='*50}")
+            
+            if cache is not None:
+                cache.store(cache_key, output_copc)
+                for key, path in zip(overview_keys, overview_files):
+                    cache.store(key, path)
+            
+        except Exception as e:
+            logger.error(f"\n✗ Pipeline failed: {e}")
+            # Clean up any intermediate files on failure
+            if not keep_intermediates:
+                for f in [h5_file, txt_file, las_file]:
+                    if f is not None and f.exists():
+                        f.unlink()
+            raise
         
-    except Exception as e:
-        print(f"\n✗ Pipeline failed: {e}")
-        # Clean up any intermediate files on failure
+        # Clean up intermediate files if requested
         if not keep_intermediates:
-            for f in [h5_file, txt_file, las_file]:
-                if f.exists():
+            files_to_remove = []
+            
+            # Remove intermediate files
+            for f, name in [(h5_file, "HDF5"), (txt_file, "text"), (las_file, "LAS")]:
+                if f is not None and f.exists():
                     f.unlink()
-        raise
+                    files_to_remove.append(name)
+            
+            if files_to_remove:
+                logger.info(f"\nCleaned up intermediate files: {', '.join(files_to_remove)}")
+            
+            return output_copc, None, None, None
+        else:
+            return output_copc, h5_kept, txt_kept, las_file
+
+
+
+def _batch_h4_to_copc_worker(
+    input_h4: Path,
+    output_copc: Path,
+    options: dict,
+    report_dir: Optional[Path] = None,
+    checksum: bool = False
+) -> tuple[Path, Optional[Path], float, Optional[str], Optional[str], list[dict]]:
+    """
+    Run h4_to_copc for one granule (its intermediates go to a private scratch directory).
     
-    # Clean up intermediate files if requested
-    if not keep_intermediates:
-        files_to_remove = []
-        
-        # Remove intermediate files
-        for f, name in [(h5_file, "HDF5"), (txt_file, "text"), (las_file, "LAS")]:
-            if f.exists():
-                f.unlink()
-                files_to_remove.append(name)
+    Returns (input, COPC file or None, seconds, error or None, input SHA-256 or
+    None, stage records), so the parent process can update the job manifest.
+    """
+    start = time.perf_counter()
+    report = RunReport(reset_peak=os.environ.get(RESET_PEAK_ENV) == "1")
+    digest = None
+    try:
+        if checksum:
+            digest = file_sha256(input_h4)
+        h4_to_copc(input_h4, output_copc, report=report, **options)
+        return input_h4, output_copc, time.perf_counter() - start, None, digest, report.stages
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        return input_h4, None, time.perf_counter() - start, error, digest, report.stages
+    finally:
+        if report_dir is not None:
+            report.to_json(report_dir / f"{input_h4.stem}.report.json")
+
+
+def batch_h4_to_copc(
+    directory: Union[str, Path],
+    pattern: str = "*.hdf",
+    workers: Optional[int] = None,
+    output_dir: Optional[Union[str, Path]] = None,
+    skip_existing: bool = True,
+    variable_name: str = "var_to_grab",
+    altitude_units: str = "km",
+    text_stage: bool = False,
+    reader: str = "pyhdf",
+    variable_names: Optional[Sequence[str]] = None,
+    report_dir: Optional[Union[str, Path]] = None,
+    manifest: Optional[Union[str, Path, JobManifest]] = None,
+    retry_failed: bool = True,
+    granules: Optional[Sequence[Union[str, Path]]] = None,
+    executor=None,
+    **copc_options
+) -> tuple[list[tuple[Path, Path, float]], list[tuple[Path, str, float]]]:
+    """
+    Convert all HDF4 files in a directory to COPC format in parallel.
+    
+    Each granule runs the full h4_to_copc pipeline in a worker process, with
+    its intermediate files isolated in a scratch directory of its own
+    (under $CALIPSO_SCRATCH_DIR if set). Granules are shipped to the workers
+    as executors.ConversionTask (paths and parameters only), so passing a
+    DaskExecutor spreads the batch over the nodes of a cluster.
+    
+    With a manifest, every granule's status, input checksum, output size,
+    stages and errors are recorded in a SQLite job manifest. Rerunning the
+    batch with the same manifest skips granules that completed (and whose
+    output is still intact) and reconverts everything else, including
+    outputs left half-written by a killed run. Passing cache=ArtifactCache(...)
+    as well lets those granules resume from the last stage they completed.
+    
+    Parameters:
+    -----------
+    directory : str or Path
+        Directory containing HDF4 files
+    pattern : str, default="*.hdf"
+        Glob pattern for finding HDF4 files
+    workers : int, optional
+        Number of worker processes. If None, uses the number of CPUs
+    output_dir : str or Path, optional
+        Directory for COPC files. If None, they are written next to the inputs
+    skip_existing : bool, default=True
+        Skip granules that are already converted: those recorded as done in
+        the manifest if one is given, otherwise those whose COPC file exists
+    variable_name, altitude_units, text_stage, reader, variable_names
+        Passed through to h4_to_copc
+    report_dir : str or Path, optional
+        Write a per-granule RunReport as <granule>.report.json into this directory
+    manifest : str, Path or JobManifest, optional
+        SQLite job manifest used to resume interrupted batches
+    retry_failed : bool, default=True
+        Reconvert granules whose last attempt failed according to the manifest.
+        If False they are skipped and reported as failed with their last error
+    granules : list of str or Path, optional
+        Granules to convert instead of globbing directory for pattern, e.g. a
+        selection from catalog.GranuleCatalog.select
+    executor : executors.TaskExecutor, optional
+        Backend running the conversions (e.g. executors.DaskExecutor); the
+        caller closes it. If None, a LocalExecutor with workers processes
+        and no retries
+    **copc_options
+        Any other h4_to_copc keyword arguments (e.g. fill_values, min_value)
+    
+    Returns:
+    --------
+    tuple[list[tuple[Path, Path, float]], list[tuple[Path, str, float]]]
+        Successful conversions as (input, COPC file, seconds) and failed
+        conversions as (input, error message, seconds)
+    """
+    # executors imports the worker from this module
+    from .executors import ConversionTask, LocalExecutor
+    
+    directory = Path(directory)
+    h4_files = sorted(directory.glob(pattern)) if granules is None else [Path(g) for g in granules]
+    
+    if output_dir is not None:
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+    
+    if report_dir is not None:
+        report_dir = Path(report_dir)
+        report_dir.mkdir(parents=True, exist_ok=True)
+    
+    if manifest is not None and not isinstance(manifest, JobManifest):
+        manifest = JobManifest(manifest)
+    
+    logger.info(f"Found {len(h4_files)} HDF4 files to convert")
+    
+    options = {
+        "variable_name": variable_name,
+        "altitude_units": altitude_units,
+        "keep_intermediates": False,
+        "text_stage": text_stage,
+        "reader": reader,
+        "variable_names": variable_names,
+        **copc_options,
+    }
+    
+    successful = []
+    failed = []
+    
+    tasks = []
+    for h4_file in h4_files:
+        copc_file = (output_dir or h4_file.parent) / f"{h4_file.stem}.copc.laz"
         
-        if files_to_remove:
-            print(f"\nCleaned up intermediate files: {', '.join(files_to_remove)}")
+        if manifest is not None:
+            row = manifest.get(h4_file)
+            if skip_existing and manifest.is_done(h4_file):
+                logger.info(f"⏭️  Skipping {h4_file.name} (done in manifest)")
+                successful.append((h4_file, Path(row["output_path"]), 0.0))
+                continue
+            if not retry_failed and row is not None and row["status"] == "failed":
+                logger.info(f"⏭️  Skipping {h4_file.name} (failed in manifest)")
+                failed.append((h4_file, row["error"], 0.0))
+                continue
+            manifest.mark_running(h4_file)
+        elif skip_existing and copc_file.exists():
+            logger.info(f"⏭️  Skipping {h4_file.name} (COPC already exists)")
+            successful.append((h4_file, copc_file, 0.0))
+            continue
         
-        return output_copc, None, None, None
-    else:
-        return output_copc, h5_file, txt_file, las_file
-
+        tasks.append(ConversionTask(h4_file, copc_file, options, report_dir, manifest is not None))
+    
+    owned = executor is None
+    if owned:
+        executor = LocalExecutor(workers, retries=0)
+    try:
+        for _, (h4_file, copc_file, seconds, error, digest, stages) in executor.map_unordered(tasks):
+            if manifest is not None:
+                manifest.record_stages(h4_file, stages)
+            if error is None:
+                logger.info(f"  ✓ {h4_file.name} → {copc_file.name} ({seconds:.1f}s)")
+                successful.append((h4_file, copc_file, seconds))
+                if manifest is not None:
+                    manifest.mark_done(h4_file, copc_file, digest, seconds)
+            else:
+                logger.error(f"  ✗ {h4_file.name}: {error} ({seconds:.1f}s)")
+                failed.append((h4_file, error, seconds))
+                if manifest is not None:
+                    manifest.mark_failed(h4_file, error, digest, seconds)
+    finally:
+        if owned:
+            executor.close()
+    
+    logger.info(f"\nBatch conversion complete:")
+    logger.info(f"  Successful: {len(successful)}")
+    logger.info(f"  Failed: {len(failed)}")
+    
+    return successful, failed
 
 __all__ = [
     'h4_to_h5', 
+    'read_h4_grid', 
+    'read_h4_grid_with', 
+    'open_h4_grid_with', 
     'h5_to_txt', 
+    'h5_to_las', 
+    'h5_to_npy', 
+    'h5_to_parquet', 
     'h4_to_txt', 
     'txt_to_las', 
     'txt_to_las_pipeline', 
     'h4_to_las',
     'las_to_copc_pipeline',
-    'h4_to_copc'
+    'txt_to_copc',
+    'h4_to_copc',
+    'batch_h4_to_copc'
 ]
\ No newline at end of file
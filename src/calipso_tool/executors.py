@@ -0,0 +1,355 @@
+import logging
+import os
+import socket
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, BrokenExecutor, Executor, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, Union
+from .converter import _batch_h4_to_copc_worker
+
+logger = logging.getLogger(__name__)
+
+
+class ConversionTask:
+    """
+    One granule's h4_to_copc conversion, described only by paths and parameters.
+    
+    A task holds no open files, readers or caches, so it pickles to a few
+    hundred bytes and runs on any process or node that sees the same paths
+    (e.g. a shared file system). run() never raises; errors come back in the
+    result like in batch_h4_to_copc.
+    
+    Parameters:
+    -----------
+    input_h4 : str or Path
+        Path to the input HDF4 granule
+    output_copc : str or Path
+        Path of the COPC file to write
+    options : dict, optional
+        h4_to_copc keyword arguments (e.g. variable_names, fill_values, cache)
+    report_dir : str or Path, optional
+        Write the granule's RunReport as <granule>.report.json into this directory
+    checksum : bool, default=False
+        Compute the input SHA-256 (for job manifests)
+    """
+    
+    def __init__(
+        self,
+        input_h4: Union[str, Path],
+        output_copc: Union[str, Path],
+        options: Optional[dict] = None,
+        report_dir: Optional[Union[str, Path]] = None,
+        checksum: bool = False
+    ):
+        self.input_h4 = Path(input_h4)
+        self.output_copc = Path(output_copc)
+        self.options = dict(options or {})
+        self.report_dir = None if report_dir is None else Path(report_dir)
+        self.checksum = checksum
+        self.attempts = 0
+    
+    def __repr__(self) -> str:
+        return f"ConversionTask({self.input_h4.name} → {self.output_copc})"
+    
+    def run(self) -> tuple:
+        """
+        Convert the granule.
+        
+        Returns (input, COPC file or None, seconds, error or None, input SHA-256
+        or None, stage records), as batch_h4_to_copc's workers do.
+        """
+        return _batch_h4_to_copc_worker(
+            self.input_h4, self.output_copc, self.options, self.report_dir, self.checksum
+        )
+    
+    def failed(self, error: str) -> tuple:
+        """Result of a task whose worker died or could not be reached."""
+        return self.input_h4, None, 0.0, error, None, []
+
+
+def _run_task(task: ConversionTask) -> tuple[tuple, str]:
+    """Run a task in a worker process and name the worker (host:pid)."""
+    return task.run(), f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _run_dask_task(task: ConversionTask) -> tuple[tuple, str]:
+    """Run a task on a Dask worker and return the worker's address."""
+    from distributed import get_worker
+    
+    return task.run(), get_worker().address
+
+
+class TaskExecutor(ABC):
+    """
+    Runs conversion tasks on some backend and streams back their results.
+    
+    Subclasses provide submit (start a task, preferably away from the worker
+    it last failed on) and wait (the futures that completed); a TaskQueue
+    adds the retries and keeps at most slots tasks in flight. Executors are
+    context managers that release the resources they created.
+    
+    Parameters:
+    -----------
+    retries : int, default=1
+        How often a failed task is resubmitted before its failure is reported
+    slots : int, optional
+        Most tasks submitted at once; the rest wait in the TaskQueue. If None, all at once
+    """
+    
+    def __init__(self, retries: int = 1, slots: Optional[int] = None):
+        self.retries = retries
+        self.slots = slots
+    
+    def __enter__(self) -> "TaskExecutor":
+        return self
+    
+    def __exit__(self, *exc) -> None:
+        self.close()
+    
+    def close(self) -> None:
+        """Release the workers this executor started."""
+    
+    @abstractmethod
+    def submit(self, task: ConversionTask, avoid: Optional[str] = None):
+        """Start a task, away from worker avoid if possible; returns a future of (result, worker)."""
+    
+    @abstractmethod
+    def wait(self, futures: list) -> list:
+        """Block until some of the futures are done and return those."""
+    
+    def map_unordered(self, tasks: Iterable[ConversionTask]) -> Iterator[tuple[ConversionTask, tuple]]:
+        """
+        Run the tasks and yield (task, result) as each one finishes, in completion order.
+        
+        A task whose result carries an error (or whose worker died) is
+        resubmitted up to retries times, away from the worker it failed on where
+        the backend allows it; only its last result is yielded. See TaskQueue.
+        """
+        queue = TaskQueue(self)
+        queue.extend(tasks)
+        while queue.running:
+            for future in self.wait(list(queue.running)):
+                finished = queue.complete(future)
+                if finished is not None:
+                    yield finished
+
+
+class TaskQueue:
+    """
+    Feeds tasks to a TaskExecutor, at most executor.slots at a time, and retries failures.
+    
+    A worker process that dies breaks a process pool and takes every task in
+    it down with BrokenExecutor, though only one of them killed it. Such
+    casualties are resubmitted without using up an attempt, one at a time and
+    alone, so a task that breaks the pool while running alone is known to be
+    the culprit and only that task is charged an attempt.
+    
+    complete() is called with each finished future; map_unordered runs the
+    loop, and callers with their own event loop (e.g. fetch.fetch_convert)
+    drive it directly, watching the futures passed to started.
+    
+    Parameters:
+    -----------
+    executor : TaskExecutor
+        Backend running the tasks
+    started : callable, optional
+        Called with (future, task) for every future submitted
+    """
+    
+    def __init__(
+        self,
+        executor: TaskExecutor,
+        started: Optional[Callable[[object, ConversionTask], None]] = None
+    ):
+        self.executor = executor
+        self.started = started
+        self.running = {}
+        self._waiting = deque()
+        self._suspects = deque()
+        self._isolated = None
+    
+    def extend(self, tasks: Iterable[ConversionTask]) -> None:
+        """Queue tasks, submitting as many as there are free slots."""
+        self._waiting.extend((task, None) for task in tasks)
+        self._fill()
+    
+    def _submit(self, task: ConversionTask, avoid: Optional[str] = None) -> None:
+        future = self.executor.submit(task, avoid)
+        self.running[future] = task
+        if self.started is not None:
+            self.started(future, task)
+    
+    def _fill(self) -> None:
+        if self._suspects:
+            # Casualties of a broken pool run alone until each one has finished
+            if not self.running:
+                self._isolated = self._suspects.popleft()
+                self._submit(self._isolated)
+            return
+        slots = self.executor.slots
+        while self._waiting and (slots is None or len(self.running) < slots):
+            self._submit(*self._waiting.popleft())
+    
+    def complete(self, future) -> Optional[tuple[ConversionTask, tuple]]:
+        """
+        Take in a finished future and refill the free slots.
+        
+        Returns (task, result) once a task has its final result, or None if it
+        was resubmitted.
+        """
+        task = self.running.pop(future)
+        isolated, self._isolated = self._isolated is task, None
+        try:
+            result, worker = future.result()
+        except BrokenExecutor as e:
+            if not isolated:
+                logger.info(f"  {task.input_h4.name} was lost with a broken worker pool; rerunning it alone")
+                self._suspects.append(task)
+                self._fill()
+                return None
+            result, worker = task.failed(f"{type(e).__name__}: {e}"), None
+        except Exception as e:
+            result, worker = task.failed(f"{type(e).__name__}: {e}"), None
+        
+        task.attempts += 1
+        error = result[3]
+        retries = self.executor.retries
+        if error is not None and task.attempts <= retries:
+            logger.warning(f"  ↻ {task.input_h4.name} failed on {worker or 'a lost worker'} "
+                           f"({error}); retry {task.attempts}/{retries}")
+            self._waiting.appendleft((task, worker))
+            self._fill()
+            return None
+        self._fill()
+        return task, result
+
+
+class FuturesExecutor(TaskExecutor):
+    """
+    Run tasks on any concurrent.futures executor (thread, process, MPI, loky pools, ...).
+    
+    The executor is not shut down by close(); its owner does that. Retried
+    tasks go to whichever worker is free.
+    
+    Parameters:
+    -----------
+    executor : concurrent.futures.Executor
+        Executor to submit the tasks to
+    retries : int, default=1
+        How often a failed task is resubmitted
+    slots : int, optional
+        Most tasks submitted at once, e.g. the executor's number of workers. If None, all at once
+    """
+    
+    def __init__(self, executor: Executor, retries: int = 1, slots: Optional[int] = None):
+        super().__init__(retries, slots)
+        self.executor = executor
+    
+    def submit(self, task: ConversionTask, avoid: Optional[str] = None):
+        return self.executor.submit(_run_task, task)
+    
+    def wait(self, futures: list) -> list:
+        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+        return list(done)
+
+
+class LocalExecutor(FuturesExecutor):
+    """
+    Run tasks in a process pool on this machine (what batch_h4_to_copc uses by default).
+    
+    Only one task per worker process is submitted at a time. A worker that
+    dies (e.g. killed for memory) breaks the whole pool; the next submit
+    starts a fresh pool and the tasks lost with the old one are rerun as
+    described in TaskQueue, so only the task that killed its worker fails.
+    
+    Parameters:
+    -----------
+    workers : int, optional
+        Number of worker processes. If None, the number of CPUs
+    retries : int, default=1
+        How often a failed task is resubmitted
+    """
+    
+    def __init__(self, workers: Optional[int] = None, retries: int = 1):
+        workers = workers or os.cpu_count()
+        super().__init__(ProcessPoolExecutor(max_workers=workers), retries, slots=workers)
+        self.workers = workers
+    
+    def submit(self, task: ConversionTask, avoid: Optional[str] = None):
+        try:
+            return super().submit(task, avoid)
+        except BrokenExecutor:
+            logger.warning("  A worker process died and broke the pool; starting a new one")
+            self.executor.shutdown(wait=False)
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            return super().submit(task, avoid)
+    
+    def close(self) -> None:
+        self.executor.shutdown()
+
+
+class DaskExecutor(TaskExecutor):
+    """
+    Run tasks on a Dask distributed cluster, one granule per Dask task.
+    
+    Only the task (paths and parameters) travels to the workers, which read
+    and write the granules themselves, so inputs and outputs must be on
+    storage every worker sees. Retried tasks are pinned to the other workers
+    of the cluster when there are any.
+    
+    Parameters:
+    -----------
+    client : distributed.Client, optional
+        Client of an existing cluster; not closed by close()
+    address : str, optional
+        Scheduler address (e.g. "tcp://scheduler:8786") to connect to when no client is given
+    workers : int, optional
+        Without client and address, start a LocalCluster with this many worker
+        processes (one thread each), e.g. for testing
+    retries : int, default=1
+        How often a failed task is resubmitted
+    """
+    
+    def __init__(
+        self,
+        client=None,
+        address: Optional[str] = None,
+        workers: Optional[int] = None,
+        retries: int = 1
+    ):
+        super().__init__(retries)
+        try:
+            from distributed import Client, LocalCluster
+        except ImportError as e:
+            raise ImportError(
+                "dask.distributed is required for DaskExecutor. "
+                "Install it with: pip install 'dask[distributed]'"
+            ) from e
+        
+        self._owned = []
+        if client is None:
+            if address is None:
+                cluster = LocalCluster(n_workers=workers, threads_per_worker=1, processes=True)
+                self._owned.append(cluster)
+                address = cluster
+            client = Client(address)
+            self._owned.insert(0, client)
+        self.client = client
+    
+    def close(self) -> None:
+        for resource in self._owned:
+            resource.close()
+        self._owned = []
+    
+    def submit(self, task: ConversionTask, avoid: Optional[str] = None):
+        others = None
+        if avoid is not None:
+            others = [w for w in self.client.scheduler_info()["workers"] if w != avoid] or None
+        return self.client.submit(_run_dask_task, task, pure=False, workers=others)
+    
+    def wait(self, futures: list) -> list:
+        from distributed import wait as dask_wait
+        
+        done, _ = dask_wait(futures, return_when="FIRST_COMPLETED")
+        return list(done)
\ No newline at end of file
@@ -0,0 +1,383 @@
+import logging
+import os
+import queue
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Sequence, Union
+from .executors import ConversionTask, LocalExecutor, TaskExecutor, TaskQueue
+from .manifest import JobManifest
+from .workspace import publish, scratch_dir
+
+logger = logging.getLogger(__name__)
+
+
+class EarthdataSource:
+    """
+    CALIPSO granules found by an earthaccess search and downloaded from NASA Earthdata.
+    
+    Parameters:
+    -----------
+    short_name : str
+        Collection short name, e.g. "CAL_LID_L3_Tropospheric_APro_AllSky-Standard-V4-20"
+    temporal : tuple of str or datetime, optional
+        (start, end) of the search
+    bounding_box : sequence of float, optional
+        (lon_min, lat_min, lon_max, lat_max) of the search
+    count : int, optional
+        Maximum number of granules to return
+    strategy : str, default="netrc"
+        earthaccess login strategy
+    """
+    
+    def __init__(
+        self,
+        short_name: str,
+        temporal: Optional[tuple] = None,
+        bounding_box: Optional[Sequence[float]] = None,
+        count: Optional[int] = None,
+        strategy: str = "netrc"
+    ):
+        self.short_name = short_name
+        self.temporal = temporal
+        self.bounding_box = bounding_box
+        self.count = count
+        self.strategy = strategy
+    
+    def granules(self) -> list:
+        """Log in and search Earthdata; returns earthaccess DataGranule results."""
+        import earthaccess
+        
+        earthaccess.login(strategy=self.strategy)
+        query = {"short_name": self.short_name}
+        if self.temporal is not None:
+            query["temporal"] = tuple(self.temporal)
+        if self.bounding_box is not None:
+            query["bounding_box"] = tuple(self.bounding_box)
+        if self.count is not None:
+            query["count"] = self.count
+        results = earthaccess.search_data(**query)
+        logger.info(f"Found {len(results)} granules of {self.short_name}")
+        return results
+    
+    def name(self, granule) -> str:
+        """File name of the granule's first data link."""
+        return granule.data_links()[0].rsplit("/", 1)[-1]
+    
+    def size(self, granule) -> Optional[int]:
+        """Size in bytes from the granule metadata, or None if not reported."""
+        try:
+            return int(granule.size() * 1024**2)  # earthaccess reports MB
+        except Exception:
+            return None
+    
+    def fetch(self, granule, directory: Path) -> Path:
+        """Download the granule into directory."""
+        import earthaccess
+        
+        paths = earthaccess.download([granule], local_path=str(directory), threads=1)
+        if not paths:
+            raise RuntimeError(f"Download of {self.name(granule)} failed")
+        return Path(paths[0])
+
+
+class LocalSource:
+    """
+    Granules in a local directory, copied as if downloaded.
+    
+    Stands in for EarthdataSource in tests and on machines that already hold
+    the data (e.g. a slow network mount to stage onto local disk).
+    
+    Parameters:
+    -----------
+    directory : str or Path
+        Directory containing HDF4 files
+    pattern : str, default="*.hdf"
+        Glob pattern for finding HDF4 files
+    """
+    
+    def __init__(self, directory: Union[str, Path], pattern: str = "*.hdf"):
+        self.directory = Path(directory)
+        self.pattern = pattern
+    
+    def granules(self) -> list[Path]:
+        """Matching files in name order."""
+        return sorted(self.directory.glob(self.pattern))
+    
+    def name(self, granule: Path) -> str:
+        return granule.name
+    
+    def size(self, granule: Path) -> Optional[int]:
+        return granule.stat().st_size
+    
+    def fetch(self, granule: Path, directory: Path) -> Path:
+        """Copy the granule into directory (under a temporary name until complete)."""
+        target = Path(directory) / granule.name
+        if target.resolve() == granule.resolve():
+            raise ValueError(f"Download directory {directory} is the source directory; "
+                             f"its granules would be deleted after conversion")
+        with publish(target) as tmp:
+            shutil.copyfile(granule, tmp)
+        return target
+
+
+class DiskBudget:
+    """
+    Byte and file budget for granules held on local disk.
+    
+    acquire blocks until the granule fits, release frees its share once the
+    granule has been converted. A single granule larger than the whole budget
+    is still admitted when nothing else is held, so the pipeline never stalls.
+    
+    Parameters:
+    -----------
+    max_bytes : int, optional
+        Largest total size of downloaded, not yet converted granules
+    max_files : int, optional
+        Largest number of such granules
+    """
+    
+    def __init__(self, max_bytes: Optional[int] = None, max_files: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.bytes = 0
+        self.files = 0
+        self.closed = False
+        self._condition = threading.Condition()
+    
+    def _fits(self, size: int) -> bool:
+        if self.closed or self.files == 0:
+            return True
+        if self.max_files is not None and self.files + 1 > self.max_files:
+            return False
+        return self.max_bytes is None or self.bytes + size <= self.max_bytes
+    
+    def acquire(self, size: int) -> None:
+        """Reserve room for a granule of size bytes, waiting for earlier granules to finish."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._fits(size))
+            if self.closed:
+                raise RuntimeError("Download pipeline was shut down")
+            self.bytes += size
+            self.files += 1
+    
+    def resize(self, reserved: int, size: int) -> None:
+        """Replace a granule's estimated size by its actual size on disk."""
+        with self._condition:
+            self.bytes += size - reserved
+            self._condition.notify_all()
+    
+    def release(self, size: int) -> None:
+        """Free the room of a converted (or failed) granule."""
+        with self._condition:
+            self.bytes -= size
+            self.files -= 1
+            self._condition.notify_all()
+    
+    def close(self) -> None:
+        """Wake and fail every waiting acquire, e.g. when the pipeline is interrupted."""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+def _download(source, granule, directory: Path, budget: DiskBudget) -> tuple[Path, int]:
+    """Fetch one granule once the disk budget allows it; returns its path and size."""
+    reserved = source.size(granule) or 0
+    budget.acquire(reserved)
+    try:
+        path = Path(source.fetch(granule, directory))
+        size = path.stat().st_size
+    except BaseException:
+        budget.release(reserved)
+        raise
+    budget.resize(reserved, size)
+    logger.info(f"  ↓ {path.name} ({size / 1024**2:.1f} MB)")
+    return path, size
+
+
+def fetch_convert(
+    source,
+    output_dir: Union[str, Path],
+    download_dir: Optional[Union[str, Path]] = None,
+    workers: Optional[int] = None,
+    download_threads: int = 2,
+    max_disk_gb: Optional[float] = None,
+    max_pending: Optional[int] = None,
+    keep_downloads: bool = False,
+    skip_existing: bool = True,
+    manifest: Optional[Union[str, Path, JobManifest]] = None,
+    report_dir: Optional[Union[str, Path]] = None,
+    executor: Optional[TaskExecutor] = None,
+    **copc_options
+) -> tuple[list[tuple[Path, Path, float]], list[tuple[Path, str, float]]]:
+    """
+    Download granules and convert them to COPC, overlapping network I/O and compute.
+    
+    A small thread pool downloads granules while an executor (by default a
+    local process pool) runs h4_to_copc on those already on disk. Downloads wait whenever the
+    granules held locally (downloading, queued or converting) exceed
+    max_disk_gb or max_pending, and each granule is deleted as soon as it
+    has been converted, so local disk usage stays bounded however many
+    granules the search returns.
+    
+    source is any object with granules(), name(granule), size(granule)
+    (bytes, or None if unknown) and fetch(granule, directory) -> Path, such as
+    EarthdataSource or, for tests and pre-staged data, LocalSource.
+    
+    Parameters:
+    -----------
+    source : EarthdataSource, LocalSource or compatible
+        Where the granules come from
+    output_dir : str or Path
+        Directory for COPC files
+    download_dir : str or Path, optional
+        Directory for downloaded granules. If None, a private scratch
+        directory (see workspace.scratch_dir) is used and removed afterwards
+    workers : int, optional
+        Number of conversion processes when no executor is given (and the
+        default of max_pending). If None, uses the number of CPUs
+    download_threads : int, default=2
+        Number of concurrent downloads
+    max_disk_gb : float, optional
+        Largest total size of downloaded granules not yet converted
+    max_pending : int, optional
+        Largest number of downloaded granules not yet converted. If None, twice the workers
+    keep_downloads : bool, default=False
+        Keep granules after conversion (they then no longer count against the budget)
+    skip_existing : bool, default=True
+        Skip granules whose COPC file exists (or, with a manifest, that are done in it)
+    manifest : str, Path or JobManifest, optional
+        SQLite job manifest (see batch_h4_to_copc); requires a fixed download_dir,
+        since granules are recorded under their downloaded path
+    report_dir : str or Path, optional
+        Write a per-granule RunReport as <granule>.report.json into this directory
+    executor : TaskExecutor, optional
+        Backend running the conversions (e.g. executors.DaskExecutor), which
+        also retries failed ones; the caller closes it. Workers on other
+        nodes need download_dir and output_dir on shared storage. If None, a
+        LocalExecutor with workers processes and no retries
+    **copc_options
+        h4_to_copc keyword arguments (e.g. variable_names, fill_values, bbox)
+    
+    Returns:
+    --------
+    tuple[list[tuple[Path, Path, float]], list[tuple[Path, str, float]]]
+        Successful conversions as (granule, COPC file, seconds) and failed
+        downloads or conversions as (granule, error message, seconds)
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    if report_dir is not None:
+        report_dir = Path(report_dir)
+        report_dir.mkdir(parents=True, exist_ok=True)
+    
+    if manifest is not None and download_dir is None:
+        raise ValueError("A manifest needs a fixed download_dir to recognise granules across runs")
+    if manifest is not None and not isinstance(manifest, JobManifest):
+        manifest = JobManifest(manifest)
+    
+    workers = workers or os.cpu_count()
+    max_bytes = None if max_disk_gb is None else int(max_disk_gb * 1024**3)
+    budget = DiskBudget(max_bytes, max_pending or 2 * workers)
+    options = {"keep_intermediates": False, **copc_options}
+    
+    successful = []
+    failed = []
+    
+    owned = executor is None
+    if owned:
+        executor = LocalExecutor(workers, retries=0)
+    # Download and conversion futures (concurrent.futures or Dask) report here when done
+    finished = queue.Queue()
+    # future → ("download", granule name, COPC file) or ("convert", task)
+    pending = {}
+    # conversion task → size of its granule
+    sizes = {}
+    
+    def track(future, *info):
+        pending[future] = info
+        future.add_done_callback(finished.put)
+    
+    conversions = TaskQueue(executor, started=lambda future, task: track(future, "convert", task))
+    
+    with scratch_dir(download_dir, "calipso_download_", keep_downloads) as downloads, \
+            ThreadPoolExecutor(download_threads) as fetcher:
+        for granule in source.granules():
+            name = source.name(granule)
+            local = downloads / name
+            copc_file = output_dir / f"{Path(name).stem}.copc.laz"
+            
+            if manifest is not None:
+                done = skip_existing and manifest.is_done(local, check_input=local.exists())
+            else:
+                done = skip_existing and copc_file.exists()
+            if done:
+                logger.info(f"⏭️  Skipping {name} (already converted)")
+                successful.append((local, copc_file, 0.0))
+                continue
+            
+            track(fetcher.submit(_download, source, granule, downloads, budget), "download", name, copc_file)
+        
+        logger.info(f"Fetching and converting {len(pending)} granules "
+                    f"({download_threads} downloads, {workers} workers)")
+        try:
+            while pending:
+                future = finished.get()
+                kind, *info = pending.pop(future)
+                
+                if kind == "download":
+                    name, copc_file = info
+                    try:
+                        h4_file, size = future.result()
+                    except Exception as e:
+                        error = f"Download failed: {type(e).__name__}: {e}"
+                        logger.error(f"  ✗ {name}: {error}")
+                        failed.append((downloads / name, error, 0.0))
+                        if manifest is not None:
+                            manifest.mark_failed(downloads / name, error)
+                        continue
+                    if manifest is not None:
+                        manifest.mark_running(h4_file)
+                    task = ConversionTask(h4_file, copc_file, options, report_dir, manifest is not None)
+                    sizes[task] = size
+                    conversions.extend([task])
+                    continue
+                
+                # None while the task is being retried or rerun after a broken pool
+                finished_task = conversions.complete(future)
+                if finished_task is None:
+                    continue
+                task, (h4_file, copc_file, seconds, error, digest, stages) = finished_task
+                size = sizes.pop(task)
+                if manifest is not None:
+                    manifest.record_stages(h4_file, stages)
+                if error is None:
+                    logger.info(f"  ✓ {h4_file.name} → {copc_file.name} ({seconds:.1f}s)")
+                    successful.append((h4_file, copc_file, seconds))
+                    if manifest is not None:
+                        manifest.mark_done(h4_file, copc_file, digest, seconds)
+                else:
+                    logger.error(f"  ✗ {h4_file.name}: {error} ({seconds:.1f}s)")
+                    failed.append((h4_file, error, seconds))
+                    if manifest is not None:
+                        manifest.mark_failed(h4_file, error, digest, seconds)
+                if not keep_downloads:
+                    h4_file.unlink(missing_ok=True)
+                budget.release(size)
+        finally:
+            # Unblock downloads waiting for room and drop those not started yet
+            budget.close()
+            fetcher.shutdown(cancel_futures=True)
+            for future in pending:
+                future.cancel()
+            if owned:
+                executor.close()
+    
+    logger.info(f"\nFetch and convert complete:")
+    logger.info(f"  Successful: {len(successful)}")
+    logger.info(f"  Failed: {len(failed)}")
+    
+    return successful, failed
\ No newline at end of file
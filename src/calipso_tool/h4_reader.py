@@ -0,0 +1,96 @@
+import numpy as np
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Sequence, Union
+from .h5_to_txt import resolve_variable_names
+from .subset import subset_grid
+
+
+@contextmanager
+def open_h4_grid(
+    input_h4: Union[str, Path],
+    variable_names: Union[str, Sequence[str]] = "var_to_grab",
+    bbox: Optional[Sequence[float]] = None,
+    alt_range: Optional[Sequence[float]] = None
+) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray, dict]]:
+    """
+    Open a CALIPSO HDF4 file and expose its grid without reading the variables.
+    
+    Yields the 1D latitude, longitude and altitude midpoints and the requested
+    variables as pyhdf SDS objects, which can be sliced along the latitude
+    axis. Only the three midpoint SDS and the requested variables are touched,
+    so no HDF5 copy of the granule is needed. Requires pyhdf.
+    
+    Parameters:
+    -----------
+    input_h4 : str or Path
+        Path to input HDF4 file
+    variable_names : str or list of str, default="var_to_grab"
+        Name(s) of the SDS to extract from the HDF4 file
+    bbox : sequence of float, optional
+        (lon_min, lat_min, lon_max, lat_max) in degrees; only the selected
+        hyperslab of each SDS is read
+    alt_range : sequence of float, optional
+        (min, max) altitude in the file's units (km for CALIPSO)
+    """
+    variable_names = resolve_variable_names(variable_names=variable_names)
+    
+    try:
+        from pyhdf.SD import SD, SDC
+    except ImportError as e:
+        raise ImportError(
+            "pyhdf is required to read HDF4 files directly. "
+            "Install it with: conda install -c conda-forge pyhdf"
+        ) from e
+    
+    sd = SD(str(input_h4), SDC.READ)
+    try:
+        datasets = sd.datasets()
+        missing = [name for name in variable_names if name not in datasets]
+        if missing:
+            raise KeyError(f"Variable(s) {missing} not found in HDF4 file. "
+                           f"Available keys: {list(datasets.keys())}")
+        
+        # Coordinate SDS carry a leading singleton axis, as in the HDF5 copy
+        lat1d = np.asarray(sd.select("Latitude_Midpoint")[0])    # shape (85,)
+        lon1d = np.asarray(sd.select("Longitude_Midpoint")[0])   # shape (72,)
+        alt1d = np.asarray(sd.select("Altitude_Midpoint")[0])    # shape (208,)
+        
+        yield subset_grid(lat1d, lon1d, alt1d, {name: sd.select(name) for name in variable_names},
+                          bbox, alt_range)
+    finally:
+        sd.end()
+
+
+def read_h4_grid(
+    input_h4: Union[str, Path],
+    variable_names: Union[str, Sequence[str]] = "var_to_grab"
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, dict[str, np.ndarray]]:
+    """
+    Read the 1D coordinate midpoints and 3D variables straight from a CALIPSO HDF4 file.
+    
+    Parameters:
+    -----------
+    input_h4 : str or Path
+        Path to input HDF4 file
+    variable_names : str or list of str, default="var_to_grab"
+        Name(s) of the SDS to extract from the HDF4 file
+    
+    Returns:
+    --------
+    tuple[np.ndarray, np.ndarray, np.ndarray, dict[str, np.ndarray]]
+        Latitude, longitude and altitude midpoints, and the variable data
+        (each with shape (n_lat, n_lon, n_alt)) keyed by name
+    """
+    with open_h4_grid(input_h4, variable_names) as (lat1d, lon1d, alt1d, datasets):
+        variables = {name: np.asarray(sds[:]) for name, sds in datasets.items()}   # shape (85, 72, 208)
+    
+    return lat1d, lon1d, alt1d, variables
+
+
+# Library-level HDF4 readers usable by the converter entry points. Each one is a
+# context manager taking (input, variable_names, bbox, alt_range) and yielding
+# (lat1d, lon1d, alt1d, {name: sliceable dataset}).
+HDF4_READERS = {
+    "pyhdf": open_h4_grid,
+}
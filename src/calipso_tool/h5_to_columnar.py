@@ -0,0 +1,332 @@
+import logging
+import itertools
+import numpy as np
+from pathlib import Path
+from typing import Iterable, Optional, Sequence, Union
+from .h5_to_txt import open_h5_grid, iter_grid_points, report_point_counts, resolve_variable_names
+from .masking import CALIPSO_FILL_VALUES, filtering_requested, qc_variable_names
+from .instrument import configure_logging
+
+logger = logging.getLogger(__name__)
+
+# Binary intermediate formats and the file suffix written for each
+COLUMNAR_FORMATS = {
+    "npy": ".npy",
+    "parquet": ".parquet",
+}
+
+# Room reserved for the NPY header so the point count can be patched in once known
+_NPY_HEADER_SIZE = 256
+
+
+def require_pyarrow():
+    """Import pyarrow and pyarrow.parquet, with install instructions if missing."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            "pyarrow is required for Parquet files. Install it with: "
+            "pip install 'calipso_tool[parquet]' (or conda install -c conda-forge pyarrow)"
+        ) from e
+    return pa, pq
+
+
+def _with_coord_dtype(points: np.ndarray, coord_dtype: str) -> np.ndarray:
+    """Return points with X, Y, Z cast to coord_dtype (no copy if already matching)."""
+    dtype = np.dtype([
+        (name, coord_dtype if name in ("X", "Y", "Z") else points.dtype[name])
+        for name in points.dtype.names
+    ])
+    return points if points.dtype == dtype else points.astype(dtype)
+
+
+def _npy_header(dtype: np.dtype, count: int) -> bytes:
+    """Build a fixed-size NPY 1.0 header for a 1D structured array of count records."""
+    header = repr({
+        "descr": np.lib.format.dtype_to_descr(dtype),
+        "fortran_order": False,
+        "shape": (count,),
+    })
+    preamble = np.lib.format.magic(1, 0)
+    body_size = _NPY_HEADER_SIZE - len(preamble) - 2
+    if len(header) + 1 > body_size:
+        raise ValueError(f"Too many fields for an NPY header of {_NPY_HEADER_SIZE} bytes")
+    return (
+        preamble
+        + body_size.to_bytes(2, "little")
+        + header.ljust(body_size - 1).encode("latin1") + b"\n"
+    )
+
+
+def points_to_npy(
+    points: Union[np.ndarray, Iterable[np.ndarray]],
+    output_npy: Union[str, Path],
+    coord_dtype: str = "float32"
+) -> Path:
+    """
+    Save structured point arrays as a single NPY file that can be memory-mapped.
+    
+    Chunks are appended as they arrive and the point count is written into the
+    header at the end, so the whole cloud never has to be held in memory.
+    
+    Parameters:
+    -----------
+    points : np.ndarray or iterable of np.ndarray
+        Structured array as returned by grid_to_points, or chunks of them
+    output_npy : str or Path
+        Path to output NPY file
+    coord_dtype : str, default="float32"
+        dtype for the X, Y, Z fields. CALIPSO midpoints are stored as float32,
+        so float32 coordinates lose no precision.
+    
+    Returns:
+    --------
+    Path
+        Path to the created NPY file
+    """
+    output_npy = Path(output_npy)
+    
+    chunks = iter([points] if isinstance(points, np.ndarray) else points)
+    first = next(chunks, None)
+    if first is None:
+        raise ValueError("No point chunks to write")
+    dtype = _with_coord_dtype(first[:0], coord_dtype).dtype
+    
+    count = 0
+    with open(output_npy, "wb") as f:
+        f.write(_npy_header(dtype, 0))
+        for chunk in itertools.chain([first], chunks):
+            _with_coord_dtype(chunk, coord_dtype).tofile(f)
+            count += len(chunk)
+        f.seek(0)
+        f.write(_npy_header(dtype, count))
+    
+    return output_npy
+
+
+def points_to_parquet(
+    points: Union[np.ndarray, Iterable[np.ndarray]],
+    output_parquet: Union[str, Path],
+    coord_dtype: str = "float32",
+    compression: str = "zstd"
+) -> Path:
+    """
+    Save structured point arrays as a Parquet file, one row group per chunk.
+    
+    Requires pyarrow.
+    
+    Parameters:
+    -----------
+    points : np.ndarray or iterable of np.ndarray
+        Structured array as returned by grid_to_points, or chunks of them
+    output_parquet : str or Path
+        Path to output Parquet file
+    coord_dtype : str, default="float32"
+        dtype for the X, Y, Z columns
+    compression : str, default="zstd"
+        Parquet column compression codec
+    
+    Returns:
+    --------
+    Path
+        Path to the created Parquet file
+    """
+    pa, pq = require_pyarrow()
+    
+    output_parquet = Path(output_parquet)
+    
+    if isinstance(points, np.ndarray):
+        points = [points]
+    
+    writer = None
+    try:
+        for chunk in points:
+            chunk = _with_coord_dtype(chunk, coord_dtype)
+            table = pa.table({name: chunk[name] for name in chunk.dtype.names})
+            if writer is None:
+                writer = pq.ParquetWriter(output_parquet, table.schema, compression=compression)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    
+    if writer is None:
+        raise ValueError("No point chunks to write")
+    
+    return output_parquet
+
+
+def load_points(input_path: Union[str, Path], mmap: bool = True) -> np.ndarray:
+    """
+    Load a columnar intermediate file back into a structured point array.
+    
+    Parameters:
+    -----------
+    input_path : str or Path
+        Path to an NPY or Parquet file written by this module
+    mmap : bool, default=True
+        Memory-map NPY files instead of reading them into memory
+    
+    Returns:
+    --------
+    np.ndarray
+        Structured array with fields X, Y, Z and one field per variable
+    """
+    input_path = Path(input_path)
+    
+    if input_path.suffix == ".npy":
+        return np.load(input_path, mmap_mode="r" if mmap else None)
+    
+    if input_path.suffix == ".parquet":
+        _, pq = require_pyarrow()
+        
+        table = pq.read_table(input_path)
+        points = np.empty(table.num_rows, dtype=[
+            (name, table.schema.field(name).type.to_pandas_dtype()) for name in table.column_names
+        ])
+        for name in table.column_names:
+            points[name] = table.column(name).to_numpy()
+        return points
+    
+    raise ValueError(f"Unsupported columnar format: {input_path.suffix}")
+
+
+def h5_to_columnar(
+    input_h5: Union[str, Path],
+    output_path: Optional[Union[str, Path]] = None,
+    fmt: str = "npy",
+    variable_name: str = "var_to_grab",
+    altitude_units: str = "km",
+    variable_names: Optional[Sequence[str]] = None,
+    fill_values: Optional[Sequence[float]] = None,
+    drop_nan: bool = False,
+    min_value: Optional[float] = None,
+    qc_thresholds: Optional[dict[str, float]] = None,
+    chunk_size: Optional[int] = None,
+    coord_dtype: str = "float32"
+) -> Path:
+    """
+    Convert HDF5 file to a compact binary columnar file (NPY or Parquet).
+    
+    Parameters:
+    -----------
+    input_h5 : str or Path
+        Path to input HDF5 file
+    output_path : str or Path, optional
+        Path to output file. If None, uses same name as input with the format's extension
+    fmt : str, default="npy"
+        "npy" or "parquet"
+    variable_name, altitude_units, variable_names
+        As for h5_to_txt
+    fill_values, drop_nan, min_value, qc_thresholds
+        Filtering options (see masking.valid_point_mask)
+    chunk_size : int, optional
+        Stream the grid in latitude slabs of about this many cells
+    coord_dtype : str, default="float32"
+        dtype for the X, Y, Z fields
+    
+    Returns:
+    --------
+    Path
+        Path to the created file
+    """
+    if fmt not in COLUMNAR_FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'. Available formats: {list(COLUMNAR_FORMATS)}")
+    
+    input_h5 = Path(input_h5)
+    
+    # Generate output filename if not provided
+    if output_path is None:
+        output_path = input_h5.with_suffix(COLUMNAR_FORMATS[fmt])
+    else:
+        output_path = Path(output_path)
+    
+    variable_names = resolve_variable_names(variable_name, variable_names)
+    writer = points_to_npy if fmt == "npy" else points_to_parquet
+    
+    stats = {}
+    with open_h5_grid(input_h5, qc_variable_names(variable_names, qc_thresholds)) as grid:
+        chunks = iter_grid_points(
+            *grid, variable_names, altitude_units, chunk_size,
+            fill_values, drop_nan, min_value, qc_thresholds, stats
+        )
+        writer(chunks, output_path, coord_dtype)
+    
+    logger.info(f"Converted {input_h5} to {output_path}")
+    report_point_counts(stats, filtering_requested(fill_values, drop_nan, min_value, qc_thresholds))
+    
+    return output_path
+
+
+def h5_to_npy(
+    input_h5: Union[str, Path],
+    output_npy: Optional[Union[str, Path]] = None,
+    variable_name: str = "var_to_grab",
+    altitude_units: str = "km",
+    **kwargs
+) -> Path:
+    """
+    Convert HDF5 file to a memory-mappable NPY point file.
+    
+    See h5_to_columnar for the remaining keyword arguments.
+    """
+    return h5_to_columnar(input_h5, output_npy, "npy", variable_name, altitude_units, **kwargs)
+
+
+def h5_to_parquet(
+    input_h5: Union[str, Path],
+    output_parquet: Optional[Union[str, Path]] = None,
+    variable_name: str = "var_to_grab",
+    altitude_units: str = "km",
+    **kwargs
+) -> Path:
+    """
+    Convert HDF5 file to a Parquet point file.
+    
+    See h5_to_columnar for the remaining keyword arguments.
+    """
+    return h5_to_columnar(input_h5, output_parquet, "parquet", variable_name, altitude_units, **kwargs)
+
+
+def main():
+    """Command-line interface for HDF5 to NPY/Parquet conversion."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Convert HDF5 file to a binary columnar format")
+    parser.add_argument("input_h5", help="Path to input HDF5 file")
+    parser.add_argument("-o", "--output", help="Path to output file (optional)")
+    parser.add_argument("-f", "--format", default="npy", choices=list(COLUMNAR_FORMATS),
+                        help="Output format (default: npy)")
+    parser.add_argument("-v", "--variable", nargs="+", default=["var_to_grab"],
+                        help="Name(s) of variables to extract (default: var_to_grab)")
+    parser.add_argument("--alt-units", default="km", choices=["km", "m"],
+                        help="Altitude units in HDF5 file (default: km)")
+    parser.add_argument("--drop-fill", action="store_true",
+                        help="Drop CALIPSO fill values (-9999) and NaN cells")
+    parser.add_argument("--min-value", type=float, default=None,
+                        help="Drop cells below this value")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="Stream the grid in slabs of about this many cells")
+    parser.add_argument("--coord-dtype", default="float32", choices=["float32", "float64"],
+                        help="dtype of the X, Y, Z columns (default: float32)")
+    
+    args = parser.parse_args()
+    configure_logging()
+    
+    h5_to_columnar(
+        args.input_h5,
+        args.output,
+        args.format,
+        altitude_units=args.alt_units,
+        variable_names=args.variable,
+        fill_values=CALIPSO_FILL_VALUES if args.drop_fill else None,
+        drop_nan=args.drop_fill,
+        min_value=args.min_value,
+        chunk_size=args.chunk_size,
+        coord_dtype=args.coord_dtype
+    )
+
+
+if __name__ == "__main__":
+    main()
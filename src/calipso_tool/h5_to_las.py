@@ -0,0 +1,221 @@
+import logging
+import itertools
+import laspy
+import numpy as np
+from pathlib import Path
+from typing import Iterable, Optional, Sequence, Union
+from .h5_to_txt import open_h5_grid, iter_grid_points, report_point_counts, resolve_variable_names
+from .masking import CALIPSO_FILL_VALUES, filtering_requested, qc_variable_names
+from .instrument import configure_logging
+from .scaling import grid_scaling, resolve_scaling
+
+logger = logging.getLogger(__name__)
+
+# Coordinate fields of the structured point arrays; every other field is an extra dimension
+COORDINATE_FIELDS = ("X", "Y", "Z")
+
+# Point array fields written to standard LAS dimensions instead of extra dimensions
+STANDARD_FIELDS = {"GpsTime": "gps_time"}
+
+
+def points_to_las(
+    points: Union[np.ndarray, Iterable[np.ndarray]],
+    output_las: Union[str, Path],
+    scale_x: float = 1e-5,
+    scale_y: float = 1e-5,
+    scale_z: float = 0.01,
+    srs: Optional[str] = "EPSG:4326",
+    scaling: Optional[dict] = None
+) -> Path:
+    """
+    Write structured point arrays straight to a LAS 1.4 file with laspy.
+    
+    Parameters:
+    -----------
+    points : np.ndarray or iterable of np.ndarray
+        Structured array with fields X, Y, Z and one field per variable
+        (see grid_to_points), or chunks of them (e.g. from iter_grid_points)
+        which are streamed to disk one at a time. Each variable is written as
+        an extra dimension of the field's type; a "GpsTime" field fills the
+        standard GPS time dimension (as adjusted standard GPS time).
+    output_las : str or Path
+        Path to output LAS file
+    scale_x, scale_y, scale_z : float
+        Scale factors for X, Y, Z coordinates
+    srs : str, optional, default="EPSG:4326"
+        Spatial reference system. If None, no CRS is written.
+    scaling : dict, optional
+        Scales and offsets from scaling.grid_scaling; overrides scale_x/y/z
+        and replaces the zero offsets
+    
+    Returns:
+    --------
+    Path
+        Path to the created LAS file
+    """
+    output_las = Path(output_las)
+    
+    chunks = iter([points] if isinstance(points, np.ndarray) else points)
+    first = next(chunks, None)
+    if first is None:
+        raise ValueError("No point chunks to write")
+    
+    # Point format 6 is the base LAS 1.4 format, matching what PDAL writes
+    extra_dims = [
+        name for name in first.dtype.names
+        if name not in COORDINATE_FIELDS and name not in STANDARD_FIELDS
+    ]
+    standard_dims = [name for name in first.dtype.names if name in STANDARD_FIELDS]
+    
+    header = laspy.LasHeader(point_format=6, version="1.4")
+    header.add_extra_dims([
+        laspy.ExtraBytesParams(name=name, type=first.dtype[name]) for name in extra_dims
+    ])
+    if "GpsTime" in standard_dims:
+        header.global_encoding.gps_time_type = laspy.header.GpsTimeType.STANDARD
+    scales, offsets = resolve_scaling((scale_x, scale_y, scale_z), scaling)
+    header.scales = np.array(scales)
+    header.offsets = np.array(offsets)
+    
+    if srs is not None:
+        import pyproj
+        header.add_crs(pyproj.CRS.from_user_input(srs))
+    
+    with laspy.open(output_las, mode="w", header=header) as writer:
+        for chunk in itertools.chain([first], chunks):
+            record = laspy.ScaleAwarePointRecord.zeros(len(chunk), header=header)
+            record.x = chunk["X"]
+            record.y = chunk["Y"]
+            record.z = chunk["Z"]
+            for name in standard_dims:
+                record[STANDARD_FIELDS[name]] = chunk[name]
+            for name in extra_dims:
+                record[name] = chunk[name]
+            writer.write_points(record)
+    
+    return output_las
+
+
+def h5_to_las(
+    input_h5: Union[str, Path],
+    output_las: Optional[Union[str, Path]] = None,
+    variable_name: str = "var_to_grab",
+    altitude_units: str = "km",
+    scale_x: float = 1e-5,
+    scale_y: float = 1e-5,
+    scale_z: float = 0.01,
+    srs: Optional[str] = "EPSG:4326",
+    variable_names: Optional[Sequence[str]] = None,
+    fill_values: Optional[Sequence[float]] = None,
+    drop_nan: bool = False,
+    min_value: Optional[float] = None,
+    qc_thresholds: Optional[dict[str, float]] = None,
+    chunk_size: Optional[int] = None,
+    auto_scale: bool = False
+) -> Path:
+    """
+    Convert HDF5 file directly to LAS format, skipping the intermediate text file.
+    
+    Parameters:
+    -----------
+    input_h5 : str or Path
+        Path to input HDF5 file
+    output_las : str or Path, optional
+        Path to output LAS file. If None, uses same name as input with .las extension
+    variable_name : str, default="var_to_grab"
+        Name of the variable to extract (will be added as extra dimension)
+    altitude_units : str, default="km"
+        Units of altitude in the HDF5 file. If "km", will convert to meters.
+    scale_x, scale_y, scale_z : float
+        Scale factors for X, Y, Z coordinates
+    srs : str, optional, default="EPSG:4326"
+        Spatial reference system
+    variable_names : list of str, optional
+        Names of several variables to extract in one pass, one extra dimension
+        each. Overrides variable_name when given.
+    fill_values : sequence of float, optional
+        Values marking empty cells to drop, e.g. masking.CALIPSO_FILL_VALUES
+    drop_nan : bool, default=False
+        Whether to drop NaN cells
+    min_value : float, optional
+        Drop cells whose values are all below this cutoff
+    qc_thresholds : dict[str, float], optional
+        Minimum accepted value per QC variable (read from the same file)
+    chunk_size : int, optional
+        Stream the grid in latitude slabs of about this many cells instead of
+        reading the whole variable into memory
+    auto_scale : bool, default=False
+        Derive scales and offsets from the grid spacing (see scaling.grid_scaling)
+        instead of using scale_x/y/z
+    
+    Returns:
+    --------
+    Path
+        Path to the created LAS file
+    """
+    input_h5 = Path(input_h5)
+    
+    # Generate output filename if not provided
+    if output_las is None:
+        output_las = input_h5.with_suffix('.las')
+    else:
+        output_las = Path(output_las)
+    
+    variable_names = resolve_variable_names(variable_name, variable_names)
+    
+    stats = {}
+    with open_h5_grid(input_h5, qc_variable_names(variable_names, qc_thresholds)) as grid:
+        scaling = grid_scaling(*grid[:3], altitude_units) if auto_scale else None
+        chunks = iter_grid_points(
+            *grid, variable_names, altitude_units, chunk_size,
+            fill_values, drop_nan, min_value, qc_thresholds, stats
+        )
+        points_to_las(chunks, output_las, scale_x, scale_y, scale_z, srs, scaling)
+    
+    logger.info(f"Converted {input_h5} to {output_las}")
+    report_point_counts(stats, filtering_requested(fill_values, drop_nan, min_value, qc_thresholds))
+    
+    return output_las
+
+
+def main():
+    """Command-line interface for h5_to_las conversion."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Convert HDF5 file directly to LAS format")
+    parser.add_argument("input_h5", help="Path to input HDF5 file")
+    parser.add_argument("-o", "--output", help="Path to output LAS file (optional)")
+    parser.add_argument("-v", "--variable", nargs="+", default=["var_to_grab"],
+                        help="Name(s) of variables to extract (default: var_to_grab)")
+    parser.add_argument("--alt-units", default="km", choices=["km", "m"],
+                        help="Altitude units in HDF5 file (default: km)")
+    parser.add_argument("--srs", default="EPSG:4326",
+                        help="Spatial reference system (default: EPSG:4326)")
+    parser.add_argument("--drop-fill", action="store_true",
+                        help="Drop CALIPSO fill values (-9999) and NaN cells")
+    parser.add_argument("--min-value", type=float, default=None,
+                        help="Drop cells below this value")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="Stream the grid in slabs of about this many cells")
+    parser.add_argument("--auto-scale", action="store_true",
+                        help="Derive scales and offsets from the grid spacing")
+    
+    args = parser.parse_args()
+    configure_logging()
+    
+    h5_to_las(
+        args.input_h5,
+        args.output,
+        altitude_units=args.alt_units,
+        srs=args.srs,
+        variable_names=args.variable,
+        fill_values=CALIPSO_FILL_VALUES if args.drop_fill else None,
+        drop_nan=args.drop_fill,
+        min_value=args.min_value,
+        chunk_size=args.chunk_size,
+        auto_scale=args.auto_scale
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import json
+import logging
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+# Parent logger of every calipso_tool module; configure it to control pipeline output
+logger = logging.getLogger("calipso_tool")
+
+# Environment variable ("1") making the batch workers' reports reset peak RSS per stage
+RESET_PEAK_ENV = "CALIPSO_RESET_PEAK_RSS"
+
+
+def configure_logging(level: Union[int, str] = logging.INFO) -> logging.Logger:
+    """
+    Send calipso_tool log messages to stdout, as the command-line tools do.
+    
+    Library users can instead configure the "calipso_tool" logger themselves.
+    """
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+    logger.setLevel(level)
+    return logger
+
+
+def _reset_peak_rss() -> bool:
+    """Reset the kernel's peak RSS counter for this process (Linux only)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_bytes(since_reset: bool) -> int:
+    """Peak resident set size since the last reset, or over the process lifetime."""
+    if since_reset:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _file_size(path: Optional[Union[str, Path]]) -> Optional[int]:
+    if path is None or not Path(path).exists():
+        return None
+    return Path(path).stat().st_size
+
+
+class RunReport:
+    """
+    Per-stage wall time, peak memory, bytes in/out and throughput of a pipeline run.
+    
+    Pass one to the conversion functions (report=...) and every stage they run
+    is appended to report.stages. Stage records are plain dicts with keys
+    name, seconds, peak_rss_bytes, bytes_in, bytes_out, points and points_per_sec
+    (values are None when not applicable).
+    
+    By default peak_rss_bytes is the process's peak resident memory so far
+    (ru_maxrss), which never decreases from one stage to the next. With
+    reset_peak the kernel's peak counter is reset at the start of each stage
+    (Linux only), giving per-stage peaks; this changes process-wide state, so
+    use it only in processes that run one stage at a time and whose other
+    code does not read the counter (benchmarks, batch worker processes).
+    
+    Parameters:
+    -----------
+    reset_peak : bool, default=False
+        Reset the process's peak RSS counter at the start of every stage
+    
+    Example:
+    --------
+    >>> report = RunReport()
+    >>> h4_to_copc("granule.hdf", report=report)
+    >>> report.to_json("granule_report.json")
+    """
+    
+    def __init__(self, reset_peak: bool = False):
+        self.reset_peak = reset_peak
+        self.stages = []
+    
+    @contextmanager
+    def stage(
+        self,
+        name: str,
+        input_path: Optional[Union[str, Path]] = None,
+        output_path: Optional[Union[str, Path]] = None
+    ) -> Iterator[dict]:
+        """
+        Time a stage and record its resource use.
+        
+        Yields the stage record, so the caller can fill in "points" (or change
+        "output_path") before the stage ends. The record is kept even if the
+        stage raises, with "error" set.
+        """
+        record = {
+            "name": name,
+            "input_path": None if input_path is None else str(input_path),
+            "output_path": None if output_path is None else str(output_path),
+            "points": None,
+        }
+        since_reset = self.reset_peak and _reset_peak_rss()
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            record["seconds"] = seconds
+            record["peak_rss_bytes"] = _peak_rss_bytes(since_reset)
+            record["bytes_in"] = _file_size(record["input_path"])
+            record["bytes_out"] = _file_size(record["output_path"])
+            record["points_per_sec"] = (
+                record["points"] / seconds if record["points"] and seconds > 0 else None
+            )
+            self.stages.append(record)
+            logger.debug(
+                "%s: %.2fs, peak RSS %.1f MB", name, seconds, record["peak_rss_bytes"] / 1024**2
+            )
+    
+    @property
+    def total_seconds(self) -> float:
+        """Sum of the wall times of all recorded stages."""
+        return sum(record["seconds"] for record in self.stages)
+    
+    def to_dict(self) -> dict:
+        """Report as a JSON-serializable dict."""
+        return {"total_seconds": self.total_seconds, "stages": self.stages}
+    
+    def to_json(self, output_json: Optional[Union[str, Path]] = None) -> str:
+        """Serialize the report to JSON, also writing it to output_json if given."""
+        text = json.dumps(self.to_dict(), indent=2)
+        if output_json is not None:
+            Path(output_json).write_text(text)
+        return text
+    
+    def log_summary(self, level: int = logging.INFO) -> None:
+        """Log one line per stage with its time, memory and throughput."""
+        for record in self.stages:
+            line = f"  {record['name']}: {record['seconds']:.2f}s, " \
+                   f"peak RSS {record['peak_rss_bytes'] / 1024**2:.1f} MB"
+            if record["bytes_out"] is not None:
+                line += f", wrote {record['bytes_out'] / 1024**2:.2f} MB"
+            if record["points_per_sec"] is not None:
+                line += f", {record['points_per_sec']:,.0f} points/s"
+            logger.log(level, line)
+
+
+@contextmanager
+def track_stage(
+    report: Optional[RunReport],
+    name: str,
+    input_path: Optional[Union[str, Path]] = None,
+    output_path: Optional[Union[str, Path]] = None
+) -> Iterator[dict]:
+    """
+    RunReport.stage that also works without a report.
+    
+    Without a report the yielded record is simply discarded, so the
+    conversion functions can instrument their stages unconditionally.
+    """
+    if report is None:
+        yield {}
+    else:
+        with report.stage(name, input_path, output_path) as record:
+            yield record
\ No newline at end of file
@@ -1,14 +1,176 @@
-import subprocess
+import logging
+import itertools
 import json
+import os
+import numpy as np
 from pathlib import Path
-from typing import Optional, Union
-import tempfile
+from typing import Iterable, Optional, Sequence, Union
+from .cache import ArtifactCache
+from .instrument import configure_logging, RunReport, track_stage
+from .manifest import JobManifest
+from .h5_to_las import COORDINATE_FIELDS, points_to_las
+from .h5_to_txt import resolve_variable_names
+from .pdal_runner import print_summary, run_pipeline
+from .scaling import point_file_scaling, resolve_scaling
+from .txt_to_las import pipeline_cache_key, reader_stage
+from .workspace import scratch_dir
+
+logger = logging.getLogger(__name__)
+
+# Auto-tuning modes of the COPC writer (see copc_writer_options)
+COPC_TUNING_MODES = ("size", "speed")
+
+# PDAL type names of the extra dimension dtypes written by this package
+_PDAL_TYPES = {
+    np.dtype(np.float32): "float",
+    np.dtype(np.float64): "double",
+    np.dtype(np.int32): "int32",
+    np.dtype(np.uint8): "uint8",
+}
+
+
+def _constant_extra_dims(input_las: Path, names: Sequence[str]) -> set[str]:
+    """Extra dimensions whose value is the same for every point of the file."""
+    import laspy
+    
+    lows = {name: np.inf for name in names}
+    highs = {name: -np.inf for name in names}
+    with laspy.open(input_las) as reader:
+        for chunk in reader.chunk_iterator(1_000_000):
+            for name in names:
+                values = np.asarray(chunk[name])
+                if values.size:
+                    lows[name] = min(lows[name], np.nanmin(values))
+                    highs[name] = max(highs[name], np.nanmax(values))
+    return {name for name in names if lows[name] == highs[name]}
+
+
+def _centred_offsets(header, scale: Optional[Sequence[float]]) -> np.ndarray:
+    """
+    Offsets near the centre of the data that keep every input coordinate representable.
+    
+    With the input scales (e.g. a scaling.grid_scaling lattice such as cells
+    at -122.5 + 5k degrees) the offsets move from the input offsets by whole
+    steps, so the stored integers change but the decoded coordinates do not.
+    Other scales snap the centre to a multiple of the scale; without scales
+    (PDAL's default) it is rounded to whole units.
+    """
+    centre = (header.mins + header.maxs) / 2
+    if scale is None:
+        return np.round(centre)
+    scale = np.asarray(scale, dtype=np.float64)
+    base = header.offsets if np.allclose(scale, header.scales, rtol=1e-12, atol=0) else np.zeros(3)
+    return base + np.round((centre - base) / scale) * scale
+
+
+def copc_writer_options(
+    input_las: Union[str, Path],
+    threads: Optional[int] = None,
+    scale: Optional[Union[str, Sequence[float]]] = None,
+    offset: Optional[Union[str, Sequence[float]]] = None,
+    extra_dims: Optional[Sequence[str]] = None,
+    tune: Optional[str] = None
+) -> dict:
+    """
+    Build writers.copc options from a LAS file's header and the requested tuning.
+    
+    Parameters:
+    -----------
+    input_las : str or Path
+        LAS file that will be converted; only its header is read (and, for
+        tune="size", its extra dimensions)
+    threads : int, optional
+        Number of writer threads. If None, PDAL's default
+    scale : "input" or (x, y, z), optional
+        Coordinate scales. "input" keeps the input file's scales, which are
+        already matched to the data; None leaves PDAL's default
+    offset : "auto", "input" or (x, y, z), optional
+        Coordinate offsets. "auto" centres the offsets on the data extent,
+        snapped to the coordinate lattice (see _centred_offsets) so no point is
+        re-quantized; "input" keeps the input file's offsets; None leaves
+        PDAL's default
+    extra_dims : list of str, optional
+        Extra dimensions to write. If None, every extra dimension of the input
+        is written; a list drops all others
+    tune : str, optional
+        "speed" uses one writer thread per CPU, "size" additionally drops
+        extra dimensions that are constant over the file. Both keep the input
+        scales and centre the offsets unless scale/offset are given
+    
+    Returns:
+    --------
+    dict
+        Options to merge into the writers.copc stage
+    """
+    import laspy
+    
+    if tune is not None and tune not in COPC_TUNING_MODES:
+        raise ValueError(f"Unknown tune mode '{tune}'. Available modes: {list(COPC_TUNING_MODES)}")
+    
+    input_las = Path(input_las)
+    with laspy.open(input_las) as reader:
+        header = reader.header
+    
+    if tune is not None:
+        scale = "input" if scale is None else scale
+        offset = "auto" if offset is None else offset
+    if tune == "speed" and threads is None:
+        threads = os.cpu_count()
+    
+    options = {}
+    if threads is not None:
+        options["threads"] = int(threads)
+    
+    if isinstance(scale, str):
+        if scale != "input":
+            raise ValueError(f"Unknown scale '{scale}'; use 'input' or (x, y, z)")
+        scale = header.scales
+    if scale is not None:
+        options.update(zip(("scale_x", "scale_y", "scale_z"), map(float, scale)))
+    
+    if isinstance(offset, str):
+        if offset == "input":
+            offset = header.offsets
+        elif offset == "auto":
+            offset = _centred_offsets(header, scale)
+        else:
+            raise ValueError(f"Unknown offset '{offset}'; use 'auto', 'input' or (x, y, z)")
+    if offset is not None:
+        options.update(zip(("offset_x", "offset_y", "offset_z"), map(float, offset)))
+    
+    dims = {
+        name: header.point_format.dimension_by_name(name).dtype
+        for name in header.point_format.extra_dimension_names
+    }
+    if extra_dims is not None:
+        missing = [name for name in extra_dims if name not in dims]
+        if missing:
+            raise KeyError(f"Extra dimension(s) {missing} not in {input_las}. Available: {list(dims)}")
+        dims = {name: dims[name] for name in extra_dims}
+    if tune == "size" and dims:
+        constant = _constant_extra_dims(input_las, list(dims))
+        if constant:
+            logger.info(f"  Dropping constant extra dimensions: {', '.join(sorted(constant))}")
+        dims = {name: dtype for name, dtype in dims.items() if name not in constant}
+    options["extra_dims"] = ", ".join(
+        f"{name}={_PDAL_TYPES.get(np.dtype(dtype), 'double')}" for name, dtype in dims.items()
+    )
+    
+    return options
 
 
 def las_to_copc(
     input_las: Union[str, Path],
     output_copc: Optional[Union[str, Path]] = None,
-    pipeline_json: Optional[Union[str, Path]] = None
+    pipeline_json: Optional[Union[str, Path]] = None,
+    show_info: bool = False,
+    cache: Optional[ArtifactCache] = None,
+    report: Optional[RunReport] = None,
+    threads: Optional[int] = None,
+    scale: Optional[Union[str, Sequence[float]]] = None,
+    offset: Optional[Union[str, Sequence[float]]] = None,
+    extra_dims: Optional[Sequence[str]] = None,
+    tune: Optional[str] = None
 ) -> Path:
     """
     Convert LAS file to Cloud-Optimized Point Cloud (COPC) format using PDAL.
@@ -21,6 +183,15 @@ def las_to_copc(
         Path to output COPC file. If None, uses same name as input with .copc.laz extension
     pipeline_json : str or Path, optional
         Path to PDAL pipeline JSON file. If None, creates pipeline programmatically
+    show_info : bool, default=False
+        Print the summary of the created COPC file (like `pdal info --summary`)
+    cache : ArtifactCache, optional
+        Reuse a previously converted COPC file for the same input and pipeline
+    report : RunReport, optional
+        Records wall time, peak memory, bytes in/out and throughput of each stage
+    threads, scale, offset, extra_dims, tune
+        Writer tuning (see copc_writer_options). Every extra dimension of the
+        input is written unless extra_dims or tune="size" prunes them
     
     Returns:
     --------
@@ -65,65 +236,64 @@ def las_to_copc(
             ]
         }
     
-    # Write temporary pipeline file
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-        json.dump(pipeline, f, indent=2)
-        temp_pipeline = f.name
+    writer_options = copc_writer_options(input_las, threads, scale, offset, extra_dims, tune)
+    for stage in pipeline["pipeline"]:
+        if stage["type"] == "writers.copc":
+            tuned = any(v is not None for v in (threads, scale, offset, extra_dims, tune))
+            if pipeline_json is not None and not tuned:
+                writer_options.pop("extra_dims")  # keep what the pipeline JSON asks for
+            stage.update(writer_options)
+    
+    if cache is not None:
+        cache_key = pipeline_cache_key(cache, input_las, "las_to_copc", pipeline)
+        if cache.fetch(cache_key, output_copc):
+            logger.info(f"✓ Cache hit: {output_copc}")
+            return output_copc
     
     try:
-        # Run PDAL pipeline
-        print(f"Converting {input_las} to COPC format...")
+        # Run PDAL pipeline in-process
+        logger.info(f"Converting {input_las} to COPC format...")
+        
+        with track_stage(report, "las_to_copc", input_las, output_copc) as record:
+            points = record["points"] = run_pipeline(pipeline)
+        logger.info(f"✓ Created: {output_copc}")
+        
+        if cache is not None:
+            cache.store(cache_key, output_copc)
+        
+        # Report file sizes
+        input_size = os.path.getsize(input_las)
+        output_size = os.path.getsize(output_copc)
         
-        result = subprocess.run(
-            ["pdal", "pipeline", temp_pipeline],
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        logger.info(f"\nFile sizes:")
+        logger.info(f"  Input LAS: {input_size / 1024**2:.2f} MB")
+        logger.info(f"  Output COPC: {output_size / 1024**2:.2f} MB")
+        if points:
+            logger.info(f"  Bytes per point: {input_size / points:.1f} LAS → {output_size / points:.1f} COPC")
         
-        if result.returncode == 0:
-            print(f"✓ Created: {output_copc}")
-            
-            # Get file info
-            info_result = subprocess.run(
-                ["pdal", "info", str(output_copc), "--summary"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            
-            if info_result.returncode == 0:
-                # Parse output size info
-                import os
-                input_size = os.path.getsize(input_las) / (1024 * 1024)  # MB
-                output_size = os.path.getsize(output_copc) / (1024 * 1024)  # MB
-                compression_ratio = (1 - output_size / input_size) * 100
-                
-                print(f"\nFile sizes:")
-                print(f"  Input LAS: {input_size:.2f} MB")
-                print(f"  Output COPC: {output_size:.2f} MB")
-                print(f"  Compression: {compression_ratio:.1f}%")
+        if show_info:
+            print_summary(output_copc, "COPC")
         
         return output_copc
         
-    except subprocess.CalledProcessError as e:
-        print(f"✗ PDAL pipeline failed: {e}")
-        print(f"Error output: {e.stderr}")
+    except RuntimeError as e:
+        logger.error(f"✗ PDAL pipeline failed: {e}")
         raise
-    
-    finally:
-        # Clean up temporary pipeline file
-        Path(temp_pipeline).unlink(missing_ok=True)
 
 
 def las_to_copc_pipeline(
     input_las: Union[str, Path],
-    output_copc: Optional[Union[str, Path]] = None
+    output_copc: Optional[Union[str, Path]] = None,
+    show_info: bool = False,
+    cache: Optional[ArtifactCache] = None,
+    report: Optional[RunReport] = None,
+    **writer_options
 ) -> Path:
     """
     Convert LAS to COPC using the default pipeline JSON if available.
     
     This is a convenience wrapper that automatically finds the las2copc.json file.
+    writer_options (threads, scale, offset, extra_dims, tune) are passed to las_to_copc.
     """
     input_las = Path(input_las)
     
@@ -131,16 +301,211 @@ def las_to_copc_pipeline(
     pipeline_json = Path(__file__).parent.parent / "pdal_pipeline" / "las2copc.json"
     
     if pipeline_json.exists():
-        return las_to_copc(input_las, output_copc, pipeline_json)
+        return las_to_copc(input_las, output_copc, pipeline_json, show_info, cache, report,
+                           **writer_options)
     else:
         # Fall back to programmatic approach
-        return las_to_copc(input_las, output_copc)
+        return las_to_copc(input_las, output_copc, show_info=show_info, cache=cache, report=report,
+                           **writer_options)
+
+
+def copc_writer_stage(
+    output_copc: Union[str, Path],
+    variable_names: Sequence[str],
+    scale_x: float = 1e-5,
+    scale_y: float = 1e-5,
+    scale_z: float = 0.01,
+    srs: Optional[str] = "EPSG:4326",
+    scaling: Optional[dict] = None
+) -> dict:
+    """
+    Build a writers.copc stage with the same scaling and extra dimensions as writers.las.
+    
+    scaling (from scaling.grid_scaling) overrides the fixed scales and zero offsets.
+    """
+    (scale_x, scale_y, scale_z), (offset_x, offset_y, offset_z) = resolve_scaling(
+        (scale_x, scale_y, scale_z), scaling
+    )
+    stage = {
+        "type": "writers.copc",
+        "filename": str(output_copc),
+        "scale_x": scale_x,
+        "scale_y": scale_y,
+        "scale_z": scale_z,
+        "offset_x": offset_x,
+        "offset_y": offset_y,
+        "offset_z": offset_z,
+        "extra_dims": [f"{name}=float" for name in variable_names]
+    }
+    if srs is not None:
+        stage["a_srs"] = srs
+    return stage
+
+
+def points_to_copc(
+    points: Union[np.ndarray, Iterable[np.ndarray]],
+    output_copc: Union[str, Path],
+    scale_x: float = 1e-5,
+    scale_y: float = 1e-5,
+    scale_z: float = 0.01,
+    srs: Optional[str] = "EPSG:4326",
+    show_info: bool = False,
+    report: Optional[RunReport] = None,
+    scaling: Optional[dict] = None
+) -> Path:
+    """
+    Write structured point arrays straight to COPC in a single PDAL pipeline.
+    
+    A single array is handed to PDAL in memory, so no uncompressed LAS file
+    is written or read back. Several chunks (e.g. the slabs of
+    iter_grid_points with chunk_size) are streamed one at a time into a
+    scratch LAS file on the same scales and offsets and read back by PDAL,
+    so only one slab is held in Python at a time. writers.copc itself still
+    holds every point to build the octree.
+    
+    Parameters:
+    -----------
+    points : np.ndarray or iterable of np.ndarray
+        Structured array with fields X, Y, Z and one field per variable
+        (see grid_to_points), or chunks of them (e.g. from iter_grid_points)
+    output_copc : str or Path
+        Path to output COPC file
+    scale_x, scale_y, scale_z : float
+        Scale factors for X, Y, Z coordinates
+    srs : str, optional, default="EPSG:4326"
+        Spatial reference system assigned to the output
+    show_info : bool, default=False
+        Print the summary of the created COPC file
+    report : RunReport, optional
+        Records wall time, peak memory, bytes in/out and throughput of each stage
+    scaling : dict, optional
+        Scales and offsets from scaling.grid_scaling; overrides scale_x/y/z
+    
+    Returns:
+    --------
+    Path
+        Path to the created COPC file
+    """
+    output_copc = Path(output_copc)
+    
+    chunks = iter([points] if isinstance(points, np.ndarray) else points)
+    head = list(itertools.islice(chunks, 2))
+    if not head:
+        raise ValueError("No point chunks to write")
+    
+    first = head[0]
+    variable_names = [name for name in first.dtype.names if name not in COORDINATE_FIELDS]
+    writer = copc_writer_stage(output_copc, variable_names, scale_x, scale_y, scale_z, srs, scaling)
+    # Extra dimensions keep the type of their field (e.g. uint8 overview levels)
+    writer["extra_dims"] = [
+        f"{name}={_PDAL_TYPES.get(first.dtype[name], 'double')}" for name in variable_names
+    ]
+    
+    try:
+        with track_stage(report, "points_to_copc", output_path=output_copc) as record:
+            if len(head) == 1:
+                record["points"] = run_pipeline([{"type": "filters.merge"}, writer], arrays=head)
+            else:
+                # Same scales and offsets as the writer, so the LAS round trip is lossless
+                with scratch_dir(prefix=f"{output_copc.name}_") as scratch:
+                    scratch_las = points_to_las(itertools.chain(head, chunks), scratch / "points.las",
+                                                scale_x, scale_y, scale_z, srs=None, scaling=scaling)
+                    reader = {"type": "readers.las", "filename": str(scratch_las)}
+                    record["points"] = run_pipeline([reader, writer])
+    except RuntimeError as e:
+        logger.error(f"✗ PDAL pipeline failed: {e}")
+        raise
+    
+    if show_info:
+        print_summary(output_copc, "COPC")
+    
+    return output_copc
+
+
+def txt_to_copc(
+    input_txt: Union[str, Path],
+    output_copc: Optional[Union[str, Path]] = None,
+    variable_name: str = "var_to_grab",
+    scale_x: float = 1e-5,
+    scale_y: float = 1e-5,
+    scale_z: float = 0.01,
+    srs: str = "EPSG:4326",
+    variable_names: Optional[Sequence[str]] = None,
+    show_info: bool = False,
+    report: Optional[RunReport] = None,
+    scaling: Optional[Union[str, dict]] = None
+) -> Path:
+    """
+    Convert a text (or NPY/Parquet) point file straight to COPC in one PDAL pipeline.
+    
+    Equivalent to txt_to_las followed by las_to_copc, without the intermediate LAS file.
+    
+    Parameters:
+    -----------
+    input_txt : str or Path
+        Path to input text, NPY or Parquet file
+    output_copc : str or Path, optional
+        Path to output COPC file. If None, uses same name as input with .copc.laz extension
+    variable_name : str, default="var_to_grab"
+        Name of the variable that was extracted (will be added as extra dimension)
+    scale_x, scale_y, scale_z : float
+        Scale factors for X, Y, Z coordinates
+    srs : str, default="EPSG:4326"
+        Spatial reference system
+    variable_names : list of str, optional
+        Names of several extracted variables, one extra dimension each.
+        Overrides variable_name when given.
+    show_info : bool, default=False
+        Print the summary of the created COPC file
+    report : RunReport, optional
+        Records wall time, peak memory, bytes in/out and throughput of each stage
+    scaling : "auto" or dict, optional
+        Scales and offsets overriding scale_x/y/z: "auto" derives them from
+        the file's coordinates (see scaling.point_file_scaling)
+    
+    Returns:
+    --------
+    Path
+        Path to the created COPC file
+    """
+    input_txt = Path(input_txt)
+    
+    # Generate output filename if not provided
+    if output_copc is None:
+        output_copc = input_txt.parent / f"{input_txt.stem}.copc.laz"
+    else:
+        output_copc = Path(output_copc)
+    
+    variable_names = resolve_variable_names(variable_name, variable_names)
+    if scaling == "auto":
+        scaling = point_file_scaling(input_txt)
+    
+    pipeline = [
+        reader_stage(input_txt, srs),
+        copc_writer_stage(output_copc, variable_names, scale_x, scale_y, scale_z, srs, scaling)
+    ]
+    
+    try:
+        logger.info(f"Converting {input_txt} to COPC format...")
+        with track_stage(report, "txt_to_copc", input_txt, output_copc) as record:
+            record["points"] = run_pipeline(pipeline)
+        logger.info(f"✓ Created: {output_copc}")
+    except RuntimeError as e:
+        logger.error(f"✗ PDAL pipeline failed: {e}")
+        raise
+    
+    if show_info:
+        print_summary(output_copc, "COPC")
+    
+    return output_copc
 
 
 def batch_las_to_copc(
     directory: Union[str, Path],
     pattern: str = "*.las",
-    skip_existing: bool = True
+    skip_existing: bool = True,
+    manifest: Optional[Union[str, Path, JobManifest]] = None,
+    **writer_options
 ) -> tuple[list[Path], list[tuple[Path, str]]]:
     """
     Convert all LAS files in a directory to COPC format.
@@ -152,7 +517,13 @@ def batch_las_to_copc(
     pattern : str, default="*.las"
         Glob pattern for finding LAS files
     skip_existing : bool, default=True
-        Skip conversion if COPC file already exists
+        Skip files that are already converted: those recorded as done in the
+        manifest if one is given, otherwise those whose COPC file exists
+    manifest : str, Path or JobManifest, optional
+        SQLite job manifest recording the status of every file, so an
+        interrupted batch reconverts half-written outputs instead of skipping them
+    **writer_options
+        COPC writer tuning passed to las_to_copc (threads, scale, offset, extra_dims, tune)
     
     Returns:
     --------
@@ -162,7 +533,10 @@ def batch_las_to_copc(
     directory = Path(directory)
     las_files = list(directory.glob(pattern))
     
-    print(f"Found {len(las_files)} LAS files to convert")
+    if manifest is not None and not isinstance(manifest, JobManifest):
+        manifest = JobManifest(manifest)
+    
+    logger.info(f"Found {len(las_files)} LAS files to convert")
     
     successful = []
     failed = []
@@ -170,24 +544,45 @@ def batch_las_to_copc(
     for las_file in las_files:
         copc_file = las_file.parent / f"{las_file.stem}.copc.laz"
         
-        if skip_existing and copc_file.exists():
-            print(f"⏭️  Skipping {las_file.name} (COPC already exists)")
+        if manifest is not None:
+            if skip_existing and manifest.is_done(las_file):
+                logger.info(f"⏭️  Skipping {las_file.name} (done in manifest)")
+                successful.append(copc_file)
+                continue
+            manifest.mark_running(las_file)
+        elif skip_existing and copc_file.exists():
+            logger.info(f"⏭️  Skipping {las_file.name} (COPC already exists)")
             successful.append(copc_file)
             continue
         
         try:
-            result = las_to_copc_pipeline(las_file)
+            result = las_to_copc_pipeline(las_file, **writer_options)
             successful.append(result)
+            if manifest is not None:
+                manifest.mark_done(las_file, result)
         except Exception as e:
             failed.append((las_file, str(e)))
+            if manifest is not None:
+                manifest.mark_failed(las_file, str(e))
     
-    print(f"\nBatch conversion complete:")
-    print(f"  Successful: {len(successful)}")
-    print(f"  Failed: {len(failed)}")
+    logger.info(f"\nBatch conversion complete:")
+    logger.info(f"  Successful: {len(successful)}")
+    logger.info(f"  Failed: {len(failed)}")
     
     return successful, failed
 
 
+def _parse_triplet(values: Optional[list[str]], keywords: Sequence[str], option: str):
+    """Parse a --scale/--offset argument: None, one of the keywords, or three numbers."""
+    if values is None:
+        return None
+    if len(values) == 1 and values[0] in keywords:
+        return values[0]
+    if len(values) != 3:
+        raise SystemExit(f"{option} takes {' or '.join(repr(k) for k in keywords)} or three numbers")
+    return tuple(float(v) for v in values)
+
+
 def main():
     """Command-line interface for LAS to COPC conversion."""
     import argparse
@@ -200,19 +595,41 @@ def main():
                         help="Process all LAS files in the directory")
     parser.add_argument("--pattern", default="*.las",
                         help="Glob pattern for batch processing (default: *.las)")
+    parser.add_argument("--info", action="store_true",
+                        help="Print a summary of the created COPC file")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Number of COPC writer threads (default: PDAL's)")
+    parser.add_argument("--scale", nargs="+", default=None, metavar="SCALE",
+                        help="Coordinate scales: 'input' or three numbers X Y Z")
+    parser.add_argument("--offset", nargs="+", default=None, metavar="OFFSET",
+                        help="Coordinate offsets: 'auto' (centre of the data, snapped to the coordinate "
+                             "lattice), 'input' or three numbers X Y Z")
+    parser.add_argument("--extra-dims", nargs="+", default=None,
+                        help="Only write these extra dimensions (default: all)")
+    parser.add_argument("--tune", choices=COPC_TUNING_MODES, default=None,
+                        help="Pick writer settings for smallest output ('size') or fastest write ('speed')")
     
     args = parser.parse_args()
+    configure_logging()
+    
+    writer_options = {
+        "threads": args.threads,
+        "scale": _parse_triplet(args.scale, ("input",), "--scale"),
+        "offset": _parse_triplet(args.offset, ("auto", "input"), "--offset"),
+        "extra_dims": args.extra_dims,
+        "tune": args.tune,
+    }
     
     if args.batch:
         # Batch processing mode
         directory = Path(args.input_las).parent if Path(args.input_las).is_file() else Path(args.input_las)
-        batch_las_to_copc(directory, args.pattern)
+        batch_las_to_copc(directory, args.pattern, **writer_options)
     else:
         # Single file mode
         if args.pipeline:
-            las_to_copc(args.input_las, args.output, args.pipeline)
+            las_to_copc(args.input_las, args.output, args.pipeline, args.info, **writer_options)
         else:
-            las_to_copc_pipeline(args.input_las, args.output)
+            las_to_copc_pipeline(args.input_las, args.output, args.info, **writer_options)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,209 @@
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+# Granule status values
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS granules (
+    input_path TEXT PRIMARY KEY,
+    input_size INTEGER,
+    input_mtime_ns INTEGER,
+    input_sha256 TEXT,
+    status TEXT NOT NULL,
+    output_path TEXT,
+    output_size INTEGER,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    seconds REAL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stages (
+    input_path TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    output_path TEXT,
+    output_size INTEGER,
+    seconds REAL,
+    error TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (input_path, stage)
+);
+"""
+
+
+def _path_key(path: Union[str, Path]) -> str:
+    """Absolute path used as manifest key, so runs from other directories match."""
+    return str(Path(path).resolve())
+
+
+class JobManifest:
+    """
+    Persistent per-granule record of a batch conversion, stored in SQLite.
+    
+    For each input granule the manifest keeps its status (pending, running,
+    done, failed), input size/mtime/checksum, output path and size, attempt
+    count and last error, plus one row per completed or failed stage. Every
+    update is a single SQLite transaction, so a killed run never leaves the
+    manifest half-written, and a granule only counts as done if its recorded
+    output still exists with the recorded size and its input is unchanged.
+    
+    Parameters:
+    -----------
+    path : str or Path
+        Path to the SQLite manifest file (created if missing)
+    """
+    
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=60)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def _execute(self, sql: str, params: Sequence = ()) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(sql, params)
+        finally:
+            conn.close()
+    
+    def _query(self, sql: str, params: Sequence = ()) -> list[dict]:
+        conn = self._connect()
+        try:
+            return [dict(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+    
+    def get(self, input_path: Union[str, Path]) -> Optional[dict]:
+        """Manifest row of a granule, or None if it was never scheduled."""
+        rows = self._query("SELECT * FROM granules WHERE input_path = ?", (_path_key(input_path),))
+        return rows[0] if rows else None
+    
+    def stages(self, input_path: Union[str, Path]) -> list[dict]:
+        """Stage rows of a granule in the order they were recorded."""
+        return self._query(
+            "SELECT * FROM stages WHERE input_path = ? ORDER BY updated_at", (_path_key(input_path),)
+        )
+    
+    def is_done(self, input_path: Union[str, Path], check_input: bool = True) -> bool:
+        """
+        True if the granule's last run succeeded and its output is still intact.
+        
+        check_input=False skips the input size/mtime check, for inputs that are
+        deleted after conversion (e.g. downloads in fetch.fetch_convert).
+        """
+        row = self.get(input_path)
+        if row is None or row["status"] != DONE:
+            return False
+        if check_input:
+            stat = Path(input_path).stat()
+            if (stat.st_size, stat.st_mtime_ns) != (row["input_size"], row["input_mtime_ns"]):
+                return False
+        output = Path(row["output_path"])
+        return output.exists() and output.stat().st_size == row["output_size"]
+    
+    def mark_running(self, input_path: Union[str, Path]) -> None:
+        """Record that a conversion attempt of the granule has started."""
+        stat = Path(input_path).stat()
+        self._execute(
+            """
+            INSERT INTO granules (input_path, input_size, input_mtime_ns, status, attempts, updated_at)
+            VALUES (?, ?, ?, ?, 1, ?)
+            ON CONFLICT (input_path) DO UPDATE SET
+                input_size = excluded.input_size,
+                input_mtime_ns = excluded.input_mtime_ns,
+                status = excluded.status,
+                attempts = attempts + 1,
+                error = NULL,
+                updated_at = excluded.updated_at
+            """,
+            (_path_key(input_path), stat.st_size, stat.st_mtime_ns, RUNNING, time.time())
+        )
+    
+    def record_stages(self, input_path: Union[str, Path], stages: Sequence[dict]) -> None:
+        """Store stage records (as produced by RunReport) for the granule."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                for record in stages:
+                    conn.execute(
+                        """
+                        INSERT OR REPLACE INTO stages
+                            (input_path, stage, status, output_path, output_size, seconds, error, updated_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        (
+                            _path_key(input_path), record["name"],
+                            FAILED if record.get("error") else DONE,
+                            record.get("output_path"), record.get("bytes_out"),
+                            record.get("seconds"), record.get("error"), now
+                        )
+                    )
+        finally:
+            conn.close()
+    
+    def mark_done(
+        self,
+        input_path: Union[str, Path],
+        output_path: Union[str, Path],
+        input_sha256: Optional[str] = None,
+        seconds: Optional[float] = None
+    ) -> None:
+        """Record a successful conversion and the size of its output."""
+        self._execute(
+            """
+            UPDATE granules SET status = ?, output_path = ?, output_size = ?,
+                input_sha256 = COALESCE(?, input_sha256), seconds = ?, error = NULL, updated_at = ?
+            WHERE input_path = ?
+            """,
+            (DONE, _path_key(output_path), Path(output_path).stat().st_size,
+             input_sha256, seconds, time.time(), _path_key(input_path))
+        )
+    
+    def mark_failed(
+        self,
+        input_path: Union[str, Path],
+        error: str,
+        input_sha256: Optional[str] = None,
+        seconds: Optional[float] = None
+    ) -> None:
+        """
+        Record a failed conversion and its error message.
+        
+        Granules that failed before mark_running (e.g. whose download failed)
+        get a row of their own, counted as one attempt.
+        """
+        self._execute(
+            """
+            INSERT INTO granules (input_path, input_sha256, status, attempts, error, seconds, updated_at)
+            VALUES (?, ?, ?, 1, ?, ?, ?)
+            ON CONFLICT (input_path) DO UPDATE SET
+                status = excluded.status,
+                error = excluded.error,
+                input_sha256 = COALESCE(excluded.input_sha256, input_sha256),
+                seconds = excluded.seconds,
+                updated_at = excluded.updated_at
+            """,
+            (_path_key(input_path), input_sha256, FAILED, error, seconds, time.time())
+        )
+    
+    def failed(self) -> list[dict]:
+        """Rows of every granule whose last attempt failed."""
+        return self._query("SELECT * FROM granules WHERE status = ? ORDER BY input_path", (FAILED,))
+    
+    def summary(self) -> dict[str, int]:
+        """Number of granules per status."""
+        rows = self._query("SELECT status, COUNT(*) AS n FROM granules GROUP BY status")
+        return {row["status"]: row["n"] for row in rows}
\ No newline at end of file
@@ -0,0 +1,87 @@
+import numpy as np
+from typing import Optional, Sequence
+
+# Fill value used by CALIPSO L3 products for empty/undefined cells
+CALIPSO_FILL_VALUES = (-9999.0,)
+
+
+def qc_variable_names(
+    variable_names: Sequence[str],
+    qc_thresholds: Optional[dict[str, float]] = None
+) -> list[str]:
+    """
+    Return variable_names extended with any QC variables that must also be read.
+    """
+    names = list(variable_names)
+    for name in qc_thresholds or {}:
+        if name not in names:
+            names.append(name)
+    return names
+
+
+def filtering_requested(
+    fill_values: Optional[Sequence[float]] = None,
+    drop_nan: bool = False,
+    min_value: Optional[float] = None,
+    qc_thresholds: Optional[dict[str, float]] = None
+) -> bool:
+    """Return True if any of the filtering options is set."""
+    return bool(fill_values) or drop_nan or min_value is not None or bool(qc_thresholds)
+
+
+def valid_point_mask(
+    variables: dict[str, np.ndarray],
+    fill_values: Optional[Sequence[float]] = None,
+    drop_nan: bool = False,
+    min_value: Optional[float] = None,
+    qc_variables: Optional[dict[str, np.ndarray]] = None,
+    qc_thresholds: Optional[dict[str, float]] = None
+) -> Optional[np.ndarray]:
+    """
+    Build a flat boolean mask of the grid cells worth keeping.
+    
+    A cell is kept when at least one of the variables holds a valid value
+    (not a fill value, not NaN, and >= min_value) and every QC variable
+    meets its threshold.
+    
+    Parameters:
+    -----------
+    variables : dict[str, np.ndarray]
+        Variable data keyed by name, all with the same shape
+    fill_values : sequence of float, optional
+        Values marking empty cells, e.g. CALIPSO_FILL_VALUES
+    drop_nan : bool, default=False
+        Whether NaN cells count as empty
+    min_value : float, optional
+        Values below this cutoff count as empty
+    qc_variables : dict[str, np.ndarray], optional
+        QC variable data keyed by name, same shape as the variables
+    qc_thresholds : dict[str, float], optional
+        Minimum accepted value for each QC variable
+    
+    Returns:
+    --------
+    np.ndarray or None
+        Flattened boolean mask, or None when no filtering was requested
+    """
+    if not filtering_requested(fill_values, drop_nan, min_value, qc_thresholds):
+        return None
+    
+    keep = None
+    for data in variables.values():
+        data = data.ravel()
+        valid = np.ones(data.shape, dtype=bool)
+        if fill_values:
+            valid &= ~np.isin(data, np.asarray(fill_values, dtype=data.dtype))
+        if drop_nan and np.issubdtype(data.dtype, np.floating):
+            valid &= ~np.isnan(data)
+        if min_value is not None:
+            valid &= data >= min_value
+        keep = valid if keep is None else keep | valid
+    
+    for name, threshold in (qc_thresholds or {}).items():
+        if qc_variables is None or name not in qc_variables:
+            raise KeyError(f"QC variable '{name}' was not read from the input file")
+        keep &= qc_variables[name].ravel() >= threshold
+    
+    return keep
@@ -0,0 +1,234 @@
+import logging
+import numpy as np
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Sequence, Union
+from .h5_to_txt import iter_grid_points
+from .masking import CALIPSO_FILL_VALUES, valid_point_mask
+from .scaling import grid_scaling
+
+logger = logging.getLogger(__name__)
+
+# Block statistics available for overview levels
+OVERVIEW_STATISTICS = ("mean", "max")
+
+# Cells aggregated per overview block along (lat, lon, alt) at level 1; level k uses block ** k
+DEFAULT_BLOCK = (2, 2, 4)
+
+# Extra dimension holding the level of each point in a tagged COPC file (0 = full resolution)
+LEVEL_DIMENSION = "OverviewLevel"
+
+# Ways to write overview levels
+OVERVIEW_MODES = ("files", "tagged")
+
+# Point cloud suffixes split off before the level is inserted, longest first
+_POINT_CLOUD_SUFFIXES = (".copc.laz", ".laz", ".las")
+
+
+def block_midpoints(coords: np.ndarray, factor: int) -> np.ndarray:
+    """Mean midpoint of each run of factor consecutive midpoints (the last run may be shorter)."""
+    starts = np.arange(0, len(coords), factor)
+    sums = np.add.reduceat(np.asarray(coords, dtype=np.float64), starts)
+    counts = np.diff(np.append(starts, len(coords)))
+    return (sums / counts).astype(coords.dtype)
+
+
+def block_reduce(
+    data: np.ndarray,
+    valid: np.ndarray,
+    block: Sequence[int],
+    statistic: str = "mean"
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Aggregate a 3D array over blocks of cells, ignoring invalid cells.
+    
+    The array is zero-padded to a whole number of blocks and reshaped so each
+    block becomes its own axes, so the reduction is a single vectorized call.
+    
+    Parameters:
+    -----------
+    data : np.ndarray
+        3D (lat, lon, alt) values
+    valid : np.ndarray
+        Boolean array of the same shape; False cells are left out of the statistic
+    block : sequence of int
+        Block size along each axis
+    statistic : str, default="mean"
+        "mean" or "max" of the valid cells
+    
+    Returns:
+    --------
+    tuple[np.ndarray, np.ndarray]
+        float32 block values (NaN for blocks without valid cells) and the number
+        of valid cells per block
+    """
+    if statistic not in OVERVIEW_STATISTICS:
+        raise ValueError(f"Unknown statistic '{statistic}'. Available statistics: {list(OVERVIEW_STATISTICS)}")
+    
+    pad = [(0, -n % b) for n, b in zip(data.shape, block)]
+    if any(after for _, after in pad):
+        data = np.pad(data, pad)
+        valid = np.pad(valid, pad)
+    
+    shape = []
+    for n, b in zip(data.shape, block):
+        shape += [n // b, b]
+    data = data.reshape(shape)
+    valid = valid.reshape(shape)
+    axes = (1, 3, 5)
+    
+    counts = valid.sum(axis=axes)
+    if statistic == "mean":
+        sums = np.where(valid, data, 0).sum(axis=axes, dtype=np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            values = sums / counts
+    else:
+        values = np.where(valid, data, -np.inf).max(axis=axes)
+    values = values.astype(np.float32)
+    values[counts == 0] = np.nan
+    
+    return values, counts
+
+
+def overview_grids(
+    lat1d: np.ndarray,
+    lon1d: np.ndarray,
+    alt1d: np.ndarray,
+    variables: dict,
+    variable_names: Sequence[str],
+    levels: int = 1,
+    block: Sequence[int] = DEFAULT_BLOCK,
+    statistic: str = "mean",
+    fill_values: Optional[Sequence[float]] = CALIPSO_FILL_VALUES,
+    min_value: Optional[float] = None,
+    qc_thresholds: Optional[dict[str, float]] = None,
+    chunk_size: Optional[int] = None
+) -> list[tuple[np.ndarray, np.ndarray, np.ndarray, dict[str, np.ndarray]]]:
+    """
+    Coarser copies of a grid, one per overview level, computed in a single pass.
+    
+    Level k aggregates blocks of block ** k cells (e.g. 2x2x4, then 4x4x16).
+    The grid is read in latitude slabs aligned to the coarsest block, so
+    memory is bounded by chunk_size plus the (much smaller) overview grids.
+    Fill values, NaN, values below min_value and cells failing QC are
+    excluded from every statistic; blocks without any valid cell are NaN.
+    
+    Parameters:
+    -----------
+    lat1d, lon1d, alt1d : np.ndarray
+        1D latitude, longitude and altitude midpoints
+    variables : dict
+        Variable data keyed by name (arrays or lazy datasets), including any QC variables
+    variable_names : list of str
+        Variables to aggregate
+    levels : int, default=1
+        Number of overview levels
+    block : sequence of int, default=(2, 2, 4)
+        Cells per block along latitude, longitude and altitude at level 1
+    statistic : str, default="mean"
+        Block statistic, "mean" or "max"
+    fill_values : sequence of float, optional
+        Values marking empty cells, excluded from the statistics
+    min_value : float, optional
+        Values below this cutoff are excluded
+    qc_thresholds : dict[str, float], optional
+        Minimum accepted value per QC variable
+    chunk_size : int, optional
+        Approximate number of grid cells read per slab. If None, the whole grid at once
+    
+    Returns:
+    --------
+    list of tuple
+        (lat1d, lon1d, alt1d, {name: float32 array}) per level, block-mean midpoints
+        as coordinates, usable wherever a grid is (e.g. iter_grid_points)
+    """
+    if levels < 1:
+        raise ValueError(f"levels must be at least 1, got {levels}")
+    if statistic not in OVERVIEW_STATISTICS:
+        raise ValueError(f"Unknown statistic '{statistic}'. Available statistics: {list(OVERVIEW_STATISTICS)}")
+    
+    factors = [tuple(b ** k for b in block) for k in range(1, levels + 1)]
+    grids = []
+    for f_lat, f_lon, f_alt in factors:
+        coords = (block_midpoints(lat1d, f_lat), block_midpoints(lon1d, f_lon), block_midpoints(alt1d, f_alt))
+        shape = tuple(len(c) for c in coords)
+        grids.append((*coords, {name: np.empty(shape, dtype=np.float32) for name in variable_names}))
+    
+    n_lat = len(lat1d)
+    lat_step = factors[-1][0]
+    rows = n_lat if chunk_size is None else max(1, chunk_size // max(len(lon1d) * len(alt1d), 1))
+    rows = max(lat_step, rows // lat_step * lat_step)
+    
+    for start in range(0, n_lat, rows):
+        stop = min(start + rows, n_lat)
+        qc_variables = {
+            name: np.asarray(variables[name][start:stop]) for name in (qc_thresholds or {})
+        }
+        for name in variable_names:
+            data = np.asarray(variables[name][start:stop])
+            mask = valid_point_mask({name: data}, fill_values, True, min_value,
+                                    qc_variables, qc_thresholds)
+            valid = mask.reshape(data.shape)
+            for factor, (_, _, _, outputs) in zip(factors, grids):
+                values, _ = block_reduce(data, valid, factor, statistic)
+                row = start // factor[0]
+                outputs[name][row:row + len(values)] = values
+    
+    for level, (lat, lon, alt, _) in enumerate(grids, 1):
+        logger.info(f"  Overview level {level}: {len(lat)} x {len(lon)} x {len(alt)} blocks ({statistic})")
+    return grids
+
+
+def tag_level(chunks: Iterable[np.ndarray], level: int) -> Iterator[np.ndarray]:
+    """Append a constant uint8 LEVEL_DIMENSION field to every point array."""
+    for points in chunks:
+        out = np.empty(len(points), dtype=np.dtype(points.dtype.descr + [(LEVEL_DIMENSION, np.uint8)]))
+        for field in points.dtype.names:
+            out[field] = points[field]
+        out[LEVEL_DIMENSION] = level
+        yield out
+
+
+def overview_points(
+    overview: tuple,
+    variable_names: Sequence[str],
+    altitude_units: str = "km",
+    level: Optional[int] = None,
+    crs: Optional[str] = None
+) -> Iterator[np.ndarray]:
+    """
+    Point arrays of one overview grid; blocks without valid cells are dropped.
+    
+    With level, the points are tagged with it (see tag_level); with crs they
+    are reprojected like the full-resolution points.
+    """
+    chunks = iter_grid_points(*overview, variable_names, altitude_units, drop_nan=True, crs=crs)
+    return chunks if level is None else tag_level(chunks, level)
+
+
+def overview_path(output_copc: Union[str, Path], level: int) -> Path:
+    """
+    Path of an overview file: <granule>.copc.laz → <granule>.overview1.copc.laz.
+    
+    Only the point cloud suffix is split off, so the dots of CALIPSO names
+    (...V4-20.2018-01D.copc.laz) stay in the granule part.
+    """
+    output_copc = Path(output_copc)
+    name = output_copc.name
+    for suffix in _POINT_CLOUD_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    return output_copc.with_name(f"{name}.overview{level}.copc.laz")
+
+
+def combined_scaling(grids: Sequence[tuple], altitude_units: str = "km") -> dict:
+    """
+    Scales and offsets on which the midpoints of all the given grids are representable.
+    
+    Used for tagged files, where full-resolution and overview points share one header.
+    """
+    lat, lon, alt = (
+        np.concatenate([np.asarray(grid[axis], dtype=np.float64) for grid in grids])
+        for axis in range(3)
+    )
+    return grid_scaling(lat, lon, alt, altitude_units)
\ No newline at end of file
@@ -0,0 +1,79 @@
+import logging
+import json
+import numpy as np
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+
+def _import_pdal():
+    """Import the PDAL Python bindings with a helpful error if they are missing."""
+    try:
+        import pdal
+    except ImportError as e:
+        raise ImportError(
+            "The PDAL Python bindings are required to run PDAL pipelines. "
+            "Install them with: conda install -c conda-forge python-pdal"
+        ) from e
+    return pdal
+
+
+def run_pipeline(
+    pipeline: Union[dict, list],
+    arrays: Optional[Sequence[np.ndarray]] = None
+) -> int:
+    """
+    Execute a PDAL pipeline in-process with the pdal Python bindings.
+    
+    Parameters:
+    -----------
+    pipeline : dict or list
+        Pipeline as loaded from a PDAL JSON file ({"pipeline": [...]}) or a
+        bare list of stages
+    arrays : sequence of np.ndarray, optional
+        Structured point arrays (fields X, Y, Z, ...) fed to the first stage
+        instead of a reader, so points never go through an intermediate file
+    
+    Returns:
+    --------
+    int
+        Number of points processed
+    """
+    pdal = _import_pdal()
+    
+    stages = pipeline["pipeline"] if isinstance(pipeline, dict) else pipeline
+    if arrays:
+        pdal_pipeline = pdal.Pipeline(json.dumps(stages), arrays=list(arrays))
+    else:
+        pdal_pipeline = pdal.Pipeline(json.dumps(stages))
+    
+    return pdal_pipeline.execute()
+
+
+def point_cloud_summary(input_path: Union[str, Path]) -> dict:
+    """
+    Return the header summary of a point cloud file without reading its points.
+    
+    This is the in-process equivalent of `pdal info --summary`.
+    
+    Parameters:
+    -----------
+    input_path : str or Path
+        Path to a LAS/LAZ/COPC file
+    
+    Returns:
+    --------
+    dict
+        PDAL quickinfo of the file's reader (bounds, point count, dimensions, srs)
+    """
+    pdal = _import_pdal()
+    
+    quickinfo = pdal.Pipeline(json.dumps([str(input_path)])).quickinfo
+    return next(iter(quickinfo.values()), {})
+
+
+def print_summary(input_path: Union[str, Path], label: str = "LAS") -> None:
+    """Print the point cloud summary of input_path."""
+    logger.info(f"{label} file info:")
+    logger.info(json.dumps(point_cloud_summary(input_path), indent=2))
\ No newline at end of file
@@ -0,0 +1,302 @@
+import logging
+from collections import OrderedDict
+from operator import attrgetter
+import laspy
+import lazrs
+import numpy as np
+from pathlib import Path
+from typing import Callable, Optional, Sequence, Union
+from laspy import CopcReader, PackedPointRecord, ScaleAwarePointRecord
+# Undocumented laspy 2.x internals (hierarchy walk); laspy is pinned to <3 for them
+from laspy.copc import Bounds, load_octree_for_query
+from laspy.header import GpsTimeType
+from .overview import LEVEL_DIMENSION, overview_path
+
+logger = logging.getLogger(__name__)
+
+# Decompressed octree nodes kept in memory per open file
+DEFAULT_CACHE_NODES = 256
+
+# Half-width (degrees) of the box searched for the column nearest to a location;
+# wide enough for the 2° x 5° Level 3 grid
+DEFAULT_COLUMN_RADIUS = 5.0
+
+
+class NodeCache:
+    """
+    LRU cache of decompressed COPC octree nodes.
+    
+    Missing nodes are read in file order, one read per run of contiguous
+    chunks, and decompressed in one lazrs call with a chunk table. This uses
+    undocumented attributes of laspy 2.7's CopcReader (source, laszip_vlr),
+    which is why laspy is pinned to <3.
+    
+    Parameters:
+    -----------
+    reader : laspy.CopcReader
+        Open reader of the COPC file
+    decode : callable
+        Turns a laspy point record into the array to cache
+    max_nodes : int, default=256
+        Number of decoded nodes kept in memory
+    """
+    
+    def __init__(
+        self,
+        reader: CopcReader,
+        decode: Callable[[ScaleAwarePointRecord], np.ndarray],
+        max_nodes: int = DEFAULT_CACHE_NODES
+    ):
+        self.reader = reader
+        self.decode = decode
+        self.max_nodes = max_nodes
+        self.hits = 0
+        self.misses = 0
+        self._nodes = OrderedDict()
+    
+    def clear(self) -> None:
+        self._nodes.clear()
+    
+    def _read(self, nodes: list) -> ScaleAwarePointRecord:
+        """Decompressed points of nodes sorted by file offset."""
+        header = self.reader.header
+        compressed = bytearray(sum(node.byte_size for node in nodes))
+        view = memoryview(compressed)
+        position = 0
+        run_start, run_end = 0, None
+        for i, node in enumerate(nodes + [None]):
+            if node is not None and node.offset == run_end:
+                run_end += node.byte_size
+                continue
+            if run_end is not None:
+                size = run_end - nodes[run_start].offset
+                self.reader.source.seek(nodes[run_start].offset)
+                self.reader.source.readinto(view[position:position + size])
+                position += size
+            if node is not None:
+                run_start, run_end = i, node.offset + node.byte_size
+        
+        buffer = np.zeros(sum(node.point_count for node in nodes) * header.point_format.size, dtype=np.uint8)
+        lazrs.decompress_points_with_chunk_table(
+            compressed, self.reader.laszip_vlr.record_data, buffer,
+            [(node.point_count, node.byte_size) for node in nodes]
+        )
+        record = PackedPointRecord.from_buffer(buffer, header.point_format)
+        return ScaleAwarePointRecord(record.array, header.point_format, header.scales, header.offsets)
+    
+    def get(self, nodes: list) -> list[np.ndarray]:
+        """Decoded points of each octree node, decompressing only the nodes not in the cache."""
+        keys = [(n.key.level, n.key.x, n.key.y, n.key.z) for n in nodes]
+        found = {}
+        for key in keys:
+            if key in self._nodes:
+                self._nodes.move_to_end(key)
+                found[key] = self._nodes[key]
+        self.hits += len(found)
+        
+        missing = sorted(
+            (node for node, key in zip(nodes, keys) if key not in found), key=attrgetter("offset")
+        )
+        if missing:
+            self.misses += len(missing)
+            points = self.decode(self._read(missing))
+            bounds = np.cumsum([0] + [node.point_count for node in missing])
+            for node, start, stop in zip(missing, bounds[:-1], bounds[1:]):
+                key = (node.key.level, node.key.x, node.key.y, node.key.z)
+                found[key] = points[start:stop].copy()
+                self._nodes[key] = found[key]
+            while len(self._nodes) > self.max_nodes:
+                self._nodes.popitem(last=False)
+        
+        logger.debug(f"  {len(nodes)} nodes ({len(missing)} read, cache: {self.hits} hits, {self.misses} misses)")
+        return [found[key] for key in keys]
+
+
+class CopcQuery:
+    """
+    Box and vertical-column queries over a COPC file that read only the octree nodes they need.
+    
+    The COPC hierarchy is walked to find the nodes whose bounds intersect the
+    query; only those LAZ chunks are read and decompressed, and the
+    decompressed nodes are kept in an LRU cache (see NodeCache) so repeated
+    queries over the same region do not touch the file again.
+    Points come back as structured arrays like the ones the converters write:
+    float64 X (longitude), Y (latitude) and Z (altitude, metres for files
+    converted from km altitudes) plus one field per extra dimension, and
+    GpsTime for files with a time dimension (see stack.stack_to_copc).
+    
+    Parameters:
+    -----------
+    copc_file : str or Path
+        Path to the COPC file
+    cache_nodes : int, default=256
+        Number of decompressed octree nodes kept in memory
+    """
+    
+    def __init__(self, copc_file: Union[str, Path], cache_nodes: int = DEFAULT_CACHE_NODES):
+        self.copc_file = Path(copc_file)
+        self.reader = CopcReader.open(self.copc_file)
+        self.cache = NodeCache(self.reader, self._decode, cache_nodes)
+        
+        header = self.reader.header
+        self.extra_dims = list(header.point_format.extra_dimension_names)
+        fields = [("X", np.float64), ("Y", np.float64), ("Z", np.float64)]
+        fields += [(name, header.point_format.dimension_by_name(name).dtype) for name in self.extra_dims]
+        self.has_time = header.global_encoding.gps_time_type == GpsTimeType.STANDARD
+        if self.has_time:
+            fields.append(("GpsTime", np.float64))
+        self.dtype = np.dtype(fields)
+    
+    @property
+    def hits(self) -> int:
+        """Nodes served from the cache so far."""
+        return self.cache.hits
+    
+    @property
+    def misses(self) -> int:
+        """Nodes read and decompressed so far."""
+        return self.cache.misses
+    
+    def __enter__(self) -> "CopcQuery":
+        return self
+    
+    def __exit__(self, *exc) -> None:
+        self.close()
+    
+    def close(self) -> None:
+        """Close the file and drop the node cache."""
+        self.reader.source.close()
+        self.cache.clear()
+    
+    def _decode(self, record) -> np.ndarray:
+        """Structured point array of a laspy point record."""
+        points = np.empty(len(record), dtype=self.dtype)
+        points["X"] = record.x
+        points["Y"] = record.y
+        points["Z"] = record.z
+        for name in self.extra_dims:
+            points[name] = record[name]
+        if self.has_time:
+            points["GpsTime"] = record.gps_time
+        return points
+    
+    def box(
+        self,
+        bbox: Optional[Sequence[float]] = None,
+        alt_range: Optional[Sequence[float]] = None,
+        max_level: Optional[int] = None,
+        overview_level: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Points inside a longitude/latitude box and altitude range.
+        
+        Parameters:
+        -----------
+        bbox : sequence of float, optional
+            (lon_min, lat_min, lon_max, lat_max). If None, the whole file
+        alt_range : sequence of float, optional
+            (min, max) altitude in the file's Z units (metres for files converted
+            from km altitudes). If None, all altitudes
+        max_level : int, optional
+            Deepest octree level to read (0 = root only), for a thinned preview.
+            If None, full resolution
+        overview_level : int, optional
+            Only points of this OverviewLevel, for files written with
+            overview_mode="tagged" (0 = full resolution)
+        
+        Returns:
+        --------
+        np.ndarray
+            Structured array with X, Y, Z and one field per extra dimension
+        """
+        header = self.reader.header
+        mins = np.array(header.mins, dtype=np.float64)
+        maxs = np.array(header.maxs, dtype=np.float64)
+        if bbox is not None:
+            mins[:2] = bbox[:2]
+            maxs[:2] = bbox[2:]
+        if alt_range is not None:
+            mins[2], maxs[2] = alt_range
+        if overview_level is not None and LEVEL_DIMENSION not in self.extra_dims:
+            raise ValueError(f"{self.copc_file} has no {LEVEL_DIMENSION} dimension; "
+                             f"it was not written with tagged overviews")
+        
+        levels = None if max_level is None else range(0, max_level + 1)
+        nodes = load_octree_for_query(
+            self.reader.source, self.reader.copc_info, self.reader.root_page, Bounds(mins, maxs), levels
+        )
+        nodes = [node for node in nodes if node.point_count > 0]
+        if not nodes:
+            return np.empty(0, dtype=self.dtype)
+        
+        points = np.concatenate(self.cache.get(nodes))
+        # Scaled integers rarely decode to the exact bound (30 → 30.000000000000004)
+        margin = header.scales / 2
+        keep = np.ones(len(points), dtype=bool)
+        for axis, name in enumerate(("X", "Y", "Z")):
+            keep &= (points[name] >= mins[axis] - margin[axis]) & (points[name] <= maxs[axis] + margin[axis])
+        if overview_level is not None:
+            keep &= points[LEVEL_DIMENSION] == overview_level
+        return points[keep]
+    
+    def column(
+        self,
+        lon: float,
+        lat: float,
+        radius: float = DEFAULT_COLUMN_RADIUS,
+        alt_range: Optional[Sequence[float]] = None,
+        max_level: Optional[int] = None,
+        overview_level: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Vertical profile: the points of the grid column nearest to (lon, lat), by altitude.
+        
+        Only the nodes within radius degrees of the location are read. Returns an
+        empty array if no point lies within radius. alt_range, max_level and
+        overview_level are as in box.
+        """
+        bbox = (lon - radius, lat - radius, lon + radius, lat + radius)
+        points = self.box(bbox, alt_range, max_level, overview_level)
+        if len(points) == 0:
+            return points
+        
+        nearest = np.argmin((points["X"] - lon) ** 2 + (points["Y"] - lat) ** 2)
+        profile = points[(points["X"] == points["X"][nearest]) & (points["Y"] == points["Y"][nearest])]
+        return profile[np.argsort(profile["Z"], kind="stable")]
+
+
+def resolve_overview(copc_file: Union[str, Path], overview_level: Optional[int]) -> tuple[Path, Optional[int]]:
+    """
+    File and OverviewLevel filter to query for an overview level.
+    
+    Files with tagged overviews are queried as they are. For files written
+    with overview_mode="files", level k > 0 is read from the
+    <granule>.overview<k>.copc.laz file next to them (see overview.overview_path)
+    without a level filter.
+    """
+    copc_file = Path(copc_file)
+    if not overview_level:
+        return copc_file, overview_level
+    with laspy.open(copc_file) as reader:
+        tagged = LEVEL_DIMENSION in reader.header.point_format.extra_dimension_names
+    level_file = overview_path(copc_file, overview_level)
+    if not tagged and level_file.exists():
+        return level_file, None
+    return copc_file, overview_level
+
+
+def query_copc(
+    copc_file: Union[str, Path],
+    bbox: Optional[Sequence[float]] = None,
+    alt_range: Optional[Sequence[float]] = None,
+    max_level: Optional[int] = None,
+    overview_level: Optional[int] = None
+) -> np.ndarray:
+    """
+    One-off box query of a COPC file (see CopcQuery.box); keep a CopcQuery open for repeated queries.
+    
+    overview_level also finds the overview files written next to copc_file (see resolve_overview).
+    """
+    copc_file, overview_level = resolve_overview(copc_file, overview_level)
+    with CopcQuery(copc_file) as query:
+        return query.box(bbox, alt_range, max_level, overview_level)
\ No newline at end of file
@@ -0,0 +1,124 @@
+import logging
+import numpy as np
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Earth-centred, Earth-fixed WGS84 coordinates in metres
+ECEF_CRS = "EPSG:4978"
+
+# Scale of reprojected coordinates (1 cm); every axis is in metres after reprojection
+PROJECTED_SCALE = 0.01
+
+
+def geodetic_to_ecef(
+    lat: np.ndarray,
+    lon: np.ndarray,
+    height: np.ndarray,
+    semi_major: float = 6378137.0,
+    inverse_flattening: float = 298.257223563
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Closed-form geodetic to Earth-centred, Earth-fixed coordinates (WGS84 by default).
+    
+    The inputs only need to be broadcastable against each other, so 1D
+    midpoints shaped (lat, 1, 1), (1, lon, 1) and (1, 1, alt) give the
+    coordinates of the whole grid while the trigonometry runs once per
+    midpoint.
+    
+    Parameters:
+    -----------
+    lat, lon : np.ndarray
+        Latitude and longitude in degrees
+    height : np.ndarray
+        Height above the ellipsoid in metres
+    semi_major : float, default=6378137.0
+        Semi-major axis of the ellipsoid in metres
+    inverse_flattening : float, default=298.257223563
+        Inverse flattening of the ellipsoid
+    
+    Returns:
+    --------
+    tuple[np.ndarray, np.ndarray, np.ndarray]
+        X, Y, Z in metres
+    """
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    height = np.asarray(height, dtype=np.float64)
+    
+    e2 = (2 - 1 / inverse_flattening) / inverse_flattening
+    sin_lat, cos_lat = np.sin(lat), np.cos(lat)
+    n = semi_major / np.sqrt(1 - e2 * sin_lat ** 2)
+    
+    x = (n + height) * (cos_lat * np.cos(lon))
+    y = (n + height) * (cos_lat * np.sin(lon))
+    z = (n * (1 - e2) + height) * sin_lat
+    return x, y, z
+
+
+def grid_coordinates(
+    lat1d: np.ndarray,
+    lon1d: np.ndarray,
+    alt1d: np.ndarray,
+    crs: str
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    X, Y, Z of the grid midpoints in crs, as arrays broadcastable to (lat, lon, alt).
+    
+    Geocentric CRSs (e.g. EPSG:4978) use geodetic_to_ecef on the CRS's
+    ellipsoid; projected CRSs transform the lat x lon mesh once with pyproj
+    and keep the altitudes as Z. Altitudes are taken as ellipsoidal heights:
+    CALIPSO altitudes are above mean sea level, so points are off by the geoid
+    undulation (within about ±100 m).
+    
+    Parameters:
+    -----------
+    lat1d, lon1d : np.ndarray
+        1D latitude and longitude midpoints in degrees
+    alt1d : np.ndarray
+        1D altitude midpoints in metres
+    crs : str
+        Target CRS, anything pyproj.CRS.from_user_input accepts
+    
+    Returns:
+    --------
+    tuple[np.ndarray, np.ndarray, np.ndarray]
+        float64 X, Y, Z in the units of crs (metres)
+    """
+    import pyproj
+    
+    target = pyproj.CRS.from_user_input(crs)
+    lat = np.asarray(lat1d, dtype=np.float64)[:, None, None]
+    lon = np.asarray(lon1d, dtype=np.float64)[None, :, None]
+    alt = np.asarray(alt1d, dtype=np.float64)[None, None, :]
+    
+    if target.is_geocentric:
+        ellipsoid = target.ellipsoid
+        return geodetic_to_ecef(lat, lon, alt, ellipsoid.semi_major_metre, ellipsoid.inverse_flattening)
+    if target.is_geographic:
+        raise ValueError(f"{crs} is geographic; omit crs to write longitude/latitude")
+    
+    transformer = pyproj.Transformer.from_crs("EPSG:4326", target, always_xy=True)
+    lon2d, lat2d = np.broadcast_arrays(lon[:, :, 0], lat[:, :, 0])
+    x, y = transformer.transform(lon2d, lat2d)
+    return np.asarray(x)[:, :, None], np.asarray(y)[:, :, None], alt
+
+
+def projected_scaling(scale: float = PROJECTED_SCALE) -> dict:
+    """Scales and offsets for reprojected points: the same metric scale on every axis, zero offsets."""
+    return {"scales": (scale, scale, scale), "offsets": (0.0, 0.0, 0.0)}
+
+
+def check_reprojection(crs: Optional[str], text_stage: bool, auto_scale: bool) -> None:
+    """Raise ValueError for a geographic crs or options that cannot be combined with crs."""
+    import pyproj
+    
+    if crs is None:
+        return
+    if pyproj.CRS.from_user_input(crs).is_geographic:
+        raise ValueError(f"{crs} is geographic; omit crs to write longitude/latitude")
+    if text_stage:
+        raise ValueError("crs reprojects the grid as it is written; use text_stage=False")
+    if auto_scale:
+        raise ValueError("auto_scale derives scales from the longitude/latitude lattice; "
+                         "reprojected points use a fixed metric scale")
\ No newline at end of file
@@ -0,0 +1,179 @@
+import logging
+import numpy as np
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+# Largest number of subdivisions of the smallest spacing tried when looking for a common lattice
+MAX_SUBDIVISIONS = 1000
+
+# Default error bound, as a fraction of the smallest spacing between midpoints
+DEFAULT_RELATIVE_TOLERANCE = 1e-4
+
+
+def _lattice_error(values: np.ndarray, offset: float, scale: float) -> float:
+    """Largest distance between values and their nearest point on offset + k * scale."""
+    k = np.round((values - offset) / scale)
+    return float(np.max(np.abs(offset + k * scale - values)))
+
+
+def _snap(value: float, is_valid) -> float:
+    """Round value to the fewest significant digits that still satisfy is_valid."""
+    for digits in range(1, 16):
+        rounded = float(f"{value:.{digits}g}")
+        if is_valid(rounded):
+            return rounded
+    return value
+
+
+def lattice_scale(
+    values: np.ndarray,
+    tolerance: Optional[float] = None
+) -> tuple[float, float, float]:
+    """
+    Coarsest scale and an offset that represent every value on an integer lattice.
+    
+    Finds the largest scale s (the smallest midpoint spacing, or an integer
+    fraction of it) and offset o such that every value is within tolerance of
+    o + k * s for an integer k. Scale and offset are rounded to the fewest
+    significant digits that keep the error within tolerance, so float32
+    midpoints such as 0.0299999993 km still give scale 60 m.
+    
+    Parameters:
+    -----------
+    values : np.ndarray
+        Coordinate values (e.g. grid midpoints); duplicates are ignored
+    tolerance : float, optional
+        Largest accepted reconstruction error. If None, 1e-4 of the smallest spacing
+    
+    Returns:
+    --------
+    tuple[float, float, float]
+        Scale, offset and the largest reconstruction error of any value
+    """
+    unique = np.unique(np.asarray(values, dtype=np.float64))
+    unique = unique[np.isfinite(unique)]
+    if unique.size == 0:
+        raise ValueError("No finite coordinate values to derive a scale from")
+    if unique.size == 1:
+        return 1.0, float(unique[0]), 0.0
+    
+    step = float(np.min(np.diff(unique)))
+    if tolerance is None:
+        tolerance = DEFAULT_RELATIVE_TOLERANCE * step
+    
+    offset = float(unique[0])
+    fits = lambda s: _lattice_error(unique, offset, s) <= tolerance
+    for divisions in range(1, MAX_SUBDIVISIONS + 1):
+        # Float32 midpoints make the raw spacing slightly off; a rounded one may fit
+        scale = _snap(step / divisions, fits)
+        if fits(scale):
+            break
+    else:
+        raise ValueError(f"Coordinates are not on a regular lattice finer than 1/{MAX_SUBDIVISIONS} "
+                         f"of their smallest spacing ({step}); use fixed scales instead")
+    
+    offset = _snap(offset, lambda o: _lattice_error(unique, o, scale) <= tolerance)
+    return scale, offset, _lattice_error(unique, offset, scale)
+
+
+def grid_scaling(
+    lat1d: np.ndarray,
+    lon1d: np.ndarray,
+    alt1d: np.ndarray,
+    altitude_units: str = "km",
+    relative_tolerance: float = DEFAULT_RELATIVE_TOLERANCE
+) -> dict:
+    """
+    LAS scales and offsets derived from the grid midpoints.
+    
+    X, Y and Z (in the units written to the point cloud, i.e. metres when
+    altitude_units is "km") each get the coarsest lossless scale for their
+    midpoints, so the integers stored in LAS/COPC count grid cells and LAZ
+    compresses them far better than with fixed 1e-5 / 0.01 scales.
+    
+    Parameters:
+    -----------
+    lat1d, lon1d, alt1d : np.ndarray
+        1D latitude, longitude and altitude midpoints
+    altitude_units : str, default="km"
+        Units of alt1d. If "km", altitudes are converted to meters as in grid_to_points
+    relative_tolerance : float, default=1e-4
+        Error bound per axis as a fraction of its smallest midpoint spacing
+    
+    Returns:
+    --------
+    dict
+        "scales" and "offsets" as (x, y, z) tuples and "max_error", the largest
+        coordinate error per axis
+    """
+    if altitude_units.lower() == "km":
+        alt1d = np.asarray(alt1d) * 1000  # same precision as grid_to_points
+    
+    results = []
+    for values in (lon1d, lat1d, alt1d):
+        values = np.asarray(values, dtype=np.float64)
+        unique = np.unique(values)
+        tolerance = relative_tolerance * float(np.min(np.diff(unique))) if unique.size > 1 else 0.0
+        results.append(lattice_scale(unique, tolerance))
+    
+    scaling = {
+        "scales": tuple(r[0] for r in results),
+        "offsets": tuple(r[1] for r in results),
+        "max_error": tuple(r[2] for r in results),
+    }
+    log_scaling(scaling)
+    return scaling
+
+
+def point_file_scaling(
+    input_path: Union[str, Path],
+    relative_tolerance: float = DEFAULT_RELATIVE_TOLERANCE,
+    chunk_size: int = 5_000_000
+) -> dict:
+    """
+    LAS scales and offsets derived from the coordinates of a point file.
+    
+    Reads the X, Y and Z columns of a text (h5_to_txt), NPY or Parquet
+    (h5_to_columnar) point file and applies the grid_scaling rules to their
+    distinct values. Altitudes in point files are already in metres.
+    """
+    input_path = Path(input_path)
+    
+    if input_path.suffix in (".npy", ".parquet"):
+        from .h5_to_columnar import load_points
+        
+        points = load_points(input_path)
+        columns = [np.unique(points[name]) for name in ("X", "Y", "Z")]
+    else:
+        import pandas as pd
+        
+        columns = [np.empty(0)] * 3
+        reader = pd.read_csv(input_path, sep=" ", usecols=["X", "Y", "Z"], chunksize=chunk_size)
+        for chunk in reader:
+            columns = [
+                np.union1d(seen, chunk[name].to_numpy())
+                for seen, name in zip(columns, ("X", "Y", "Z"))
+            ]
+    
+    lon, lat, alt = columns
+    return grid_scaling(lat, lon, alt, altitude_units="m", relative_tolerance=relative_tolerance)
+
+
+def log_scaling(scaling: dict) -> None:
+    """Log the chosen scales and offsets with their error bound."""
+    for axis, scale, offset, error in zip(
+        "XYZ", scaling["scales"], scaling["offsets"], scaling["max_error"]
+    ):
+        logger.info(f"  {axis}: scale {scale:g}, offset {offset:g} (max error {error:.3g})")
+
+
+def resolve_scaling(
+    scales: Sequence[float],
+    scaling: Optional[dict] = None
+) -> tuple[tuple[float, float, float], tuple[float, float, float]]:
+    """Scales and offsets to write: the auto scaling if given, else the fixed scales with zero offsets."""
+    if scaling is None:
+        return tuple(scales), (0.0, 0.0, 0.0)
+    return scaling["scales"], scaling["offsets"]
\ No newline at end of file
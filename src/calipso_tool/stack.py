@@ -0,0 +1,252 @@
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, Optional, Sequence, Union
+import numpy as np
+from .catalog import granule_period
+from .converter import open_h4_grid_with
+from .h5_to_las import points_to_las
+from .h5_to_txt import iter_grid_points, open_h5_grid, report_point_counts, resolve_variable_names
+from .instrument import RunReport, track_stage
+from .las_to_copc import copc_writer_stage
+from .masking import filtering_requested, qc_variable_names
+from .pdal_runner import print_summary, run_pipeline
+from .workspace import publish, scratch_dir
+
+logger = logging.getLogger(__name__)
+
+# Start of GPS time (LAS "adjusted standard GPS time" is GPS seconds - 1e9)
+GPS_EPOCH = datetime(1980, 1, 6, tzinfo=timezone.utc)
+
+# Stacks with more points than this get a warning: writers.copc holds all of them in memory
+STACK_WARN_POINTS = 200_000_000
+
+
+def granule_time(path: Union[str, Path]) -> datetime:
+    """
+    Start time of a CALIPSO granule, parsed from its file name.
+    
+    Level 3 names (e.g. ...V4-20.2018-12D.hdf) give the first day of the
+    month, Level 2 names (e.g. ...V4-20.2018-01-01T00-22-49ZD.hdf) the exact
+    start time. The result is timezone-aware (UTC). This is the start of
+    catalog.granule_period.
+    """
+    period = granule_period(path)
+    if period is None:
+        raise ValueError(f"Cannot derive a date from the granule name {Path(path).name}; "
+                         f"pass times= explicitly")
+    return period[0]
+
+
+def adjusted_gps_time(when: datetime) -> float:
+    """
+    LAS adjusted standard GPS time (GPS seconds - 1e9) of a UTC datetime.
+    
+    Leap seconds are ignored, which shifts times by under 20 s.
+    """
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return (when - GPS_EPOCH).total_seconds() - 1e9
+
+
+def _with_time(points: np.ndarray, name: str, value: float) -> np.ndarray:
+    """Copy of a structured point array with a constant float64 time field appended."""
+    out = np.empty(len(points), dtype=np.dtype(points.dtype.descr + [(name, np.float64)]))
+    for field in points.dtype.names:
+        out[field] = points[field]
+    out[name] = value
+    return out
+
+
+def iter_stack_points(
+    granules: Sequence[Union[str, Path]],
+    times: Sequence[datetime],
+    variable_names: Sequence[str],
+    altitude_units: str = "km",
+    time_dimension: str = "GpsTime",
+    reader: str = "pyhdf",
+    fill_values: Optional[Sequence[float]] = None,
+    drop_nan: bool = False,
+    min_value: Optional[float] = None,
+    qc_thresholds: Optional[dict[str, float]] = None,
+    chunk_size: Optional[int] = None,
+    bbox: Optional[Sequence[float]] = None,
+    alt_range: Optional[Sequence[float]] = None,
+    stats: Optional[dict] = None,
+    work_dir: Optional[Union[str, Path]] = None
+) -> Iterator[np.ndarray]:
+    """
+    Generate point arrays of several granules in turn, each tagged with its time.
+    
+    Granules are opened one at a time and streamed slab by slab, so memory
+    does not grow with the number of granules. HDF5 files (.h5) are read with
+    open_h5_grid, anything else as HDF4 with the given reader; the "h4toh5"
+    reader's HDF5 copies go to work_dir and are removed after each granule.
+    """
+    if stats is None:
+        stats = {}
+    stats["total"] = stats["retained"] = 0
+    
+    read_names = qc_variable_names(variable_names, qc_thresholds)
+    for granule, when in zip(granules, times):
+        granule = Path(granule)
+        if when.tzinfo is None:
+            # Naive times are UTC, as in adjusted_gps_time, not the host's local time
+            when = when.replace(tzinfo=timezone.utc)
+        value = adjusted_gps_time(when) if time_dimension == "GpsTime" else when.timestamp()
+        logger.info(f"  + {granule.name} ({when:%Y-%m-%d %H:%M:%S})")
+        
+        h5_file = None
+        if granule.suffix in (".h5", ".hdf5"):
+            opener = open_h5_grid(granule, read_names, bbox, alt_range)
+        else:
+            if reader == "h4toh5" and work_dir is not None:
+                h5_file = Path(work_dir) / f"{granule.stem}.h5"
+            opener = open_h4_grid_with(granule, read_names, reader, h5_file,
+                                       bbox=bbox, alt_range=alt_range)
+        
+        granule_stats = {}
+        try:
+            with opener as grid:
+                chunks = iter_grid_points(
+                    *grid, variable_names, altitude_units, chunk_size,
+                    fill_values, drop_nan, min_value, qc_thresholds, granule_stats
+                )
+                for chunk in chunks:
+                    yield _with_time(chunk, time_dimension, value)
+        finally:
+            if h5_file is not None:
+                h5_file.unlink(missing_ok=True)
+        stats["total"] += granule_stats["total"]
+        stats["retained"] += granule_stats["retained"]
+
+
+def stack_to_copc(
+    granules: Sequence[Union[str, Path]],
+    output_copc: Union[str, Path],
+    variable_name: str = "var_to_grab",
+    altitude_units: str = "km",
+    variable_names: Optional[Sequence[str]] = None,
+    time_dimension: str = "GpsTime",
+    times: Optional[Sequence[datetime]] = None,
+    reader: str = "pyhdf",
+    fill_values: Optional[Sequence[float]] = None,
+    drop_nan: bool = False,
+    min_value: Optional[float] = None,
+    qc_thresholds: Optional[dict[str, float]] = None,
+    chunk_size: Optional[int] = None,
+    bbox: Optional[Sequence[float]] = None,
+    alt_range: Optional[Sequence[float]] = None,
+    scale_x: float = 1e-5,
+    scale_y: float = 1e-5,
+    scale_z: float = 0.01,
+    srs: Optional[str] = "EPSG:4326",
+    work_dir: Optional[Union[str, Path]] = None,
+    show_info: bool = False,
+    report: Optional[RunReport] = None
+) -> Path:
+    """
+    Stack many granules into one COPC file with a time dimension.
+    
+    Every point gets the time of its granule, so clients can stream the
+    octree by space and time (e.g. to animate a season from a single file).
+    The granules are appended one slab at a time to a LAS file in a scratch
+    directory, so reading them only needs memory for one slab. The LAS file
+    is then converted to COPC by PDAL, whose writers.copc loads the whole
+    stack to build the octree: peak memory grows with the total number of
+    stacked points (a warning is logged above STACK_WARN_POINTS). Subset
+    with bbox/alt_range, filter empty cells or stack fewer granules per file
+    to keep it in check.
+    
+    Parameters:
+    -----------
+    granules : list of str or Path
+        HDF4 (or HDF5, .h5) granules to stack. They are written in time order
+    output_copc : str or Path
+        Path to output COPC file
+    variable_name : str, default="var_to_grab"
+        Name of the variable to extract from every granule
+    altitude_units : str, default="km"
+        Units of altitude in the granules. If "km", will convert to meters.
+    variable_names : list of str, optional
+        Names of several variables to extract, one extra dimension each.
+        Overrides variable_name when given.
+    time_dimension : str, default="GpsTime"
+        "GpsTime" writes adjusted standard GPS time to the standard LAS
+        dimension; any other name adds a float64 extra dimension of that name
+        holding POSIX seconds (e.g. "time")
+    times : list of datetime, optional
+        Time of each granule; naive datetimes are taken as UTC. If None, parsed
+        from the granule names (see granule_time)
+    reader : str, default="pyhdf"
+        Backend used to read HDF4 granules (see open_h4_grid_with)
+    fill_values, drop_nan, min_value, qc_thresholds
+        Filtering options (see masking.valid_point_mask)
+    chunk_size : int, optional
+        Stream each granule in latitude slabs of about this many cells
+    bbox, alt_range : sequence of float, optional
+        Spatial and altitude subset (see subset.grid_selection)
+    scale_x, scale_y, scale_z : float
+        Scale factors for X, Y, Z coordinates
+    srs : str, optional, default="EPSG:4326"
+        Spatial reference system assigned to the output
+    work_dir : str or Path, optional
+        Directory for the intermediate LAS file. If None, a private scratch
+        directory is used (see workspace.scratch_dir)
+    show_info : bool, default=False
+        Print the summary of the created COPC file
+    report : RunReport, optional
+        Records wall time, peak memory, bytes in/out and throughput of each stage
+    
+    Returns:
+    --------
+    Path
+        Path to the created COPC file
+    """
+    output_copc = Path(output_copc)
+    variable_names = resolve_variable_names(variable_name, variable_names)
+    
+    if not granules:
+        raise ValueError("No granules to stack")
+    if times is None:
+        times = [granule_time(granule) for granule in granules]
+    if len(times) != len(granules):
+        raise ValueError(f"Got {len(times)} times for {len(granules)} granules")
+    order = sorted(range(len(granules)), key=lambda i: times[i])
+    granules = [Path(granules[i]) for i in order]
+    times = [times[i] for i in order]
+    
+    logger.info(f"Stacking {len(granules)} granules into {output_copc}...")
+    with scratch_dir(work_dir, f"{output_copc.stem}_") as scratch:
+        las_file = scratch / f"{output_copc.name.split('.')[0]}_stack.las"
+        
+        stats = {}
+        with track_stage(report, "stack_to_las", output_path=las_file) as record:
+            chunks = iter_stack_points(
+                granules, times, variable_names, altitude_units, time_dimension, reader,
+                fill_values, drop_nan, min_value, qc_thresholds, chunk_size, bbox, alt_range,
+                stats, scratch
+            )
+            points_to_las(chunks, las_file, scale_x, scale_y, scale_z, srs)
+            record["points"] = stats["retained"]
+        report_point_counts(stats, filtering_requested(fill_values, drop_nan, min_value, qc_thresholds))
+        if stats["retained"] > STACK_WARN_POINTS:
+            # X, Y, Z and time as doubles plus the float32 variables, before PDAL's own overhead
+            gigabytes = stats["retained"] * (32 + 4 * len(variable_names)) / 1024**3
+            logger.warning(f"⚠️  writers.copc holds all {stats['retained']:,} stacked points in memory "
+                           f"(at least {gigabytes:.1f} GB); subset or stack fewer granules if this is too much")
+        
+        logger.info("Converting stack to COPC...")
+        writer = copc_writer_stage(output_copc, [], scale_x, scale_y, scale_z, srs)
+        writer["extra_dims"] = "all"
+        with publish(output_copc) as tmp_copc:
+            writer["filename"] = str(tmp_copc)
+            pipeline = [{"type": "readers.las", "filename": str(las_file)}, writer]
+            with track_stage(report, "las_to_copc", las_file, tmp_copc) as record:
+                record["points"] = run_pipeline(pipeline)
+    
+    logger.info(f"✓ Created: {output_copc}")
+    if show_info:
+        print_summary(output_copc, "COPC")
+    
+    return output_copc
\ No newline at end of file
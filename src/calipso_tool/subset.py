@@ -0,0 +1,126 @@
+import numpy as np
+from typing import Optional, Sequence
+
+
+def index_range(coords: np.ndarray, lower: float, upper: float, name: str = "coordinate") -> slice:
+    """
+    Contiguous index range of the midpoints that lie within [lower, upper].
+    
+    Works for ascending and descending coordinate arrays.
+    
+    Parameters:
+    -----------
+    coords : np.ndarray
+        1D midpoint coordinates
+    lower, upper : float
+        Inclusive bounds of the range to keep
+    name : str, default="coordinate"
+        Coordinate name used in error messages
+    
+    Returns:
+    --------
+    slice
+        Slice selecting the midpoints inside the range
+    """
+    if lower > upper:
+        raise ValueError(f"Invalid {name} range ({lower}, {upper}): minimum exceeds maximum")
+    
+    inside = np.flatnonzero((coords >= lower) & (coords <= upper))
+    if inside.size == 0:
+        raise ValueError(f"No {name} midpoints within ({lower}, {upper}); "
+                         f"the grid spans {coords.min()} to {coords.max()}")
+    return slice(int(inside[0]), int(inside[-1]) + 1)
+
+
+def grid_selection(
+    lat1d: np.ndarray,
+    lon1d: np.ndarray,
+    alt1d: np.ndarray,
+    bbox: Optional[Sequence[float]] = None,
+    alt_range: Optional[Sequence[float]] = None
+) -> tuple[slice, slice, slice]:
+    """
+    Latitude, longitude and altitude index ranges of a bounding box and altitude range.
+    
+    Parameters:
+    -----------
+    lat1d, lon1d, alt1d : np.ndarray
+        1D latitude, longitude and altitude midpoints
+    bbox : sequence of float, optional
+        (lon_min, lat_min, lon_max, lat_max) in degrees. Boxes crossing the
+        antimeridian (lon_min > lon_max) are not supported
+    alt_range : sequence of float, optional
+        (min, max) altitude in the units of the file's Altitude_Midpoint
+    
+    Returns:
+    --------
+    tuple[slice, slice, slice]
+        Index ranges along the latitude, longitude and altitude axes
+    """
+    lat_slice = lon_slice = alt_slice = slice(None)
+    
+    if bbox is not None:
+        lon_min, lat_min, lon_max, lat_max = bbox
+        lon_slice = index_range(lon1d, lon_min, lon_max, "longitude")
+        lat_slice = index_range(lat1d, lat_min, lat_max, "latitude")
+    
+    if alt_range is not None:
+        alt_slice = index_range(alt1d, alt_range[0], alt_range[1], "altitude")
+    
+    return lat_slice, lon_slice, alt_slice
+
+
+class GridSubset:
+    """
+    Lazy view of a 3D (lat, lon, alt) dataset restricted to fixed index ranges.
+    
+    Slicing the view along latitude (as iter_grid_points does per slab) reads
+    only the selected hyperslab from the underlying h5py dataset or pyhdf
+    SDS, so cells outside the subset are never read from disk.
+    """
+    
+    def __init__(self, dataset, lat_slice: slice, lon_slice: slice, alt_slice: slice):
+        self.dataset = dataset
+        self.lat_slice = lat_slice
+        self.lon_slice = lon_slice
+        self.alt_slice = alt_slice
+        n_lat, n_lon, n_alt = dataset.shape if hasattr(dataset, "shape") else dataset.info()[2]
+        self.shape = (
+            len(range(*lat_slice.indices(n_lat))),
+            len(range(*lon_slice.indices(n_lon))),
+            len(range(*alt_slice.indices(n_alt))),
+        )
+    
+    def __getitem__(self, key: slice) -> np.ndarray:
+        if not isinstance(key, slice) or key.step not in (None, 1):
+            raise TypeError("GridSubset only supports contiguous slices along latitude")
+        
+        lat_start = self.lat_slice.start or 0
+        start, stop, _ = key.indices(self.shape[0])
+        rows = slice(lat_start + start, lat_start + stop)
+        return np.asarray(self.dataset[rows, self.lon_slice, self.alt_slice])
+
+
+def subset_grid(
+    lat1d: np.ndarray,
+    lon1d: np.ndarray,
+    alt1d: np.ndarray,
+    variables: dict,
+    bbox: Optional[Sequence[float]] = None,
+    alt_range: Optional[Sequence[float]] = None
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, dict]:
+    """
+    Restrict an opened grid to a bounding box and altitude range.
+    
+    Returns the grid unchanged when neither bbox nor alt_range is given,
+    otherwise the selected midpoints and GridSubset views of the variables.
+    """
+    if bbox is None and alt_range is None:
+        return lat1d, lon1d, alt1d, variables
+    
+    lat_slice, lon_slice, alt_slice = grid_selection(lat1d, lon1d, alt1d, bbox, alt_range)
+    views = {
+        name: GridSubset(dataset, lat_slice, lon_slice, alt_slice)
+        for name, dataset in variables.items()
+    }
+    return lat1d[lat_slice], lon1d[lon_slice], alt1d[alt_slice], views
\ No newline at end of file
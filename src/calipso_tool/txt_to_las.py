@@ -1,8 +1,62 @@
-import subprocess
+import logging
 import json
 from pathlib import Path
-from typing import Optional, Union
-import tempfile
+from typing import Optional, Sequence, Union
+from .cache import ArtifactCache
+from .instrument import configure_logging, RunReport, track_stage
+from .h5_to_txt import resolve_variable_names
+from .pdal_runner import print_summary, run_pipeline
+from .scaling import point_file_scaling, resolve_scaling
+
+logger = logging.getLogger(__name__)
+
+
+def pipeline_cache_key(
+    cache: ArtifactCache,
+    input_path: Union[str, Path],
+    stage: str,
+    pipeline: dict
+) -> str:
+    """Cache key of a file-to-file PDAL pipeline: its input plus every stage option but the filenames."""
+    stages = [
+        {option: value for option, value in s.items() if option != "filename"}
+        for s in pipeline["pipeline"]
+    ]
+    return cache.key(input_path, stage, pipeline=stages)
+
+
+def reader_stage(input_path: Union[str, Path], srs: str = "EPSG:4326") -> dict:
+    """
+    Build the PDAL reader stage matching the intermediate file's format.
+    
+    Text files go through readers.text, NPY files written by h5_to_npy through
+    readers.numpy (structured fields map straight to dimensions) and Parquet
+    files through readers.arrow, which needs a PDAL build with Arrow support.
+    
+    Parameters:
+    -----------
+    input_path : str or Path
+        Path to the intermediate .txt, .npy or .parquet file
+    srs : str, default="EPSG:4326"
+        Spatial reference system
+    
+    Returns:
+    --------
+    dict
+        PDAL reader stage
+    """
+    input_path = Path(input_path)
+    
+    if input_path.suffix == ".npy":
+        stage = {"type": "readers.numpy"}
+    elif input_path.suffix == ".parquet":
+        stage = {"type": "readers.arrow", "format": "parquet"}
+    else:
+        stage = {"type": "readers.text", "separator": " "}
+    
+    stage["filename"] = str(input_path)
+    stage["default_srs"] = srs
+    return stage
 
 
 def txt_to_las(
@@ -12,15 +66,23 @@ def txt_to_las(
     scale_x: float = 1e-5,
     scale_y: float = 1e-5,
     scale_z: float = 0.01,
-    srs: str = "EPSG:4326"
+    srs: str = "EPSG:4326",
+    variable_names: Optional[Sequence[str]] = None,
+    show_info: bool = False,
+    cache: Optional[ArtifactCache] = None,
+    report: Optional[RunReport] = None,
+    scaling: Optional[Union[str, dict]] = None
 ) -> Path:
     """
     Convert text file to LAS format using PDAL pipeline.
     
+    Binary intermediates (.npy from h5_to_npy, .parquet from h5_to_parquet)
+    are accepted too and read with the matching PDAL reader.
+    
     Parameters:
     -----------
     input_txt : str or Path
-        Path to input text file
+        Path to input text, NPY or Parquet file
     output_las : str or Path, optional
         Path to output LAS file. If None, uses same name as input with .las extension
     variable_name : str, default="var_to_grab"
@@ -29,6 +91,18 @@ def txt_to_las(
         Scale factors for X, Y, Z coordinates
     srs : str, default="EPSG:4326"
         Spatial reference system
+    variable_names : list of str, optional
+        Names of several extracted variables, one extra dimension each.
+        Overrides variable_name when given.
+    show_info : bool, default=False
+        Print the summary of the created LAS file (like `pdal info --summary`)
+    cache : ArtifactCache, optional
+        Reuse a previously converted LAS file for the same input and pipeline
+    report : RunReport, optional
+        Records wall time, peak memory, bytes in/out and throughput of each stage
+    scaling : "auto" or dict, optional
+        Scales and offsets overriding scale_x/y/z: "auto" derives them from
+        the file's coordinates (see scaling.point_file_scaling)
     
     Returns:
     --------
@@ -43,97 +117,97 @@ def txt_to_las(
     else:
         output_las = Path(output_las)
     
+    variable_names = resolve_variable_names(variable_name, variable_names)
+    if scaling == "auto":
+        scaling = point_file_scaling(input_txt)
+    (scale_x, scale_y, scale_z), (offset_x, offset_y, offset_z) = resolve_scaling(
+        (scale_x, scale_y, scale_z), scaling
+    )
+    
     # Create custom pipeline with dynamic variable name
     pipeline = {
         "pipeline": [
-            {
-                "type": "readers.text",
-                "filename": str(input_txt),
-                "separator": " ",
-                "default_srs": srs
-            },
+            reader_stage(input_txt, srs),
             {
                 "type": "writers.las",
                 "filename": str(output_las),
                 "scale_x": scale_x,
                 "scale_y": scale_y,
                 "scale_z": scale_z,
-                "offset_x": 0.0,
-                "offset_y": 0.0,
-                "offset_z": 0.0,
+                "offset_x": offset_x,
+                "offset_y": offset_y,
+                "offset_z": offset_z,
                 "extra_dims": [
-                    f"{variable_name}=float"
+                    f"{name}=float" for name in variable_names
                 ]
             }
         ]
     }
     
-    # Write temporary pipeline file
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-        json.dump(pipeline, f, indent=2)
-        temp_pipeline = f.name
+    if cache is not None:
+        cache_key = pipeline_cache_key(cache, input_txt, "txt_to_las", pipeline)
+        if cache.fetch(cache_key, output_las):
+            logger.info(f"✓ Cache hit: {output_las}")
+            return output_las
     
     try:
-        # Run PDAL pipeline
-        print(f"Converting {input_txt} to LAS format...")
-        print(f"Extra dimension: {variable_name}")
+        # Run PDAL pipeline in-process
+        logger.info(f"Converting {input_txt} to LAS format...")
+        logger.info(f"Extra dimension(s): {', '.join(variable_names)}")
         
-        result = subprocess.run(
-            ["pdal", "pipeline", temp_pipeline],
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        with track_stage(report, "txt_to_las", input_txt, output_las) as record:
+            record["points"] = run_pipeline(pipeline)
+        logger.info(f"✓ Created: {output_las}")
+        
+        if cache is not None:
+            cache.store(cache_key, output_las)
         
-        if result.returncode == 0:
-            print(f"✓ Created: {output_las}")
-            
-            # Get file info
-            info_result = subprocess.run(
-                ["pdal", "info", str(output_las), "--summary"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            
-            if info_result.returncode == 0:
-                print(f"LAS file info:")
-                print(info_result.stdout)
+        if show_info:
+            print_summary(output_las)
         
         return output_las
         
-    except subprocess.CalledProcessError as e:
-        print(f"✗ PDAL pipeline failed: {e}")
-        print(f"Error output: {e.stderr}")
+    except RuntimeError as e:
+        logger.error(f"✗ PDAL pipeline failed: {e}")
         raise
-    
-    finally:
-        # Clean up temporary pipeline file
-        Path(temp_pipeline).unlink(missing_ok=True)
 
 
 def txt_to_las_with_json(
     input_txt: Union[str, Path],
     output_las: Optional[Union[str, Path]] = None,
     variable_name: str = "var_to_grab",
-    pipeline_json: Optional[Union[str, Path]] = None
+    pipeline_json: Optional[Union[str, Path]] = None,
+    variable_names: Optional[Sequence[str]] = None,
+    show_info: bool = False,
+    cache: Optional[ArtifactCache] = None,
+    report: Optional[RunReport] = None
 ) -> Path:
     """
     Convert text file to LAS format using existing PDAL pipeline JSON file.
     
     This function modifies the pipeline JSON to use the correct input/output files
-    and variable name.
+    and variable name. For .npy/.parquet inputs the JSON's readers.text stage is
+    swapped for the matching binary reader.
     
     Parameters:
     -----------
     input_txt : str or Path
-        Path to input text file
+        Path to input text, NPY or Parquet file
     output_las : str or Path, optional
         Path to output LAS file. If None, uses same name as input with .las extension
     variable_name : str, default="var_to_grab"
         Name of the variable that was extracted (will be added as extra dimension)
     pipeline_json : str or Path, optional
         Path to pipeline JSON file. If None, uses default h5tolas.json
+    variable_names : list of str, optional
+        Names of several extracted variables, one extra dimension each.
+        Overrides variable_name when given.
+    show_info : bool, default=False
+        Print the summary of the created LAS file (like `pdal info --summary`)
+    cache : ArtifactCache, optional
+        Reuse a previously converted LAS file for the same input and pipeline
+    report : RunReport, optional
+        Records wall time, peak memory, bytes in/out and throughput of each stage
     
     Returns:
     --------
@@ -148,6 +222,8 @@ def txt_to_las_with_json(
     else:
         output_las = Path(output_las)
     
+    variable_names = resolve_variable_names(variable_name, variable_names)
+    
     # Find pipeline JSON if not provided
     if pipeline_json is None:
         # Look for h5tolas.json in various locations
@@ -163,7 +239,8 @@ def txt_to_las_with_json(
                 break
         else:
             # If not found, use the programmatic approach
-            return txt_to_las(input_txt, output_las, variable_name)
+            return txt_to_las(input_txt, output_las, variable_names=variable_names,
+                              show_info=show_info, cache=cache, report=report)
     
     pipeline_json = Path(pipeline_json)
     
@@ -172,44 +249,43 @@ def txt_to_las_with_json(
         pipeline = json.load(f)
     
     # Update the pipeline with actual values
-    for stage in pipeline["pipeline"]:
+    for i, stage in enumerate(pipeline["pipeline"]):
         if stage["type"] == "readers.text":
-            stage["filename"] = str(input_txt)
+            if input_txt.suffix in (".npy", ".parquet"):
+                pipeline["pipeline"][i] = reader_stage(input_txt, stage.get("default_srs", "EPSG:4326"))
+            else:
+                stage["filename"] = str(input_txt)
         elif stage["type"] == "writers.las":
             stage["filename"] = str(output_las)
-            # Update extra_dims with the actual variable name
-            stage["extra_dims"] = [f"{variable_name}=float"]
+            # Update extra_dims with the actual variable names
+            stage["extra_dims"] = [f"{name}=float" for name in variable_names]
     
-    # Write temporary modified pipeline
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-        json.dump(pipeline, f, indent=2)
-        temp_pipeline = f.name
+    if cache is not None:
+        cache_key = pipeline_cache_key(cache, input_txt, "txt_to_las", pipeline)
+        if cache.fetch(cache_key, output_las):
+            logger.info(f"✓ Cache hit: {output_las}")
+            return output_las
     
     try:
-        # Run PDAL pipeline
-        print(f"Converting {input_txt} to LAS format using {pipeline_json.name}...")
-        print(f"Extra dimension: {variable_name}")
+        # Run PDAL pipeline in-process
+        logger.info(f"Converting {input_txt} to LAS format using {pipeline_json.name}...")
+        logger.info(f"Extra dimension(s): {', '.join(variable_names)}")
         
-        result = subprocess.run(
-            ["pdal", "pipeline", temp_pipeline],
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        with track_stage(report, "txt_to_las", input_txt, output_las) as record:
+            record["points"] = run_pipeline(pipeline)
+        logger.info(f"✓ Created: {output_las}")
+        
+        if cache is not None:
+            cache.store(cache_key, output_las)
         
-        if result.returncode == 0:
-            print(f"✓ Created: {output_las}")
+        if show_info:
+            print_summary(output_las)
         
         return output_las
         
-    except subprocess.CalledProcessError as e:
-        print(f"✗ PDAL pipeline failed: {e}")
-        print(f"Error output: {e.stderr}")
+    except RuntimeError as e:
+        logger.error(f"✗ PDAL pipeline failed: {e}")
         raise
-    
-    finally:
-        # Clean up temporary pipeline file
-        Path(temp_pipeline).unlink(missing_ok=True)
 
 
 def main():
@@ -217,10 +293,10 @@ def main():
     import argparse
     
     parser = argparse.ArgumentParser(description="Convert text file to LAS format using PDAL")
-    parser.add_argument("input_txt", help="Path to input text file")
+    parser.add_argument("input_txt", help="Path to input text, NPY or Parquet file")
     parser.add_argument("-o", "--output", help="Path to output LAS file (optional)")
-    parser.add_argument("-v", "--variable", default="var_to_grab",
-                        help="Name of variable (default: var_to_grab)")
+    parser.add_argument("-v", "--variable", nargs="+", default=["var_to_grab"],
+                        help="Name(s) of variables (default: var_to_grab)")
     parser.add_argument("-p", "--pipeline", help="Path to PDAL pipeline JSON file")
     parser.add_argument("--scale-x", type=float, default=1e-5,
                         help="Scale factor for X coordinate (default: 1e-5)")
@@ -228,27 +304,35 @@ def main():
                         help="Scale factor for Y coordinate (default: 1e-5)")
     parser.add_argument("--scale-z", type=float, default=0.01,
                         help="Scale factor for Z coordinate (default: 0.01)")
+    parser.add_argument("--auto-scale", action="store_true",
+                        help="Derive scales and offsets from the file's coordinates")
     parser.add_argument("--srs", default="EPSG:4326",
                         help="Spatial reference system (default: EPSG:4326)")
+    parser.add_argument("--info", action="store_true",
+                        help="Print a summary of the created LAS file")
     
     args = parser.parse_args()
+    configure_logging()
     
     if args.pipeline:
         txt_to_las_with_json(
             args.input_txt,
             args.output,
-            args.variable,
-            args.pipeline
+            pipeline_json=args.pipeline,
+            variable_names=args.variable,
+            show_info=args.info
         )
     else:
         txt_to_las(
             args.input_txt,
             args.output,
-            args.variable,
-            args.scale_x,
-            args.scale_y,
-            args.scale_z,
-            args.srs
+            scale_x=args.scale_x,
+            scale_y=args.scale_y,
+            scale_z=args.scale_z,
+            srs=args.srs,
+            variable_names=args.variable,
+            show_info=args.info,
+            scaling="auto" if args.auto_scale else None
         )
 
 
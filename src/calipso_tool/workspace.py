@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+# Environment variable pointing scratch directories at fast local disk (NVMe, tmpfs)
+SCRATCH_DIR_ENV = "CALIPSO_SCRATCH_DIR"
+
+
+def scratch_root() -> Path:
+    """Directory under which per-run scratch directories are created."""
+    return Path(os.environ.get(SCRATCH_DIR_ENV) or tempfile.gettempdir())
+
+
+@contextmanager
+def scratch_dir(
+    work_dir: Optional[Union[str, Path]] = None,
+    prefix: str = "calipso_",
+    keep: bool = False
+) -> Iterator[Path]:
+    """
+    Directory for the intermediate files of one pipeline run.
+    
+    Without work_dir, a fresh directory is created under $CALIPSO_SCRATCH_DIR
+    (or the system temp directory), so concurrent runs on the same granule
+    never share intermediates and read-only input mounts are never written to.
+    It is removed on exit unless keep is True and it holds files. An explicit work_dir is used
+    as is and left in place; the caller owns it.
+    
+    Parameters:
+    -----------
+    work_dir : str or Path, optional
+        Directory chosen by the caller. If None, a private scratch directory is created
+    prefix : str, default="calipso_"
+        Name prefix of the created scratch directory
+    keep : bool, default=False
+        Leave the created scratch directory (and its files) in place on exit
+    
+    Yields:
+    -------
+    Path
+        Directory to write intermediate files into
+    """
+    if work_dir is not None:
+        work_dir = Path(work_dir)
+        work_dir.mkdir(parents=True, exist_ok=True)
+        yield work_dir
+        return
+    
+    root = scratch_root()
+    root.mkdir(parents=True, exist_ok=True)
+    path = Path(tempfile.mkdtemp(prefix=prefix, dir=root))
+    try:
+        yield path
+    finally:
+        if not keep or not any(path.iterdir()):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+@contextmanager
+def publish(output_path: Union[str, Path]) -> Iterator[Path]:
+    """
+    Write a file under a temporary name and rename it into place on success.
+    
+    The temporary file lives in the output's directory (so the rename is
+    atomic) and keeps its full name as suffix, so writers that pick the format
+    from the extension (e.g. .laz compression) behave the same. If the block
+    raises, the temporary file is removed and output_path is left untouched,
+    so readers only ever see complete outputs.
+    
+    Example:
+    --------
+    >>> with publish("granule.copc.laz") as tmp:
+    ...     points_to_copc(points, tmp)
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output_path.with_name(f".{uuid.uuid4().hex[:12]}.{output_path.name}")
+    try:
+        yield tmp
+        os.replace(tmp, output_path)
+    finally:
+        tmp.unlink(missing_ok=True)
\ No newline at end of file